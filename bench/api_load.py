@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Load test for the API server.
+
+Run from this directory: `python api_load.py [--dir EXPORT_DIR]`. Without
+`--dir`, a few synthetic sessions are parsed and exported to a temporary
+directory first. The server runs in this process on its own thread; the
+clients keep their connections alive and request a mix of endpoints, once
+plainly with gzip and once revalidating with `If-None-Match`.
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+import statistics
+
+sys.path.insert(0, '../src')
+from api_server import APIServer
+from APIMocker import APIMocker
+from deputy_registry import DeputyRegistry
+from plenar_parser import parse_plenar_transcript
+from session_stats import SessionStats
+from transcript_gen import synthetic_transcript, deputies
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+
+
+def export_sessions(directory, n_sessions):
+    registry = DeputyRegistry(deputies())
+    stats = SessionStats()
+    plenums = []
+    for i in range(n_sessions):
+        session = 200 + i
+        filename = os.path.join(directory, '18{}.txt'.format(session))
+        with open(filename, 'w', encoding='utf8') as f:
+            f.write(synthetic_transcript(session=session, seed=i))
+        metadata, topics, contributions, excused = parse_plenar_transcript(filename, registry)
+        APIMocker.stream_plenum(metadata, topics, contributions, excused,
+                                os.path.join(directory, '{}.json'.format(session)), precompress=())
+        plenums.append(APIMocker.plenum_short(metadata, topics, {}))
+        stats.add_session(metadata, contributions, excused)
+    APIMocker.stream_json(plenums, os.path.join(directory, 'plenums.json'), precompress=())
+    APIMocker.stream_json(stats.export(), os.path.join(directory, 'stats.json'), precompress=())
+    return [str(200 + i) for i in range(n_sessions)]
+
+
+def request_mix(sessions, rnd):
+    while True:
+        session = rnd.choice(sessions)
+        r = rnd.random()
+        if r < 0.05:
+            yield '/plenums'
+        elif r < 0.2:
+            yield '/sessions/{}'.format(session)
+        elif r < 0.6:
+            yield '/sessions/{}/contributions?offset={}&limit=20'.format(session, rnd.randrange(0, 300, 20))
+        elif r < 0.95:
+            yield '/sessions/{}/contributions/{}'.format(session, rnd.randrange(300))
+        else:
+            yield '/deputies?name=muster'
+
+
+async def client(port, paths, deadline, revalidate, latencies, statuses):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    etags = {}
+    try:
+        while time.perf_counter() < deadline:
+            path = next(paths)
+            headers = 'Host: localhost\r\nAccept-Encoding: gzip\r\n'
+            if revalidate and path in etags:
+                headers += 'If-None-Match: {}\r\n'.format(etags[path])
+            start = time.perf_counter()
+            writer.write('GET {} HTTP/1.1\r\n{}\r\n'.format(path, headers).encode('latin-1'))
+            head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+            response = {}
+            for line in head.split('\r\n')[1:]:
+                name, _, value = line.partition(':')
+                response[name.strip().lower()] = value.strip()
+            await reader.readexactly(int(response['content-length']))
+            latencies.append(time.perf_counter() - start)
+            status = int(head.split(' ', 2)[1])
+            statuses[status] = statuses.get(status, 0) + 1
+            etags[path] = response.get('etag')
+    finally:
+        writer.close()
+
+
+async def load(port, sessions, connections, seconds, revalidate, seed=0):
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + seconds
+    rnd = random.Random(seed)
+    await asyncio.gather(*[client(port, request_mix(sessions, random.Random(rnd.random())), deadline, revalidate,
+                                  latencies, statuses) for _ in range(connections)])
+    return latencies, statuses
+
+
+def report(name, latencies, statuses, seconds):
+    latencies = sorted(latencies)
+    q = statistics.quantiles(latencies, n=100)
+    print("{:<12} {:>8.0f} req/s  p50 {:6.2f} ms  p90 {:6.2f} ms  p99 {:6.2f} ms  max {:7.2f} ms  {}".format(
+        name, len(latencies) / seconds, q[49] * 1e3, q[89] * 1e3, q[98] * 1e3, latencies[-1] * 1e3,
+        ' '.join('{}: {}'.format(k, v) for k, v in sorted(statuses.items()))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the API server')
+    parser.add_argument('--dir', help='exported data to serve (default: synthetic sessions)')
+    parser.add_argument('--sessions', type=int, default=5, help='number of synthetic sessions')
+    parser.add_argument('--connections', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--cache-size', type=int, default=1024)
+    args = parser.parse_args()
+
+    directory = args.dir or tempfile.mkdtemp()
+    try:
+        if args.dir:
+            sessions = [f[:-5] for f in os.listdir(directory) if f[:-5].isdigit() and f.endswith('.json')]
+        else:
+            sessions = export_sessions(directory, args.sessions)
+
+        api = APIServer(directory, args.cache_size)
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(api.start(port=0))
+        port = server.sockets[0].getsockname()[1]
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        for name, revalidate in [('gzip', False), ('revalidate', True)]:
+            latencies, statuses = asyncio.run(load(port, sessions, args.connections, args.seconds, revalidate))
+            report(name, latencies, statuses, args.seconds)
+        print("response cache: {} hits, {} misses".format(api.cache.hits, api.cache.misses))
+
+        loop.call_soon_threadsafe(server.close)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
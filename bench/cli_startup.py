@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Startup time of the CLI subcommands.
+
+Run from this directory: `python cli_startup.py [--repeat N]`. Every
+subcommand is loaded in fresh interpreters (`cli.load`, which does the
+imports the subcommand needs); the best wall time is reported next to that
+of an empty interpreter, with the number of modules loaded.
+"""
+import sys
+import time
+import argparse
+import subprocess
+
+COMMANDS = ['fetch', 'parse', 'export']
+
+LOAD = 'import sys; sys.path.insert(0, "../src"); import cli; cli.load({!r}); print(len(sys.modules))'
+
+
+def measure(code, repeat):
+    best, modules = float('inf'), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.check_output([sys.executable, '-c', code])
+        best = min(best, time.perf_counter() - start)
+        modules = int(out or 0)
+    return best, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the startup time of the CLI subcommands')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    interpreter, _ = measure('pass', args.repeat)
+    print("{:<12} {:8.1f} ms".format('interpreter', interpreter * 1e3))
+    for command in COMMANDS:
+        seconds, modules = measure(LOAD.format(command), args.repeat)
+        print("{:<12} {:8.1f} ms  (+{:6.1f} ms)  {:>4} modules".format(
+            command, seconds * 1e3, (seconds - interpreter) * 1e3, modules))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Times `inject_agenda_items` for growing sittings.
+
+Run from this directory: `python inject_agenda_bench.py`. The time per
+record (contributions + agenda items) should stay roughly constant.
+"""
+import sys
+import timeit
+import logging
+
+sys.path.insert(0, '../src')
+from plenar_parser import inject_agenda_items
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+
+SPEECH_LENGTH = 2000
+
+
+def sitting(n_contributions, n_topics):
+    speech = 'x' * SPEECH_LENGTH
+    contributions = []
+    for i in range(n_contributions):
+        contributions.append({
+            'speaker': {'first_name': 'Anna', 'last_name': 'Muster'},
+            'start_idx': i * SPEECH_LENGTH,
+            'end_idx': (i + 1) * SPEECH_LENGTH,
+            'speech': speech
+        })
+    step = n_contributions * SPEECH_LENGTH // max(n_topics, 1)
+    topics = [{'type': 'Tagesordnungspunkt', 'id': str(i), 'summary': '',
+               'start_idx': i * step + 7, 'end_idx': (i + 1) * step}
+              for i in range(n_topics)]
+    return contributions, topics
+
+
+def main(sizes=(250, 500, 1000, 2000, 4000, 8000), repeat=5):
+    print("{:>8} {:>8} {:>12} {:>14}".format('speeches', 'topics', 'best [ms]', 'per record [us]'))
+    for n in sizes:
+        contributions, topics = sitting(n, n // 10)
+        best = min(timeit.repeat(lambda: inject_agenda_items(contributions, topics), number=1, repeat=repeat))
+        print("{:>8} {:>8} {:>12.3f} {:>14.3f}".format(n, len(topics), best * 1e3, best * 1e6 / (n + len(topics))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Times every stage of `parse_plenar_transcript` on synthetic transcripts of growing size.
+
+Run from this directory:
+
+    python parser_bench.py -o results.json
+    python parser_bench.py -o new.json --baseline results.json --threshold 0.2
+
+Each stage is timed on its own, with the inputs the parser would hand to it.
+The results are saved as JSON; with `--baseline` every (size, stage) is
+compared to an earlier run and the script exits with status 1 if a stage got
+slower by more than the threshold.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import timeit
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+
+sys.path.insert(0, '../src')
+from deputy_registry import DeputyRegistry
+from plenar_parser import (read_transcript, parse_metadata, plenum_bounds, split_plenum, parse_agenda_summaries,
+                           parse_agenda_debate, parse_contributions, inject_agenda_items, parse_excused,
+                           parse_plenar_transcript)
+from scanner import scan_transcript
+from interjections import extract_interjections
+from transcript_gen import synthetic_transcript, deputies
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+
+# name: (agenda items, speeches, excused deputies); "sitting" is about the size of a real one
+SIZES = [
+    ('small', (8, 50, 10)),
+    ('sitting', (30, 200, 40)),
+    ('long', (60, 400, 80)),
+    ('huge', (120, 800, 160)),
+]
+
+# differences below this are noise, whatever the ratio
+MIN_DIFFERENCE_MS = 0.05
+
+
+def stages(filename, registry):
+    """(name, callable) of the parser stages, with their inputs prepared."""
+    text = read_transcript(filename)
+    events = scan_transcript(text)
+    preamble_end, debate_start, debate_end, postamble_start = plenum_bounds(text, events)
+    summaries = parse_agenda_summaries(text, events, 0, preamble_end)
+    agenda_items = parse_agenda_debate(text, summaries, debate_start, debate_end)
+    contributions = parse_contributions(text, registry, events, debate_start, debate_end)
+    return [
+        ('read_transcript', lambda: read_transcript(filename)),
+        ('scan_transcript', lambda: scan_transcript(text)),
+        ('parse_metadata', lambda: parse_metadata(text, events)),
+        ('split_plenum', lambda: split_plenum(text, events)),
+        ('parse_agenda_summaries', lambda: parse_agenda_summaries(text, events, 0, preamble_end)),
+        ('parse_agenda_debate', lambda: parse_agenda_debate(text, summaries, debate_start, debate_end)),
+        ('parse_contributions', lambda: parse_contributions(text, registry, events, debate_start, debate_end)),
+        ('inject_agenda_items', lambda: inject_agenda_items(contributions, agenda_items)),
+        ('extract_interjections', lambda: [extract_interjections(c['speech']) for c in contributions]),
+        ('parse_excused', lambda: parse_excused(text, events, postamble_start)),
+        ('parse_plenar_transcript', lambda: parse_plenar_transcript(filename, registry)),
+    ]
+
+
+def run(sizes=SIZES, repeat=7):
+    registry = DeputyRegistry(deputies())
+    directory = tempfile.mkdtemp()
+    results = []
+    try:
+        for name, (n_items, n_speeches, n_excused) in sizes:
+            filename = os.path.join(directory, '{}.txt'.format(name))
+            with open(filename, 'w', encoding='utf8') as f:
+                f.write(synthetic_transcript(n_items, n_speeches, n_excused))
+            for stage, fn in stages(filename, registry):
+                times = timeit.repeat(fn, number=1, repeat=repeat)
+                results.append({
+                    'size': name,
+                    'bytes': os.path.getsize(filename),
+                    'stage': stage,
+                    'best_ms': min(times) * 1e3,
+                    'median_ms': statistics.median(times) * 1e3,
+                })
+                print("{:<8} {:>9} {:<24} best {:9.3f} ms  median {:9.3f} ms".format(
+                    name, results[-1]['bytes'], stage, results[-1]['best_ms'], results[-1]['median_ms']))
+    finally:
+        shutil.rmtree(directory)
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(run, baseline, threshold):
+    """Print the change per (size, stage) against `baseline`; returns the regressions."""
+    before = {(r['size'], r['stage']): r['best_ms'] for r in baseline['results']}
+    regressions = []
+    for r in run['results']:
+        old = before.get((r['size'], r['stage']))
+        if old is None:
+            continue
+        ratio = r['best_ms'] / old if old else float('inf')
+        regressed = ratio > 1 + threshold and r['best_ms'] - old > MIN_DIFFERENCE_MS
+        if regressed:
+            regressions.append(r)
+        print("{:<8} {:<24} {:9.3f} -> {:9.3f} ms  {:6.2f}x{}".format(
+            r['size'], r['stage'], old, r['best_ms'], ratio, '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the stages of the transcript parser')
+    parser.add_argument('-o', '--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slowdown of a stage that counts as a regression (default: 0.2)')
+    parser.add_argument('--repeat', type=int, default=7, help='number of timings per stage')
+    parser.add_argument('--sizes', help='comma separated subset of: ' + ', '.join(n for n, _ in SIZES))
+    args = parser.parse_args(argv)
+
+    sizes = SIZES
+    if args.sizes:
+        sizes = [s for s in SIZES if s[0] in args.sizes.split(',')]
+
+    results = run(sizes, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("{} stage(s) slower by more than {:.0%}".format(len(regressions), args.threshold))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Compares locating the transcript structure with full-text regex sweeps
+(as the parser did before `scanner`) against a single `scan_transcript` pass.
+
+Run from this directory: `python scanner_bench.py [glob]`, e.g. with
+'/tmp/scraper/*.txt' for the downloaded protocols. Without matching files a
+synthetic transcript is used.
+"""
+import re
+import sys
+import glob
+import timeit
+
+sys.path.insert(0, '../src')
+import scanner
+from plenar_parser import Regex, sanitise_transcript, parse_metadata, plenum_bounds, parse_agenda_summaries, parse_excused
+from scanner import scan_transcript
+from transcript_gen import synthetic_transcript
+
+AGENDA_SUMMARY_REG = re.compile(r'\n(Zusatztagesordnungspunkt|Tagesordnungspunkt)\s*(\d+)*:?\n(.*?(?=(?:' +
+                                '|'.join([r'\n(Zusatztagesordnungspunkt|Tagesordnungspunkt)\s*(\d+)*:?\n',
+                                          r'\nAnlage\s*\d*\s*\n', r'\n\d+\.\sSitzung\s*\n',
+                                          r'\nAmtliche Mitteilungen\s*\n']) + ')|$))', re.DOTALL)
+
+
+def regex_sweeps(text):
+    Regex.session_reg_.findall(text)[0]
+    Regex.date_reg_.findall(text)[0]
+    Regex.start_time_reg_.findall(text)[0]
+    Regex.end_time_reg_.findall(text)[0]
+    preamble, rest = re.split(Regex.start_split_reg_, text)
+    debate, postamble = re.split(Regex.end_split_reg_, rest)
+    summaries = [Regex.steno_reference_reg_.sub('\n', m.group(3)) for m in AGENDA_SUMMARY_REG.finditer(preamble)]
+    speakers = list(Regex.speaker_reg_.finditer(debate))
+    for start in Regex.excused_start_reg_.finditer(postamble):
+        pass
+    re.search(r'\nAnlage\s\d+|\s*\d+\s+Deutscher Bundestag –', postamble[start.end():])
+    return summaries, speakers
+
+
+def scanned(text):
+    events = scan_transcript(text)
+    parse_metadata(text, events)
+    preamble_end, debate_start, debate_end, postamble_start = plenum_bounds(text, events)
+    summaries = parse_agenda_summaries(text, events, 0, preamble_end)
+    speakers = list(events.finditer(scanner.SPEAKER, Regex.speaker_reg_, debate_start, debate_end))
+    parse_excused(text, events, postamble_start)
+    return summaries, speakers
+
+
+def main(pattern=None, repeat=5):
+    texts = []
+    for f in sorted(glob.glob(pattern)) if pattern else []:
+        with open(f) as fp:
+            texts.append((f, sanitise_transcript(fp.read())))
+    if not texts:
+        texts = [('synthetic', synthetic_transcript(60, 200))]
+
+    total_sweeps = total_scan = 0
+    for name, text in texts:
+        try:
+            sweeps = min(timeit.repeat(lambda: regex_sweeps(text), number=1, repeat=repeat))
+            scan = min(timeit.repeat(lambda: scanned(text), number=1, repeat=repeat))
+        except (ValueError, IndexError, NameError) as e:
+            print("skipping {}: {}".format(name, e))
+            continue
+        total_sweeps += sweeps
+        total_scan += scan
+        print("{:<40} {:>10} chars  sweeps {:8.2f} ms  scan {:8.2f} ms  {:5.2f}x".format(
+            name[-40:], len(text), sweeps * 1e3, scan * 1e3, sweeps / scan))
+    if total_scan:
+        print("total: sweeps {:.2f} ms, scan {:.2f} ms, speedup {:.2f}x".format(
+            total_sweeps * 1e3, total_scan * 1e3, total_sweeps / total_scan))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2])
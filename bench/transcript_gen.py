@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Synthetic plenary transcripts for the benchmarks.
+
+`synthetic_transcript` builds a transcript in the layout of the Bundestag
+protocols: a preamble with the agenda item summaries, the debate with the
+speaker line formats of `Regex.speaker_reg_` and the presiding speaker
+calling the agenda items, and an annex with the excused deputies.
+`deputies` returns matching abgeordnetenwatch data for a `DeputyRegistry`.
+"""
+import random
+
+WORDS = ('Die Bundesregierung hat mit dem Gesetz über die Förderung der Energie und des Klimas '
+         'Sport Rente Wirtschaft Menschen, meine Damen und Herren; wir Sie').split()
+
+PARTIES = ['CDU/CSU', 'SPD', 'DIE LINKE', 'BÜNDNIS 90/DIE GRÜNEN']
+
+# (first name, last name, speaker line)
+SPEAKERS = [
+    ('Anna', 'Muster', 'Anna Muster ({party})'),
+    ('Hans-Christian', 'Ströbele', 'Hans-Christian Ströbele ({party})'),
+    ('Peter', 'Beispiel', 'Dr. Peter Beispiel ({party})'),
+    ('Gabriele', 'Schmidt', 'Gabriele Schmidt ({party})'),
+    ('Karl', 'Lauterbach', 'Prof. Dr. Karl Lauterbach ({party})'),
+    ('Barbara', 'Hendricks', 'Dr. Barbara Hendricks, Bundesministerin für Umwelt'),
+    ('Thomas', 'Mustermann', 'Thomas Mustermann, Parlamentarischer Staatssekretär'),
+]
+PRESIDENTS = [
+    ('Norbert', 'Lammert', 'Präsident Dr. Norbert Lammert'),
+    ('Claudia', 'Roth', 'Vizepräsidentin Claudia Roth'),
+]
+
+ABSENTEES = [
+    ('Rüthrich', None, 'Susann'),
+    ('Schmidt', 'Ühlingen', 'Gabriele'),
+    ('Müller', None, 'Stefan'),
+    ('Dörflinger', None, 'Thomas'),
+    ('Ernstberger', None, 'Petra'),
+]
+
+PAGE = 22000
+
+
+def deputies():
+    """abgeordnetenwatch data for the speakers of `synthetic_transcript`."""
+    return {
+        'profiles': [{
+            'personal': {'first_name': first, 'last_name': last,
+                         'picture': {'url': 'https://example.org/{}.jpg'.format(last.lower())}},
+            'meta': {'uuid': last.lower()},
+        } for first, last, _ in SPEAKERS + PRESIDENTS]
+    }
+
+
+def agenda_items(n_items):
+    """(summary header, debate name, id) of the agenda items; every fifth is an additional item."""
+    items = []
+    for i in range(1, n_items + 1):
+        if i % 5 == 0:
+            items.append(('Zusatztagesordnungspunkt', 'Zusatzpunkt', str(i // 5)))
+        else:
+            items.append(('Tagesordnungspunkt', 'Tagesordnungspunkt', str(i - i // 5)))
+    return items
+
+
+def synthetic_transcript(n_items=30, n_speeches=200, n_excused=40, session=221, seed=0):
+    """A transcript with `n_items` agenda items, `n_speeches` speeches and `n_excused` absentees.
+
+    Summaries are a few paragraphs long and speeches about ten paragraphs,
+    with interjections and page headers in between; a sitting with the
+    defaults is about as long as a real one (~700 KB).
+    """
+    rnd = random.Random(seed)
+    page = [PAGE]
+
+    def paragraph():
+        return ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(20, 80))) + '.'
+
+    def page_break():
+        page[0] += 1
+        return '\nDeutscher Bundestag – 18. Wahlperiode – {}. Sitzung. Berlin, Donnerstag, den 30. März 2017 {}\n'.format(
+            session, page[0])
+
+    items = agenda_items(n_items)
+
+    preamble = ['Plenarprotokoll 18/{0}\n\nDeutscher Bundestag\nStenografischer Bericht\n{0}. Sitzung\n'
+                'Berlin, Donnerstag, den 30. März 2017\nInhalt:'.format(session)]
+    for header, _, item_id in items:
+        preamble.append('\n{} {}:\n{}\n{} {}\n'.format(
+            header, item_id, '\n'.join(paragraph() for _ in range(rnd.randint(2, 6))),
+            rnd.randint(10000, 99999), rnd.choice('ABCD')))
+
+    debate = []
+    president = PRESIDENTS[0]
+    calls = {round(i * n_speeches / max(n_items, 1)): item for i, item in enumerate(items)}
+    for i in range(n_speeches):
+        if i in calls:
+            _, name, item_id = calls[i]
+            president = rnd.choice(PRESIDENTS)
+            call = rnd.choice(['Ich rufe den {} {} auf: {}', 'Wir kommen jetzt zum {} {}: {}'])
+            debate.append('\n  {}: \n  {}\n'.format(president[2], call.format(name, item_id, paragraph())))
+        speaker = rnd.choice(SPEAKERS)[2].format(party=rnd.choice(PARTIES))
+        speech = []
+        for _ in range(rnd.randint(6, 14)):
+            speech.append('  ' + paragraph())
+            r = rnd.random()
+            if r < 0.3:
+                speech.append('(Beifall bei der {})'.format(rnd.choice(PARTIES)))
+            elif r < 0.4:
+                speech.append('(Zuruf von der {}: Nein!)'.format(rnd.choice(PARTIES)))
+            elif r < 0.45:
+                speech.append(page_break())
+        debate.append('\n  {}: \n{}\n'.format(speaker, '\n'.join(speech)))
+        if rnd.random() < 0.5:
+            debate.append('\n  {}: \n  Vielen Dank. – Das Wort hat jetzt die Kollegin.\n'.format(president[2]))
+
+    excused = []
+    for i in range(n_excused):
+        last, electorate, first = ABSENTEES[i % len(ABSENTEES)]
+        excused.append('{}{}, {}{}\n{}\n30.03.2017\n'.format(
+            last, ' ({})'.format(electorate) if electorate else '', first,
+            ' *' if i % 7 == 0 else '', rnd.choice(PARTIES)))
+
+    return (''.join(preamble) + '\nBeginn: 9.00 Uhr\nRedetext' + ''.join(debate) +
+            '\n(Schluss: 12.00 Uhr)\n\nAnlagen zum Stenografischen Bericht\nAnlage 1\n'
+            'Liste der entschuldigten Abgeordneten\nAbgeordnete(r)\n' + ''.join(excused) +
+            '* aufgrund gesetzlichen Mutterschutzes\nAnlage 2\nErklärung nach § 31 GO\n' + paragraph() + '\n')
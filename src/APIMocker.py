@@ -1,11 +1,273 @@
+import os
 import json
 import copy
+import gzip
+import logging
+import tempfile
+from collections import Counter
+
+from text_span import materialise
+from utils import atomic_write
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+# characters of speech per page of the paged export
+PAGE_CHARS = 64 * 1024
+HEAD_FILE = 'head.json'
+PAGE_FILE = 'page-{:04d}.json'
+# keys of a contribution that go to the pages instead of the head
+PAGE_KEYS = ('speech', 'interjections')
+
+
+def session_name(session):
+    """The name of a session's files, e.g. '005' for session 5, like its protocol 18005.txt."""
+    return '{:03d}'.format(int(session))
+
+
+def excused_stats(excused):
+    """Number of excused deputies per party."""
+    stats = Counter()
+    for e in excused:
+        stats[e['party']] += 1
+    return stats
+
+
+# version of the exported JSON; bump it when the format changes, so that
+# sessions whose parse results are cached are exported again
+EXPORT_VERSION = 2
+# session name -> EXPORT_VERSION of its exported files, next to them
+EXPORT_VERSIONS_FILE = '.export_versions.json'
+
+
+class _StreamedList(list):
+    """Lets the json encoder consume an iterator as if it was a list."""
+    _empty = object()
+    _unpeeked = object()
+
+    def __init__(self, iterable):
+        super().__init__()
+        self._it = iter(iterable)
+        self._first = self._unpeeked
+
+    def _peek(self):
+        # not before the encoder gets here, the iterable may be lazy
+        if self._first is self._unpeeked:
+            self._first = next(self._it, self._empty)
+        return self._first
+
+    def __bool__(self):
+        return self._peek() is not self._empty
+
+    def __iter__(self):
+        if self._peek() is not self._empty:
+            yield self._first
+            yield from self._it
+
+
+def _speaker_table(contributions):
+    """The speakers of `contributions` in the order they first occur, and their indexes.
+
+    The indexes are keyed on the id of the speaker objects; equal speakers,
+    interned or not, get the same index.
+    """
+    speakers, by_object, by_key = [], {}, {}
+    for c in contributions:
+        if 'speaker' not in c:
+            continue
+        speaker = c['speaker']
+        if id(speaker) not in by_object:
+            i = by_key.setdefault(json.dumps(speaker, sort_keys=True), len(speakers))
+            if i == len(speakers):
+                speakers.append(speaker)
+            # the speaker is kept alongside its index, so that its id isn't reused
+            by_object[id(speaker)] = (i, speaker)
+    return speakers, by_object
+
+
+def _speaker_ids(contributions, index):
+    """Yield the contributions with their speakers replaced by their index of `_speaker_table`."""
+    for c in contributions:
+        if 'speaker' not in c:
+            yield c
+            continue
+        e = dict(c)
+        e['speaker'] = index[id(c['speaker'])][0]
+        yield e
+
+
+class _Outputs(object):
+    """Writes encoded chunks to `filename` and its precompressed siblings.
+
+    Every output goes to a temporary file that is renamed into place on success.
+    """
+
+    def __init__(self, filename, precompress):
+        self.files = []
+        self._brotli = None
+
+        self._raw = self._open(filename)
+        self._gzip = None
+        if 'gz' in precompress:
+            # mtime=0 keeps the .gz output reproducible
+            self._gzip = gzip.GzipFile(filename=os.path.basename(filename), mode='wb', compresslevel=9,
+                                       fileobj=self._open(filename + '.gz'), mtime=0)
+        if 'br' in precompress:
+            if brotli is None:
+                log.warning("brotli is not installed, not writing %s.br", filename)
+            else:
+                self._brotli_file = self._open(filename + '.br')
+                self._brotli = brotli.Compressor(quality=11)
+
+    def _open(self, filename):
+        dir_name = os.path.dirname(filename) or '.'
+        fd, tmp = tempfile.mkstemp(dir=dir_name, prefix='.' + os.path.basename(filename) + '.', suffix='.tmp')
+        f = os.fdopen(fd, 'wb')
+        self.files.append((f, tmp, filename))
+        return f
+
+    def write(self, chunk):
+        data = chunk.encode('utf8')
+        self._raw.write(data)
+        if self._gzip is not None:
+            self._gzip.write(data)
+        if self._brotli is not None:
+            self._brotli_file.write(self._brotli.process(data))
+
+    def close(self, success=True):
+        if self._gzip is not None:
+            self._gzip.close()
+        if self._brotli is not None:
+            self._brotli_file.write(self._brotli.finish())
+
+        written = {}
+        for f, tmp, filename in self.files:
+            f.close()
+            if success:
+                os.replace(tmp, filename)
+                written[filename] = os.path.getsize(filename)
+            else:
+                os.unlink(tmp)
+        return written
+
 
 class APIMocker(object):
     @staticmethod
-    def persist_json(dictionary, filename):
+    def encoder(compact):
+        # speeches are only turned into strings while they are encoded
+        if compact:
+            return json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=materialise)
+        return json.JSONEncoder(ensure_ascii=False, indent=4, default=materialise)
+
+    @staticmethod
+    def persist_json(dictionary, filename, compact=False):
         with open(filename, 'w', encoding='utf8') as json_file:
-            json.dump(dictionary, json_file, ensure_ascii=False, indent=4)
+            for chunk in APIMocker.encoder(compact).iterencode(dictionary):
+                json_file.write(chunk)
+
+    @staticmethod
+    def stream_json(dictionary, filename, compact=True, precompress=('gz', 'br')):
+        """Encode `dictionary` chunk by chunk to `filename` and its `.gz`/`.br` siblings.
+
+        Iterators in `dictionary` are written as lists without being
+        materialised. Returns the number of bytes written per file.
+        """
+        outputs = _Outputs(filename, precompress)
+        try:
+            for chunk in APIMocker.encoder(compact).iterencode(dictionary):
+                outputs.write(chunk)
+        except BaseException:
+            outputs.close(success=False)
+            raise
+        return outputs.close()
+
+    @staticmethod
+    def stream_plenum(header, topic_summaries, contributions, excused, filename, compact=True, precompress=('gz', 'br')):
+        """Like `persist_json(plenum(...))`, but contributions are encoded one at a time."""
+        p = APIMocker.plenum(header, topic_summaries, contributions, excused, stream=True)
+        return APIMocker.stream_json(p, filename, compact, precompress)
+
+    @staticmethod
+    def paged_plenum(header, topic_summaries, contributions, excused, page_chars=PAGE_CHARS):
+        """Split a plenum into a head and pages of speeches.
+
+        The head holds the metadata, the agenda items and a header per
+        contribution (the contribution without its speech and interjections,
+        plus the speech `length` and the `page` it is on). Pages hold the
+        speeches and interjections of consecutive contributions, about
+        `page_chars` characters of speech each; a speech is never split. Returns (head, pages), a page being
+        (number of its first contribution, contributions).
+        """
+        headers = []
+        pages = []
+        page, chars = [], 0
+        for i, c in enumerate(contributions):
+            length = len(c['speech']) if 'speech' in c else 0
+            if page and chars + length > page_chars:
+                pages.append((i - len(page), page))
+                page, chars = [], 0
+            h = {k: v for k, v in c.items() if k not in PAGE_KEYS}
+            if 'speech' in c:
+                h['length'] = length
+            h['page'] = len(pages)
+            headers.append(h)
+            page.append(c)
+            chars += length
+        if page:
+            pages.append((len(contributions) - len(page), page))
+
+        head = APIMocker.plenum(header, topic_summaries, headers, excused)
+        head['pages'] = [{'file': PAGE_FILE.format(k), 'first': first, 'count': len(p)}
+                         for k, (first, p) in enumerate(pages)]
+        return head, pages
+
+    @staticmethod
+    def stream_paged_plenum(header, topic_summaries, contributions, excused, directory, compact=True,
+                            precompress=('gz', 'br'), page_chars=PAGE_CHARS):
+        """Write the head and pages of `paged_plenum` to `directory`.
+
+        A page file holds `first`, and the `speeches` and their
+        `interjections` from there on, None for the agenda items in between. The head is written last, so it never
+        refers to pages that aren't there yet. Returns the number of bytes
+        written per file.
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        head, pages = APIMocker.paged_plenum(header, topic_summaries, contributions, excused, page_chars)
+
+        written = {}
+        for k, (first, page) in enumerate(pages):
+            p = {'first': first, 'speeches': _StreamedList(c.get('speech') for c in page),
+                 'interjections': [c.get('interjections') for c in page]}
+            written.update(APIMocker.stream_json(p, os.path.join(directory, PAGE_FILE.format(k)), compact, precompress))
+        written.update(APIMocker.stream_json(head, os.path.join(directory, HEAD_FILE), compact, precompress))
+
+        # pages left over from an earlier, longer export
+        k = len(pages)
+        while os.path.exists(os.path.join(directory, PAGE_FILE.format(k))):
+            for suffix in ('', '.gz', '.br'):
+                filename = os.path.join(directory, PAGE_FILE.format(k) + suffix)
+                if os.path.exists(filename):
+                    os.unlink(filename)
+            k += 1
+        return written
+
+    @staticmethod
+    def read_export_versions(directory):
+        """Session name -> export version of the session files in `directory`."""
+        try:
+            with open(os.path.join(directory, EXPORT_VERSIONS_FILE), encoding='utf8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    @staticmethod
+    def write_export_versions(directory, versions):
+        atomic_write(os.path.join(directory, EXPORT_VERSIONS_FILE), json.dumps(versions, sort_keys=True).encode('utf8'))
 
     @staticmethod
     def plenum_short(header, topic_summaries, excused_stats):
@@ -17,12 +279,27 @@ class APIMocker(object):
         return desc
 
     @staticmethod
-    def plenum(header, topic_summaries, contributions, excused):
+    def plenum(header, topic_summaries, contributions, excused, stream=False):
+        """The JSON of a session, with every speaker listed once in `speakers`.
+
+        The `speaker` of a contribution is its index in `speakers`, which is
+        complete before anything is encoded. With `stream`, the contributions
+        are copied with their speaker index one at a time while `stream_json`
+        encodes them.
+        """
+        if not isinstance(contributions, (list, tuple)):
+            contributions = list(contributions)
+        speakers, index = _speaker_table(contributions)
+        exported = _speaker_ids(contributions, index)
+        exported = _StreamedList(exported) if stream else list(exported)
         p = {
             'absentRepresentatives': excused,
             'date': header['date'],
             'session': header['session'],
             'agendaItems': topic_summaries,
-            'contributions': contributions
+            'contributions': exported,
+            'speakers': speakers
         }
-        return p
\ No newline at end of file
+        if 'reactions' in header:
+            p['reactions'] = header['reactions']
+        return p
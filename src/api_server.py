@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import gzip
+import json
+import asyncio
+import hashlib
+import logging
+import argparse
+import threading
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from APIMocker import session_name
+
+log = logging.getLogger(__name__)
+
+# `body` is the encoded JSON, `gzipped` its gzip encoding or None if it is too
+# small to be worth compressing
+Response = namedtuple('Response', ['status', 'body', 'gzipped', 'etag'])
+
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+MAX_HEADER_BYTES = 2**16
+
+
+class NotFound(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+class LRUCache(object):
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class APIServer(object):
+    """Read-only JSON API over the files written by the scraper.
+
+    Serves the plenum list (`plenums.json`), the sessions (`<session>.json`)
+    with their contributions page by page, and the deputies of `stats.json`.
+    Encoded responses are kept in an LRU cache keyed on the request and the
+    modification time of the file they come from, so updated files are
+    picked up. Responses carry an ETag, are answered with 304 to a matching
+    `If-None-Match` and are gzipped for clients that accept it.
+    """
+
+    def __init__(self, directory, cache_size=1024, sessions=16, gzip_min_size=512):
+        self.directory = directory
+        self.gzip_min_size = gzip_min_size
+        self.cache = LRUCache(cache_size)
+        # decoded files, keyed on (name, mtime); loaded in executor threads
+        self._files = LRUCache(sessions)
+        self._files_lock = threading.Lock()
+        self.routes = [
+            (re.compile(r'^/plenums/?$'), 'plenums.json', self.plenums),
+            (re.compile(r'^/sessions/(?P<session>\d+)/?$'), '{session}.json', self.session),
+            (re.compile(r'^/sessions/(?P<session>\d+)/contributions/?$'), '{session}.json', self.contributions),
+            (re.compile(r'^/sessions/(?P<session>\d+)/contributions/(?P<index>\d+)/?$'), '{session}.json',
+             self.contribution),
+            (re.compile(r'^/deputies/?$'), 'stats.json', self.deputies),
+            (re.compile(r'^/deputies/(?P<id>[^/]+)/?$'), 'stats.json', self.deputy),
+        ]
+
+    def _mtime(self, name):
+        try:
+            return os.stat(os.path.join(self.directory, name)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load(self, name, mtime):
+        if mtime is None:
+            raise NotFound(name)
+        with self._files_lock:
+            data = self._files.get((name, mtime))
+        if data is None:
+            with open(os.path.join(self.directory, name), encoding='utf8') as f:
+                data = json.load(f)
+            # the contributions of a session refer to its speaker table, responses carry the speakers
+            if isinstance(data, dict) and 'speakers' in data:
+                for c in data['contributions']:
+                    if 'speaker' in c:
+                        c['speaker'] = data['speakers'][c['speaker']]
+            with self._files_lock:
+                self._files.put((name, mtime), data)
+        return data
+
+    @staticmethod
+    def _int(query, name, default, maximum=None):
+        try:
+            value = int(query.get(name, [default])[0])
+        except ValueError:
+            raise BadRequest("{} must be an integer".format(name))
+        if value < 0:
+            raise BadRequest("{} must not be negative".format(name))
+        return min(value, maximum) if maximum is not None else value
+
+    # handlers: (data of the route's file, path parameters, query) -> JSON value
+
+    def plenums(self, data, params, query):
+        return data
+
+    def session(self, data, params, query):
+        return {
+            'session': data['session'],
+            'date': data['date'],
+            'agendaItems': data['agendaItems'],
+            'absentRepresentatives': data['absentRepresentatives'],
+            'contributions': len(data['contributions']),
+            'reactions': data.get('reactions'),
+        }
+
+    def contributions(self, data, params, query):
+        offset = self._int(query, 'offset', 0)
+        limit = self._int(query, 'limit', DEFAULT_LIMIT, MAX_LIMIT)
+        contributions = data['contributions']
+        return {
+            'total': len(contributions),
+            'offset': offset,
+            'limit': limit,
+            'contributions': contributions[offset:offset+limit],
+        }
+
+    def contribution(self, data, params, query):
+        try:
+            index = int(params['index'])
+        except ValueError:
+            raise BadRequest("index must be an integer")
+        if index >= len(data['contributions']):
+            raise NotFound("no contribution {}".format(index))
+        return data['contributions'][index]
+
+    def deputies(self, data, params, query):
+        offset = self._int(query, 'offset', 0)
+        limit = self._int(query, 'limit', DEFAULT_LIMIT, MAX_LIMIT)
+        deputies = data['deputies']
+        name = query.get('name', [''])[0].casefold()
+        if name:
+            deputies = [d for d in deputies if name in '{} {}'.format(d['first_name'], d['last_name']).casefold()]
+        return {'total': len(deputies), 'offset': offset, 'limit': limit, 'deputies': deputies[offset:offset+limit]}
+
+    def deputy(self, data, params, query):
+        key = unquote(params['id'])
+        for d in data['deputies']:
+            if d['id'] == key or d.get('uuid') == key:
+                return d
+        raise NotFound("no deputy {}".format(key))
+
+    def encode(self, status, value):
+        body = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf8')
+        etag = '"{}"'.format(hashlib.sha1(body).hexdigest()[:20])
+        gzipped = gzip.compress(body, 6, mtime=0) if len(body) >= self.gzip_min_size else None
+        return Response(status, body, gzipped, etag)
+
+    def route(self, path):
+        """(path parameters, file name, handler) of the route matching `path`."""
+        for regex, file_template, handler in self.routes:
+            m = regex.match(path)
+            if m:
+                names = m.groupdict()
+                if 'session' in names:
+                    # the files are named like the protocols, e.g. 005.json
+                    names = dict(names, session=session_name(names['session']))
+                return m.groupdict(), file_template.format(**names), handler
+        return None
+
+    def build(self, path, query_string, mtime):
+        """Encode the response for a request; runs in an executor on cache misses."""
+        route = self.route(path)
+        if route is None:
+            return self.encode(404, {'error': 'not found', 'detail': path})
+        params, name, handler = route
+        try:
+            data = self.load(name, mtime)
+            return self.encode(200, handler(data, params, parse_qs(query_string)))
+        except NotFound as e:
+            return self.encode(404, {'error': 'not found', 'detail': str(e)})
+        except BadRequest as e:
+            return self.encode(400, {'error': 'bad request', 'detail': str(e)})
+        except Exception:
+            # e.g. a data file that isn't valid JSON or lacks a key
+            log.exception("Failed to answer %s from %s", path, name)
+            return self.encode(500, {'error': 'internal server error'})
+
+    async def respond(self, method, target, headers):
+        """(status, headers, body) for a request."""
+        if method not in ('GET', 'HEAD'):
+            r = self.encode(405, {'error': 'method not allowed'})
+            return r.status, [('Allow', 'GET, HEAD')], r.body
+
+        parts = urlsplit(target)
+        path = parts.path
+        route = self.route(path)
+        mtime = self._mtime(route[1]) if route is not None else None
+        key = (path, parts.query, mtime)
+
+        r = self.cache.get(key)
+        if r is None:
+            r = await asyncio.get_running_loop().run_in_executor(None, self.build, path, parts.query, mtime)
+            self.cache.put(key, r)
+
+        use_gzip = r.gzipped is not None and 'gzip' in headers.get('accept-encoding', '')
+        etag = r.etag[:-1] + '-gz"' if use_gzip else r.etag
+        response_headers = [('ETag', etag), ('Vary', 'Accept-Encoding'), ('Cache-Control', 'no-cache')]
+
+        if r.status == 200 and etag in [t.strip() for t in headers.get('if-none-match', '').split(',')]:
+            return 304, response_headers, b''
+        if use_gzip:
+            response_headers.append(('Content-Encoding', 'gzip'))
+            return r.status, response_headers, r.gzipped
+        return r.status, response_headers, r.body
+
+    async def handle(self, reader, writer):
+        """Serve the requests of one (keep-alive) connection."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                request = lines[0].split(' ')
+                if len(request) != 3:
+                    break
+                method, target, version = request
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(':')
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                try:
+                    length = int(headers.get('content-length', '0'))
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # the end of the body is unknown, so the connection can't be reused
+                    r = self.encode(400, {'error': 'bad request', 'detail': 'invalid Content-Length'})
+                    status, response_headers, body = r.status, [], r.body
+                    keep_alive = False
+                else:
+                    if length:
+                        await reader.readexactly(length)
+                    status, response_headers, body = await self.respond(method, target, headers)
+
+                out = ['HTTP/1.1 {} {}'.format(status, REASONS[status]),
+                       'Content-Type: application/json; charset=utf-8',
+                       'Content-Length: {}'.format(len(body))]
+                out.extend('{}: {}'.format(k, v) for k, v in response_headers)
+                if not keep_alive:
+                    out.append('Connection: close')
+                writer.write(('\r\n'.join(out) + '\r\n\r\n').encode('latin-1'))
+                if method != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8000):
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+
+
+async def serve(directory, host, port, cache_size):
+    api = APIServer(directory, cache_size)
+    server = await api.start(host, port)
+    log.info("Serving %s on %s", directory, ', '.join(str(s.getsockname()) for s in server.sockets))
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve the exported plenum data as a read-only JSON API')
+    parser.add_argument('--dir', default='../../plenarnavi_frontend/public/data',
+                        help='directory with plenums.json and the per-session files')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--cache-size', type=int, default=1024, help='number of cached responses')
+    args = parser.parse_args()
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    asyncio.run(serve(args.dir, args.host, args.port, args.cache_size))
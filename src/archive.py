@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import os
+import tarfile
+import zipfile
+import logging
+from fnmatch import fnmatch
+
+from batch import parse_stream
+from deputy_registry import DEPUTIES_PATH
+
+log = logging.getLogger(__name__)
+
+
+def iter_archive(path, pattern='*.txt'):
+    """Yield (name, bytes) for the members of a zip or tar(.gz/.bz2/.xz) archive matching `pattern`.
+
+    Members are read one at a time and never extracted to disk; tar
+    archives are read as a stream, without seeking.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as z:
+            for info in z.infolist():
+                if info.is_dir() or not fnmatch(os.path.basename(info.filename), pattern):
+                    continue
+                with z.open(info) as f:
+                    yield info.filename, f.read()
+        return
+
+    with tarfile.open(path, 'r|*') as t:
+        for member in t:
+            if not member.isfile() or not fnmatch(os.path.basename(member.name), pattern):
+                continue
+            f = t.extractfile(member)
+            yield member.name, f.read()
+
+
+def parse_archive(path, workers=None, deputies_path=DEPUTIES_PATH, pattern='*.txt'):
+    """Parse the transcripts in an archive, yielding a `BatchResult` per member (see `parse_stream`)."""
+    log.info("Parsing transcripts in %s", path)
+    return parse_stream(iter_archive(path, pattern), workers, deputies_path)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import os
+import hashlib
+import logging
+import traceback
+from collections import namedtuple, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from plenar_parser import parse_plenar_transcript, PARSER_VERSION
+from deputy_registry import DeputyRegistry, DEPUTIES_PATH
+from timings import Timings
+
+log = logging.getLogger(__name__)
+
+# `result` is the tuple returned by `parse_plenar_transcript`, or None if
+# parsing failed, in which case `error` holds the formatted traceback.
+# `cached` is set if the result was taken from the parse cache. `timings` is the
+# `Timings.summary()` of the parser stages, None for cached results.
+BatchResult = namedtuple('BatchResult', ['file', 'result', 'error', 'unresolved', 'cached', 'timings'])
+
+# deputy registry of the current (worker) process, set by `_init_worker`
+_registry = None
+
+
+def _init_worker(deputies_path):
+    global _registry
+    _registry = DeputyRegistry.load(deputies_path)
+
+
+def _parse_file(file, data=None):
+    timings = Timings()
+    try:
+        result = parse_plenar_transcript(file, _registry, timings, text=data)
+        return BatchResult(file, result, None, _registry.pop_unresolved(), False, timings.summary())
+    except Exception:
+        log.error("Failed to parse %s", file)
+        return BatchResult(file, None, traceback.format_exc(), _registry.pop_unresolved(), False, timings.summary())
+
+
+def cache_version(deputies_path=DEPUTIES_PATH):
+    """Version for the parse cache: parse results depend on the parser and the deputy data."""
+    h = hashlib.sha256()
+    with open(deputies_path, 'rb') as f:
+        h.update(f.read())
+    return '{}-{}'.format(PARSER_VERSION, h.hexdigest())
+
+
+def _parse_files(files, workers, chunksize, deputies_path):
+    if workers == 1:
+        _init_worker(deputies_path)
+        for f in files:
+            yield _parse_file(f)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(deputies_path,)) as executor:
+        for r in executor.map(_parse_file, files, chunksize=chunksize):
+            yield r
+
+
+def parse_batch(files, workers=None, chunksize=1, deputies_path=DEPUTIES_PATH, cache=None):
+    """Parse transcripts on a pool of `workers` processes (all cores if None).
+
+    Yields a `BatchResult` per file, in the order of `files`, so the output
+    doesn't depend on the number of workers. A failing file doesn't abort
+    the batch. With `workers=1` the files are parsed in this process.
+
+    If a `ParseCache` is given, only files missing from it are parsed.
+    """
+    if cache is None:
+        for r in _parse_files(files, workers, chunksize, deputies_path):
+            yield r
+        return
+
+    keys = [cache.key(f) for f in files]
+    cached = [cache.get(k) for k in keys]
+    misses = [f for f, c in zip(files, cached) if c is None]
+    log.info("%d of %d transcripts cached", len(files) - len(misses), len(files))
+
+    parsed = _parse_files(misses, workers, chunksize, deputies_path) if misses else iter(())
+    for f, key, c in zip(files, keys, cached):
+        if c is not None:
+            result, unresolved = c
+            yield BatchResult(f, result, None, unresolved, True, None)
+        else:
+            r = next(parsed)
+            if r.error is None:
+                cache.put(key, (r.result, r.unresolved))
+            yield r
+
+
+def parse_stream(members, workers=None, deputies_path=DEPUTIES_PATH):
+    """Parse (name, data) pairs, e.g. the members of an archive, on a pool of `workers` processes.
+
+    Like `parse_batch`, but the transcripts are given as bytes or str. Yields
+    a `BatchResult` per member, in order. `members` is consumed lazily with
+    at most two members per worker in flight, so memory stays bounded by
+    the largest transcripts rather than growing with the stream.
+    """
+    if workers == 1:
+        _init_worker(deputies_path)
+        for name, data in members:
+            yield _parse_file(name, data)
+        return
+
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(deputies_path,)) as executor:
+        pending = deque()
+        for name, data in members:
+            pending.append(executor.submit(_parse_file, name, data))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""Command line interface, in separate stages that pass their results on disk.
+
+    python cli.py fetch    download the protocols to the data directory
+    python cli.py parse    parse protocols into the SQLite store
+    python cli.py export   write the frontend's JSON, stats and search index from the store
+    python cli.py worker      parse the protocols queued in a shared spool directory
+    python cli.py distribute  queue protocols in a spool directory and assemble the workers' results
+
+Each subcommand imports only the modules it needs, so a parse-only run on
+a worker doesn't load bs4/html5lib, and an export doesn't load the parser.
+The startup time (the imports of this module and of the subcommand) is
+logged at INFO level. Paths default to the PLENAR_* environment variables.
+"""
+import time
+
+START = time.perf_counter()
+
+import os
+import sys
+import glob
+import json
+import logging
+import argparse
+
+# time spent importing this module; the subcommand's imports are added to it
+IMPORT_SECONDS = time.perf_counter() - START
+
+log = logging.getLogger(__name__)
+
+DATA_DIR = os.environ.get('PLENAR_DATA_DIR', '/tmp/scraper')
+DB_PATH = os.environ.get('PLENAR_DB', os.path.join(DATA_DIR, 'plenar.db'))
+OUT_PATH = os.environ.get('PLENAR_OUT', '../../plenarnavi_frontend/public/data')
+# None: the default of DeputyRegistry.load
+DEPUTIES_PATH = os.environ.get('PLENAR_DEPUTIES')
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def _load_fetch():
+    from fetch import scrape_protocols, PLENAR_URL_SCHEME, BASE_URL
+
+    def fetch(args):
+        files = scrape_protocols(args.limit, args.data_dir, args.downloads,
+                                 args.url_scheme or PLENAR_URL_SCHEME, args.base_url or BASE_URL)
+        print("{} protocols in {}".format(len(files), args.data_dir))
+        return 0
+    return fetch
+
+
+def _load_parse():
+    import itertools
+    from batch import parse_batch, cache_version
+    from archive import parse_archive
+    from deputy_registry import DEPUTIES_PATH as DEFAULT_DEPUTIES_PATH
+    from parse_cache import ParseCache
+    from timings import Timings
+    from store import Store
+
+    def parse(args):
+        deputies_path = args.deputies or DEFAULT_DEPUTIES_PATH
+        if args.archive:
+            results = itertools.chain.from_iterable(parse_archive(a, args.workers, deputies_path) for a in args.archive)
+        else:
+            files = args.files or sorted(glob.glob(os.path.join(args.data_dir, '*.txt')))
+            cache = None
+            if not args.no_cache:
+                cache = ParseCache(args.cache_dir or os.path.join(args.data_dir, '.parse_cache'),
+                                   cache_version(deputies_path), args.cache_size * 2**20)
+            results = parse_batch(files, args.workers, args.chunksize, deputies_path, cache)
+
+        failed = []
+        # session -> protocol; the store is keyed on the session of one legislative period
+        protocols = {}
+        skipped = []
+        batch_timings = Timings()
+        with Store(args.db) as store:
+            stored = set(store.sessions())
+            for f, result, error, unresolved, cached, timings in results:
+                if timings is not None:
+                    batch_timings.merge(timings)
+                if error is not None:
+                    print("Failed to parse", os.path.basename(f))
+                    print(error)
+                    failed.append(f)
+                    continue
+                metadata, _, contributions, excused = result
+                if protocols.setdefault(metadata['session'], f) != f:
+                    print("Skipping {}: session {} is already taken by {}".format(
+                        os.path.basename(f), metadata['session'], os.path.basename(protocols[metadata['session']])))
+                    skipped.append(f)
+                    continue
+                if not (cached and metadata['session'] in stored):
+                    store.add_session(result)
+                print("{}: session {}, {} contributions, {} excused, {} unresolved speakers{}".format(
+                    os.path.basename(f), metadata['session'], len(contributions), len(excused), len(unresolved),
+                    ' (cached)' if cached else ''))
+
+        if args.timings:
+            with open(args.timings, 'w') as timings_file:
+                json.dump({'startup': args.startup, 'total': batch_timings.summary()}, timings_file, indent=4)
+        if skipped:
+            print("{} protocol(s) skipped for a repeated session number:".format(len(skipped)))
+            for f in skipped:
+                print("  ", f)
+        if failed:
+            print("{} protocol(s) could not be parsed:".format(len(failed)))
+            for f in failed:
+                print("  ", f)
+        return 1 if failed or skipped else 0
+    return parse
+
+
+def _load_export():
+    from APIMocker import APIMocker
+    from search_index import IndexBuilder
+    from session_stats import SessionStats
+    from store import Store, export_store
+
+    def export(args):
+        if not os.path.exists(args.db):
+            print("no database at {}, run `parse` first".format(args.db), file=sys.stderr)
+            return 2
+        if not os.path.isdir(args.out):
+            os.makedirs(args.out)
+        precompress = [c for c in args.precompress.split(',') if c]
+        index = None if args.no_index else IndexBuilder()
+        stats = SessionStats()
+        with Store(args.db) as store:
+            written = export_store(store, args.out, not args.pretty, precompress, args.paged, index, stats)
+        written.update(APIMocker.stream_json(stats.export(), os.path.join(args.out, 'stats.json'),
+                                             not args.pretty, precompress))
+        for name, size in sorted(written.items()):
+            print("wrote {} ({} bytes)".format(name, size))
+        if index is not None:
+            shards = index.write(os.path.join(args.out, 'search'))
+            print("search index: {} terms in {} shards".format(len(index), shards))
+        return 0
+    return export
+
+
+def _load_worker():
+    from deputy_registry import DEPUTIES_PATH as DEFAULT_DEPUTIES_PATH
+    from spool import run_worker
+
+    def worker(args):
+        processed = run_worker(args.spool, args.lease, args.deputies or DEFAULT_DEPUTIES_PATH, args.poll_interval,
+                               args.worker_id)
+        print("{} protocols parsed".format(processed))
+        return 0
+    return worker
+
+
+def _load_distribute():
+    from deputy_registry import DEPUTIES_PATH as DEFAULT_DEPUTIES_PATH
+    from spool import Spool, Coordinator, WorkersExited
+
+    def distribute(args):
+        files = args.files or sorted(glob.glob(os.path.join(args.data_dir, '*.txt')))
+        spool = Spool(args.spool, args.lease)
+        coordinator = Coordinator(spool, args.poll_interval)
+        precompress = [c for c in args.precompress.split(',') if c]
+        try:
+            written = coordinator.run(files, args.out, args.local_workers, not args.pretty, precompress,
+                                      args.deputies or DEFAULT_DEPUTIES_PATH, args.timeout)
+        except (TimeoutError, WorkersExited) as e:
+            print(e, file=sys.stderr)
+            return 1
+        for name, size in sorted(written.items()):
+            print("wrote {} ({} bytes)".format(name, size))
+        errors = coordinator.errors()
+        if errors:
+            print("{} protocol(s) could not be parsed:".format(len(errors)))
+            for name, _ in errors:
+                print("  ", name)
+            return 1
+        return 0
+    return distribute
+
+
+COMMANDS = {
+    'fetch': _load_fetch,
+    'parse': _load_parse,
+    'export': _load_export,
+    'worker': _load_worker,
+    'distribute': _load_distribute,
+}
+
+
+def load(command):
+    """Import what `command` needs; returns its function of the parsed arguments."""
+    return COMMANDS[command]()
+
+
+def arg_parser():
+    parser = argparse.ArgumentParser(description='Fetch, parse and export plenary protocols')
+    parser.add_argument('--log-level', default='WARNING',
+                        help='level of the log output (DEBUG, INFO, WARNING, ...)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fetch = commands.add_parser('fetch', help='download the protocols to the data directory')
+    fetch.add_argument('--data-dir', default=DATA_DIR, help='directory of the downloaded protocols')
+    fetch.add_argument('--limit', type=int, default=10, help='number of protocols per listing page')
+    fetch.add_argument('--downloads', type=int, default=8, help='number of concurrent downloads')
+    fetch.add_argument('--url-scheme', help='listing URL with {limit} and {offset} placeholders')
+    fetch.add_argument('--base-url', help='URL the links of the listing are relative to')
+
+    parse = commands.add_parser('parse', help='parse protocols into the database')
+    parse.add_argument('files', nargs='*', help='protocols to parse (default: the *.txt files in the data directory)')
+    parse.add_argument('--data-dir', default=DATA_DIR, help='directory of the downloaded protocols')
+    parse.add_argument('--archive', action='append', default=[],
+                       help='parse the protocols in this zip/tar(.gz) archive (repeatable)')
+    parse.add_argument('--db', default=DB_PATH, help='SQLite database to store the parsed sessions in')
+    parse.add_argument('--deputies', default=DEPUTIES_PATH, help='abgeordnetenwatch deputy data')
+    parse.add_argument('--workers', type=int, default=None,
+                       help='number of parser processes (default: number of cores, 1 parses in-process)')
+    parse.add_argument('--chunksize', type=int, default=1,
+                       help='number of protocols handed to a parser process at once')
+    parse.add_argument('--cache-dir', help='directory of the parse cache (default: <data dir>/.parse_cache)')
+    parse.add_argument('--cache-size', type=int, default=256, help='maximum size of the parse cache in MiB')
+    parse.add_argument('--no-cache', action='store_true', help='parse every protocol, bypassing the parse cache')
+    parse.add_argument('--timings',
+                       help='write the startup time and the time, matches and characters per parser stage to this JSON file')
+
+    export = commands.add_parser('export', help="write the frontend's data from the database")
+    export.add_argument('--db', default=DB_PATH, help='SQLite database of the parsed sessions')
+    export.add_argument('--out', default=OUT_PATH, help='directory to write the JSON files to')
+    export.add_argument('--pretty', action='store_true',
+                        help='indent the exported JSON instead of writing it compactly')
+    export.add_argument('--precompress', default='gz,br',
+                        help='comma separated list of precompressed siblings to write (gz, br)')
+    export.add_argument('--paged', action='store_true',
+                        help='also write every session as a head file and pages of speeches to <out>/<session>/')
+    export.add_argument('--no-index', action='store_true',
+                        help="don't build the full-text search index over the speeches")
+
+    # the spool directory must be shared by the coordinator and all workers, e.g. over NFS
+    worker = commands.add_parser('worker', help='parse the protocols queued in a spool directory')
+    worker.add_argument('--spool', required=True, help='shared spool directory')
+    worker.add_argument('--deputies', default=DEPUTIES_PATH, help='abgeordnetenwatch deputy data')
+    worker.add_argument('--worker-id', help='name of this worker in the spool (default: <host>-<pid>)')
+    worker.add_argument('--lease', type=float, default=60, help='seconds a claim stays valid without renewal')
+    worker.add_argument('--poll-interval', type=float, default=1.0, help='seconds between looks at an empty queue')
+
+    distribute = commands.add_parser('distribute',
+                                     help="queue protocols in a spool directory and write the workers' results")
+    distribute.add_argument('files', nargs='*',
+                            help='protocols to parse (default: the *.txt files in the data directory)')
+    distribute.add_argument('--spool', required=True, help='shared spool directory')
+    distribute.add_argument('--data-dir', default=DATA_DIR, help='directory of the downloaded protocols')
+    distribute.add_argument('--out', default=OUT_PATH, help='directory to write the JSON files to')
+    distribute.add_argument('--deputies', default=DEPUTIES_PATH, help='deputy data of the local workers')
+    distribute.add_argument('--local-workers', type=int, default=0,
+                            help='number of worker processes to start on this machine')
+    distribute.add_argument('--lease', type=float, default=60,
+                            help='seconds after which the claim of a silent worker is queued again')
+    distribute.add_argument('--poll-interval', type=float, default=1.0, help='seconds between looks at the spool')
+    distribute.add_argument('--timeout', type=float,
+                            help='give up if the protocols are not parsed within this many seconds '
+                                 '(required without --local-workers)')
+    distribute.add_argument('--pretty', action='store_true',
+                            help='indent the exported JSON instead of writing it compactly')
+    distribute.add_argument('--precompress', default='gz,br',
+                            help='comma separated list of precompressed siblings to write (gz, br)')
+    return parser
+
+
+def main(argv=None):
+    parser = arg_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'distribute' and not args.local_workers and args.timeout is None:
+        # with only remote workers, there may be none to ever finish
+        parser.error('distribute without --local-workers needs a --timeout')
+    logging.basicConfig(format=LOG_FORMAT, level=args.log_level.upper())
+    start = time.perf_counter()
+    run = load(args.command)
+    args.startup = IMPORT_SECONDS + time.perf_counter() - start
+    log.info("%s: started in %.1f ms", args.command, args.startup * 1e3)
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
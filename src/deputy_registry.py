@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import json
+import logging
+import unicodedata
+
+log = logging.getLogger(__name__)
+
+DEPUTIES_PATH = '../data/deputies.json'
+
+# marker for secondary keys that point to more than one deputy
+_AMBIGUOUS = object()
+
+_registries = {}
+
+
+class DeputyRegistry(object):
+    """Index over the abgeordnetenwatch profiles in `deputies.json`.
+
+    Profiles are keyed on the normalised (first_name, last_name) pair. A
+    secondary index holds the spelling variants (umlauts, hyphenated names,
+    partial names) so that a speaker is resolved by dictionary lookups only.
+    Speakers that can't be resolved are collected in `unresolved`.
+    """
+
+    title_reg_ = re.compile(r'^(?:(?:\w{1,5}\.)\s*)+')
+    suffix_reg_ = re.compile(r'\s*\([^)]*\)\s*')
+    transliterations_ = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+
+    def __init__(self, aw_data):
+        self._primary = {}
+        self._secondary = {}
+        self.unresolved = []
+        self._unresolved_keys = set()
+
+        for p in aw_data['profiles']:
+            entry = {
+                'image_url': p['personal'].get('picture', {}).get('url'),
+                'uuid': p['meta']['uuid'],
+            }
+            first = self.normalise(p['personal']['first_name'])
+            last = self.normalise(p['personal']['last_name'])
+            # first come, first served - same as the former linear scan
+            self._primary.setdefault((first, last), entry)
+
+        for (first, last), entry in self._primary.items():
+            for key in self._variants(first, last):
+                if key in self._primary:
+                    continue
+                if self._secondary.get(key, entry) is not entry:
+                    self._secondary[key] = _AMBIGUOUS
+                else:
+                    self._secondary[key] = entry
+
+    @classmethod
+    def load(cls, path=DEPUTIES_PATH):
+        """Return the registry for `path`, reading the file once per process."""
+        key = os.path.abspath(path)
+        if key not in _registries:
+            with open(path) as f:
+                _registries[key] = cls(json.load(f))
+        return _registries[key]
+
+    @classmethod
+    def normalise(cls, name):
+        name = cls.suffix_reg_.sub(' ', name)
+        name = cls.title_reg_.sub('', name.strip())
+        name = name.lower().translate(cls.transliterations_)
+        name = unicodedata.normalize('NFKD', name)
+        name = ''.join(c for c in name if not unicodedata.combining(c))
+        return ' '.join(name.replace('-', ' ').split())
+
+    @staticmethod
+    def _name_variants(name):
+        # ordered, so that lookups don't depend on hash randomisation
+        variants = [name]
+        parts = name.split()
+        if len(parts) > 1:
+            variants.extend(parts)
+        # spellings that drop the umlaut instead of transliterating it
+        variants.extend([v.replace('ae', 'a').replace('oe', 'o').replace('ue', 'u') for v in variants])
+        return list(dict.fromkeys(variants))
+
+    @classmethod
+    def _variants(cls, first, last):
+        for f in cls._name_variants(first):
+            for l in cls._name_variants(last):
+                yield f, l
+
+    def lookup(self, first_name, last_name):
+        first = self.normalise(first_name)
+        last = self.normalise(last_name)
+
+        entry = self._primary.get((first, last))
+        if entry is not None:
+            return entry
+
+        for key in self._variants(first, last):
+            entry = self._primary.get(key, self._secondary.get(key))
+            if entry is _AMBIGUOUS:
+                log.debug("Ambiguous deputy name variant %s", key)
+            elif entry is not None:
+                return entry
+        return None
+
+    def resolve(self, person):
+        """Return the `aw` block for a speaker or absentee groupdict.
+
+        Unresolved persons are appended to `unresolved` once per name.
+        """
+        entry = self.lookup(person['first_name'], person['last_name'])
+        if entry is None:
+            key = (person['first_name'], person['last_name'])
+            if key not in self._unresolved_keys:
+                self._unresolved_keys.add(key)
+                self.unresolved.append(person)
+        return entry
+
+    def pop_unresolved(self):
+        """Return the unresolved persons collected so far and reset the list."""
+        unresolved = self.unresolved
+        self.unresolved = []
+        self._unresolved_keys = set()
+        return unresolved
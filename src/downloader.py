@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import logging
+import threading
+import http.client
+from email.utils import formatdate
+from urllib.parse import urlsplit, urljoin
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import atomic_write
+
+log = logging.getLogger(__name__)
+
+# ETag/Last-Modified of the downloaded files, kept in the data directory
+VALIDATORS_FILE = '.validators.json'
+
+MAX_REDIRECTS = 5
+
+
+class DownloadError(Exception):
+    pass
+
+
+class Downloader(object):
+    """Fetches resources concurrently over persistent HTTP connections.
+
+    Each worker thread keeps one connection per host. Files already on disk
+    are requested conditionally, so unchanged files are answered with a 304
+    and not transferred again. Files are written atomically.
+    """
+
+    def __init__(self, data_dir, workers=8, timeout=30, retries=3, backoff=1.0):
+        self.data_dir = data_dir
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+        if not os.path.isdir(data_dir):
+            os.makedirs(data_dir)
+        self.validators = {}
+        validators_file = os.path.join(data_dir, VALIDATORS_FILE)
+        if os.path.exists(validators_file):
+            with open(validators_file) as f:
+                self.validators = json.load(f)
+
+    def close(self):
+        with self._lock:
+            for c in self._connections:
+                c.close()
+            self._connections = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connection(self, scheme, netloc):
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get((scheme, netloc))
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            conn = connections[(scheme, netloc)] = cls(netloc, timeout=self.timeout)
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _drop_connection(self, scheme, netloc):
+        conn = self._local.connections.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def request(self, url, headers=None):
+        """GET `url`, following redirects and retrying on connection errors and 5xx.
+
+        Returns (status, response, body); the response is already read.
+        """
+        for _ in range(MAX_REDIRECTS):
+            parts = urlsplit(url)
+            path = parts.path + ('?' + parts.query if parts.query else '')
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+                conn = self._connection(parts.scheme, parts.netloc)
+                try:
+                    conn.request('GET', path, headers=headers or {})
+                    resp = conn.getresponse()
+                    body = resp.read()
+                except (http.client.HTTPException, OSError) as e:
+                    log.warning("Request to %s failed (%s), attempt %d", url, e, attempt + 1)
+                    self._drop_connection(parts.scheme, parts.netloc)
+                    continue
+                if resp.will_close:
+                    self._drop_connection(parts.scheme, parts.netloc)
+                if resp.status >= 500:
+                    log.warning("Request to %s returned %s, attempt %d", url, resp.status, attempt + 1)
+                    continue
+                break
+            else:
+                raise DownloadError("Giving up on {} after {} attempts".format(url, self.retries + 1))
+
+            if resp.status in (301, 302, 303, 307, 308) and resp.getheader('Location'):
+                url = urljoin(url, resp.getheader('Location'))
+                continue
+            return resp.status, resp, body
+        raise DownloadError("Too many redirects for {}".format(url))
+
+    def fetch(self, url, filename):
+        """Download `url` to `filename` unless it is unchanged. Returns True if the file was written."""
+        key = os.path.basename(filename)
+        headers = {}
+        if os.path.exists(filename):
+            v = self.validators.get(key, {})
+            if v.get('etag'):
+                headers['If-None-Match'] = v['etag']
+            if v.get('last_modified'):
+                headers['If-Modified-Since'] = v['last_modified']
+            elif not v.get('etag'):
+                headers['If-Modified-Since'] = formatdate(os.path.getmtime(filename), usegmt=True)
+
+        status, resp, body = self.request(url, headers)
+        if status == 304:
+            return False
+        if status != 200:
+            raise DownloadError("{} returned {}".format(url, status))
+
+        atomic_write(filename, body)
+        with self._lock:
+            self.validators[key] = {
+                'etag': resp.getheader('ETag'),
+                'last_modified': resp.getheader('Last-Modified'),
+            }
+        return True
+
+    def fetch_all(self, jobs):
+        """Download (url, filename) pairs concurrently.
+
+        Returns a list of (filename, status) in the order of `jobs`; status is
+        'downloaded', 'unchanged' or the error that occurred.
+        """
+        def fetch_job(job):
+            url, filename = job
+            try:
+                return filename, 'downloaded' if self.fetch(url, filename) else 'unchanged'
+            except (DownloadError, OSError) as e:
+                log.error("Failed to download %s: %s", url, e)
+                return filename, e
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                return list(executor.map(fetch_job, jobs))
+        finally:
+            self.save_validators()
+
+    def save_validators(self):
+        with self._lock:
+            data = json.dumps(self.validators, indent=4, sort_keys=True).encode('utf8')
+        atomic_write(os.path.join(self.data_dir, VALIDATORS_FILE), data)
+
+    def iter_listing(self, url_scheme, extract_links, limit=10):
+        """Walk a paged listing, yielding the links of each page.
+
+        `url_scheme` is formatted with `limit` and `offset`; paging stops at the
+        first page that yields no new links.
+        """
+        seen = set()
+        offset = 0
+        while True:
+            url = url_scheme.format(limit=limit, offset=offset)
+            status, _, body = self.request(url)
+            if status != 200:
+                raise DownloadError("{} returned {}".format(url, status))
+            links = extract_links(body)
+            new_links = [l for l in links if l not in seen]
+            if not new_links:
+                break
+            seen.update(new_links)
+            yield new_links
+            offset += len(links)
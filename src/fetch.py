@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import os
+from urllib.parse import urljoin
+
+from downloader import Downloader
+
+BASE_URL = 'https://www.bundestag.de'
+PLENAR_URL_SCHEME = BASE_URL + '/ajax/filterlist/de/dokumente/protokolle/plenarprotokolle/plenarprotokolle/-/455046/h_121016ea2f478ddcf3be50587d9fa1f8?limit={limit}&noFilterSet=true&offset={offset}'
+DATA_DIR = '/tmp/scraper'
+
+
+def extract_links(data):
+    # bs4 and html5lib are slow to import, only fetching needs them
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(data, "html5lib")
+    return [link['href'] for link in soup.find_all("a")]
+
+
+def scrape_protocols(limit=10, data_dir=DATA_DIR, workers=8, url_scheme=PLENAR_URL_SCHEME, base_url=BASE_URL):
+    """Download every protocol of the listing at `url_scheme` to `data_dir`.
+
+    Returns the paths of the protocols that are available locally.
+    """
+    with Downloader(data_dir, workers=workers) as downloader:
+        jobs = []
+        for links in downloader.iter_listing(url_scheme, extract_links, limit):
+            for href in links:
+                jobs.append((urljoin(base_url, href), os.path.join(data_dir, os.path.basename(href))))
+
+        files = []
+        for filename, status in downloader.fetch_all(jobs):
+            print("File", os.path.basename(filename), status)
+            if os.path.exists(filename):
+                files.append(filename)
+    return files
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import re
+from collections import Counter
+
+from text_span import TextSpan
+
+# A remark in parentheses on lines of its own, e.g. "(Beifall bei der SPD)",
+# wrapped over at most five lines. The regex starts with a literal, so it
+# skips ahead quickly; that the remark starts a line is checked separately.
+REMARK_REG = re.compile(r'\(([^()\n]*(?:\n[^()\n]*){0,4})\)[^\S\n]*(?=\n|\Z)')
+# the parts of a remark, e.g. "Beifall bei der SPD – Zuruf von der LINKEN: Nein!"
+PART_SEP_REG = re.compile(r'\s+[–-]\s+')
+
+REACTIONS = r'Beifall|Zurufe?|Heiterkeit|Lachen|Widerspruch|Zustimmung|Unruhe'
+# the first word naming the reaction, possibly after an adjective ("Lebhafter Beifall")
+TYPE_REG = re.compile(r'(?:\w+\s+){0,2}?(' + REACTIONS + r')\b')
+# between the reactions of one part, e.g. "Heiterkeit und Beifall bei der SPD"
+REACTION_SEP_REG = re.compile(r'\s+(?:und|sowie)\s+(?=(?:\w+\s+){0,2}?(?:' + REACTIONS + r')\b)')
+TYPES = {
+    'Beifall': 'applause',
+    'Zuruf': 'heckle',
+    'Zurufe': 'heckle',
+    'Heiterkeit': 'laughter',
+    'Lachen': 'laughter',
+    'Widerspruch': 'objection',
+    'Zustimmung': 'approval',
+    'Unruhe': 'unrest',
+}
+# a heckle quoted with its speaker, e.g. "Volker Kauder [CDU/CSU]: Unsinn!"
+NAMED_REG = re.compile(r'(?:Abg\.\s+)?(?P<name>[^\[\]:]+?)\s*\[(?P<party>[^\]]+)\]\s*:\s*(?P<text>.*)', re.DOTALL)
+# a named deputy within a reaction, e.g. "Zuruf des Abg. Volker Kauder [CDU/CSU]"
+ABG_REG = re.compile(r'Abg\.\s+(?P<name>[^\[\]]+?)\s*\[(?P<party>[^\]]+)\]')
+
+PARTY_REG = re.compile(r'CDU/CSU|SPD|BÜNDNIS(?:SES)? 90/DIE GRÜNEN|DIE LINKE\b|LINKEN|FDP|AfD')
+# the parties as they are named in the speaker lines
+PARTIES = {
+    'LINKEN': 'DIE LINKE',
+    'BÜNDNISSES 90/DIE GRÜNEN': 'BÜNDNIS 90/DIE GRÜNEN',
+}
+
+
+def _parties(text):
+    parties = []
+    for m in PARTY_REG.finditer(text):
+        party = PARTIES.get(m.group(), m.group())
+        if party not in parties:
+            parties.append(party)
+    return parties
+
+
+def _event(part, offset):
+    part = ' '.join(part.split())
+    m = NAMED_REG.fullmatch(part)
+    if m and not TYPE_REG.match(part):
+        return {'type': 'heckle', 'parties': _parties(m.group('party')), 'speaker': m.group('name'),
+                'offset': offset, 'text': m.group('text')}
+
+    m = TYPE_REG.match(part)
+    if m is None:
+        return None
+    reaction, _, text = part.partition(':')
+    event = {'type': TYPES[m.group(1)], 'parties': _parties(reaction)}
+    named = ABG_REG.search(reaction)
+    if named:
+        event['speaker'] = named.group('name')
+    event['offset'] = offset
+    if text.strip():
+        event['text'] = text.strip()
+    return event
+
+
+def _events(part, offset):
+    """The events of a part, which may name several reactions before the text of a heckle."""
+    part = ' '.join(part.split())
+    reaction, colon, text = part.partition(':')
+    reactions = REACTION_SEP_REG.split(reaction)
+    if len(reactions) == 1 or not TYPE_REG.match(part):
+        reactions = [part]
+    else:
+        reactions[-1] += colon + text
+    return [e for e in (_event(r, offset) for r in reactions) if e is not None]
+
+
+def extract_interjections(speech):
+    """The reactions in the remarks of a speech, in one scan over it.
+
+    Returns a list of events with the `type` of the reaction (applause,
+    heckle, laughter, objection, approval or unrest), the reacting
+    `parties`, the `offset` of the remark in the speech and, if given, the
+    `speaker` and `text` of a heckle. A remark may hold several events, also
+    within one part like "Heiterkeit und Beifall bei der SPD"; remarks that
+    aren't reactions, e.g. "(Drucksache 18/1234)", are skipped.
+    """
+    if isinstance(speech, TextSpan):
+        text, pos, endpos = speech.text, speech.start, speech.end
+    else:
+        text, pos, endpos = speech, 0, len(speech)
+
+    events = []
+    for m in REMARK_REG.finditer(text, pos, endpos):
+        start = m.start()
+        line_start = text.rfind('\n', 0, start) + 1
+        if text[line_start:start].strip():
+            continue
+        for part in PART_SEP_REG.split(m.group(1)):
+            events.extend(_events(part, start - pos))
+    return events
+
+
+def count_reactions(events):
+    """Number of events per type, in the order the types first occur."""
+    return dict(Counter(e['type'] for e in events))
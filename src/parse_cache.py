@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import os
+import zlib
+import pickle
+import hashlib
+import logging
+
+from utils import atomic_write
+
+log = logging.getLogger(__name__)
+
+CACHE_SUFFIX = '.pickle.z'
+
+
+class ParseCache(object):
+    """Content-addressed, size-bounded store for parse results.
+
+    Entries are keyed on the SHA-256 of the transcript plus `version`, so a
+    changed transcript or parser never hits a stale entry. Values are pickled
+    and zlib-compressed; the least recently used entries are evicted once the
+    cache grows beyond `max_bytes`.
+    """
+
+    def __init__(self, directory, version, max_bytes=256 * 2**20):
+        self.directory = directory
+        self.version = str(version)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._size = sum(e.stat().st_size for e in os.scandir(directory) if e.name.endswith(CACHE_SUFFIX))
+
+    def key(self, file):
+        h = hashlib.sha256(self.version.encode('utf8') + b'\0')
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(2**16), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError):
+            log.warning("Dropping unreadable cache entry %s", path)
+            self._remove(path)
+            self.misses += 1
+            return None
+        # mark as recently used for eviction
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        path = self._path(key)
+        if os.path.exists(path):
+            self._size -= os.path.getsize(path)
+        atomic_write(path, data)
+        self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.unlink(path)
+            self._size -= size
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        entries = sorted((e for e in os.scandir(self.directory) if e.name.endswith(CACHE_SUFFIX)),
+                         key=lambda e: e.stat().st_mtime)
+        for e in entries:
+            if self._size <= self.max_bytes:
+                break
+            log.debug("Evicting cache entry %s", e.name)
+            self._remove(e.path)
@@ -1,17 +1,27 @@
 # -*- coding: utf-8 -*-
+import os
 import re
+import mmap
 import glob
+import heapq
+import bisect
 import itertools
+from collections import Counter
 from datetime import datetime
-import copy
 import logging
 from utils import pairwise
-import json
+from deputy_registry import DeputyRegistry
+from text_span import TextSpan
+from records import SpeakerTable, Contribution
+from timings import Timings
+import scanner
+from scanner import scan_transcript
+
+# bump whenever the output of `parse_plenar_transcript` changes, this
+# invalidates cached parse results
+PARSER_VERSION = 5
 
 log = logging.getLogger(__name__)
-FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-logging.basicConfig(format=FORMAT)
-log.setLevel(logging.DEBUG)
 
 class Regex:
     absentee_reg_ = re.compile(r'^(?P<last_name>[\w-]+)(?: \((?P<electorate>\w+)\))?, ' +
@@ -35,6 +45,18 @@ class Regex:
         #re.compile(r'((?:Zusatz|Tagesordnungs)punkt[ens]*) (\d+(?: \w+)?) sowie (?:zum|zu den)? ((?:Zusatz|Tagesordnungs)punkt[ens]*) (\d+(?: \w+)?)'),
     ]
 
+    agenda_types_ = {
+        'tagesordnungspunkt': 'tagesordnungspunkt',
+        'tagesordnung': 'tagesordnungspunkt',
+        'zusatzpunkt': 'zusatzpunkt',
+        'zusatztagesordnungspunkt': 'zusatzpunkt',
+        'zp': 'zusatzpunkt',
+    }
+
+    agenda_plural_reg_ = re.compile(r'punkt[ens]+$')
+
+    agenda_range_reg_ = re.compile(r'^(\d+)([a-z]?)$')
+
     session_reg_ = re.compile(r'\n\s*(\d+)\.\s*Sitzung\s*\n')
 
     date_reg_ = re.compile(r'\nBerlin,\s\w+,\sden\s(\d+)\.\s*([^\s]+)\s*(\d+)\s*\n')
@@ -45,6 +67,22 @@ class Regex:
     end_time_reg_ = re.compile(r'\n\(Schluss:\s*(\d+)[.:](\d+).*Uhr\)\.?\s*\n')
     end_split_reg_ = re.compile(r'\n\(Schluss:\s*\d+[.:]\d+.*Uhr\)\.?\s*\n')
 
+    agenda_summary_start_reg_ = re.compile(r'\n(Zusatztagesordnungspunkt|Tagesordnungspunkt)\s*(\d+)*:?\n')
+
+    # (kind, regex) of the lines that end an agenda summary
+    agenda_summary_end_regs_ = [
+        (scanner.AGENDA, agenda_summary_start_reg_),
+        (scanner.ANNEX, re.compile(r'\nAnlage\s*\d*\s*\n')),
+        (scanner.NUMBERED, re.compile(r'\n\d+\.\sSitzung\s*\n')),
+        (scanner.NOTICES, re.compile(r'\nAmtliche Mitteilungen\s*\n')),
+    ]
+
+    steno_reference_reg_ = re.compile(r'\n\s*\d{5}\s[ABCD]{1}\s*(?:\n|$)')
+
+    excused_start_reg_ = re.compile(r'\nAnlage\s\d+\s*\n\s*Liste der entschuldigten Abgeordneten')
+    excused_end_reg_ = re.compile(r'\nAnlage\s\d+')
+    page_footer_ = 'Deutscher Bundestag –'
+
     @staticmethod
     def strip_dict(groups):
         for k, v in groups.items():
@@ -55,6 +93,45 @@ class Regex:
                 groups[k] = v
         return groups
 
+    @staticmethod
+    def agenda_matches(text, pos, endpos):
+        """Matches of all `agenda_regs_` in text[pos:endpos], ordered by their start.
+
+        Each pattern is run on its own: an alternation of them has no literal
+        prefix and is several times slower. Matches overlapping an earlier
+        one are dropped, like in an alternation; on equal starts the first
+        pattern wins.
+        """
+        last_end = pos
+        for m in heapq.merge(*(r.finditer(text, pos, endpos) for r in Regex.agenda_regs_), key=lambda m: m.start()):
+            if m.start() >= last_end:
+                last_end = m.end()
+                yield m
+
+    @staticmethod
+    def agenda_type(s):
+        return Regex.agenda_types_.get(Regex.agenda_plural_reg_.sub('punkt', s.lower()))
+
+    @staticmethod
+    def agenda_id(s):
+        return ''.join(s.split()).lower() if s is not None else None
+
+    @staticmethod
+    def agenda_ids(groups):
+        """Normalised ids of an agenda match, e.g. ('..', '28 a', 'bis', '28 c') -> ['28a', '28b', '28c']."""
+        first = Regex.agenda_id(groups[1])
+        if len(groups) < 4 or groups[3] is None:
+            return [first]
+        last = Regex.agenda_id(groups[3])
+        if groups[2] == 'bis':
+            m0 = Regex.agenda_range_reg_.match(first)
+            m1 = Regex.agenda_range_reg_.match(last)
+            if m0 and m1 and m0.group(2) and m1.group(2) and m0.group(1) == m1.group(1):
+                return [m0.group(1) + chr(c) for c in range(ord(m0.group(2)), ord(m1.group(2)) + 1)]
+            if m0 and m1 and not m0.group(2) and not m1.group(2):
+                return [str(i) for i in range(int(m0.group(1)), int(m1.group(1)) + 1)]
+        return [first, last]
+
     @staticmethod
     def remove_nones(groups):
         return tuple([v for v in groups if v is not None])
@@ -66,11 +143,27 @@ class Regex:
             g.append(v.strip())
         return tuple(g)
 
-def parse_metadata(text):
-    session = Regex.session_reg_.findall(text)[0]
-    date = Regex.date_reg_.findall(text)[0]
-    start = Regex.start_time_reg_.findall(text)[0]
-    end = Regex.end_time_reg_.findall(text)[0]
+def end_of(text, pos=0, endpos=None):
+    """Position at which `$` matches in text[pos:endpos]."""
+    endpos = len(text) if endpos is None else endpos
+    if endpos > pos and text[endpos-1] == '\n':
+        return endpos - 1
+    return endpos
+
+def parse_metadata(text, events=None):
+    if events is None:
+        events = scan_transcript(text)
+
+    def first_groups(kind, regex):
+        m = events.first(kind, regex)
+        if m is None:
+            raise IndexError("no match for {}".format(regex.pattern))
+        return m.groups()
+
+    session = first_groups(scanner.SESSION, Regex.session_reg_)[0]
+    date = first_groups(scanner.DATE, Regex.date_reg_)
+    start = first_groups(scanner.BEGIN, Regex.start_time_reg_)
+    end = first_groups(scanner.END, Regex.end_time_reg_)
 
     month_map = {
         'Januar': 1,
@@ -94,7 +187,13 @@ def parse_metadata(text):
         'end_time': "{}:{}".format(end[0], end[1])
     }
 
-def parse_contributions(text):
+def parse_contributions(text, registry=None, events=None, pos=0, endpos=None, speakers=None):
+    """Split text[pos:endpos] into contributions; offsets are relative to `pos`.
+
+    The contributions are `Contribution` records whose speeches are
+    `TextSpan`s of `text`, not copies. Speakers are interned in `speakers`,
+    a new `SpeakerTable` unless one is given, and resolved once each.
+    """
     def is_invalid(s):
         tests = [
             s['first_name'][0].isupper(),
@@ -103,65 +202,116 @@ def parse_contributions(text):
             len(s['last_name']) >= 2
         ]
         if not all(tests):
-            log.debug("Discarting invalid contribution {}".format(s))
+            log.debug("Discarting invalid contribution %s", s)
 
         # itertools.filterfalse() returns list of items where the predicate returns
         # false, hence the inverse logic
         return not all(tests)
 
-    end = re.search(r'$', text)
-    
-    speakers = itertools.filterfalse(lambda x: is_invalid(x.groupdict()), Regex.speaker_reg_.finditer(text))
+    if events is None:
+        events = scan_transcript(text)
+    end = end_of(text, pos, endpos)
 
-    # TODO: remove/fix
-    aw_data = ''
-    with open('../data/deputies.json') as f:
-        aw_data = f.read()
-    aw_data = json.loads(aw_data)
+    matches = itertools.filterfalse(lambda x: is_invalid(x.groupdict()),
+                                     events.finditer(scanner.SPEAKER, Regex.speaker_reg_, pos, endpos))
+    bounds = itertools.chain(((m, m.start()) for m in matches), [(None, end)])
 
+    if registry is None:
+        registry = DeputyRegistry.load()
+
+    if speakers is None:
+        speakers = SpeakerTable()
+
+    def resolve(person):
+        return match_abgeordnetenwatch(person, registry)
 
     contributions = []
-    for m, m1 in pairwise(itertools.chain(speakers, [end])):
-        contrib = {
-            'speaker': match_abgeordnetenwatch(m.groupdict(), aw_data),
-            'start_idx': m.start(),
-            'end_idx': m1.start(),
-            'speech': text[m.end():m1.start()]
-        }
-        contributions.append(contrib)
+    for (m, start), (_, next_start) in pairwise(bounds):
+        speaker_id, speaker = speakers.intern(m.groupdict(), resolve)
+        contributions.append(Contribution(speaker, speaker_id, start - pos, next_start - pos,
+                                          TextSpan(text, m.end(), next_start)))
     return contributions
 
 
 def inject_agenda_items(contributions, agenda_items):
-    def is_speaker_in_range(t, c):
-        return 'speaker' in c and (c['start_idx'] <= t['start_idx'] and c['end_idx'] >= t['start_idx'])
-    
-    contrib_agenda = copy.deepcopy(contributions)
-
-    # add dummy elements in list of speakers for new topics
-    for t in agenda_items:
-        i, c = next(((i, c) for i, c in enumerate(contrib_agenda) if is_speaker_in_range(t, c)), (None, None))
-        if i is not None:
-            c0 = copy.deepcopy(c)
-            c0['speech'] = c0['speech'][:t['start_idx']-c0['start_idx']]
+    """Split the contributions at the start of each agenda item and insert the item.
+
+    `contributions` must be in text order, as returned by `parse_contributions`.
+    Topics are merged in a single pass ordered by `start_idx`; topics starting
+    at the same index end up in reverse order, as they did when each topic was
+    spliced into the list separately. Only the split contributions are copied.
+    """
+    order = sorted(range(len(agenda_items)), key=lambda i: (agenda_items[i]['start_idx'], -i))
+    unmatched = []
+
+    contrib_agenda = []
+    k = 0
+    for c in contributions:
+        if 'speaker' not in c:
+            contrib_agenda.append(c)
+            continue
+
+        # topics before this contribution (e.g. before the first speaker) can't be placed
+        while k < len(order) and agenda_items[order[k]]['start_idx'] < c['start_idx']:
+            unmatched.append(order[k])
+            k += 1
+
+        if k == len(order) or agenda_items[order[k]]['start_idx'] > c['end_idx']:
+            contrib_agenda.append(c)
+            continue
+
+        # add dummy elements in list of speakers for new topics
+        cut = c['start_idx']
+        while k < len(order) and agenda_items[order[k]]['start_idx'] <= c['end_idx']:
+            t = agenda_items[order[k]]
+            c0 = c.copy()
+            c0['speech'] = c['speech'][cut-c['start_idx']:t['start_idx']-c['start_idx']]
+            c0['start_idx'] = cut
             c0['end_idx'] = t['start_idx']
-            c1 = copy.deepcopy(c)
-            c1['speech'] = c1['speech'][t['start_idx']-c0['start_idx']:]
-            c1['start_idx'] += t['start_idx']-c0['start_idx']
-            del contrib_agenda[i]
-            contrib_agenda[i:i] = [c0, t, c1]
-        else:
-            log.warn("couldn't find contribution for topic ({}, {})".format(t['type'], t['id']))
+            contrib_agenda.append(c0)
+            contrib_agenda.append(t)
+            cut = t['start_idx']
+            k += 1
+        c1 = c.copy()
+        c1['speech'] = c['speech'][cut-c['start_idx']:]
+        c1['start_idx'] = cut
+        contrib_agenda.append(c1)
+
+    unmatched.extend(order[k:])
+    for i in sorted(unmatched):
+        t = agenda_items[i]
+        log.warning("couldn't find contribution for topic (%s, %s)", t['type'], t['id'])
     return contrib_agenda
 
-def parse_excused(text):
-    # FIX: look for regex call that can return the last `match` object.
-    #      .search returns the first match
-    #      .findall returns just the matched strings
-    for start in re.finditer(r'\nAnlage\s\d+\s*\n\s*Liste der entschuldigten Abgeordneten', text): pass
-    end = re.search(r'\nAnlage\s\d+|\s*\d+\s+Deutscher Bundestag –', text[start.end():])
-    
-    text_slice = text[start.end(): end.start()+start.end()]
+def parse_excused(text, events=None, pos=0):
+    """Parse the (last) list of excused deputies in text[pos:]."""
+    if events is None:
+        events = scan_transcript(text)
+
+    start = events.last(scanner.ANNEX, Regex.excused_start_reg_, pos)
+    if start is None:
+        raise ValueError("no list of excused deputies found")
+
+    # the list ends with the next annex or the next page footer
+    end = events.first(scanner.ANNEX, Regex.excused_end_reg_, start.end())
+    end = end.start() if end is not None else None
+    footer = text.find(Regex.page_footer_, start.end())
+    while footer != -1 and (end is None or footer < end):
+        # a footer is preceded by whitespace, the page number and more whitespace
+        i = footer
+        while i > start.end() and text[i-1].isspace():
+            i -= 1
+        j = i
+        while j > start.end() and text[j-1].isdecimal():
+            j -= 1
+        if i < footer and j < i:
+            while j > start.end() and text[j-1].isspace():
+                j -= 1
+            end = j if end is None else min(end, j)
+            break
+        footer = text.find(Regex.page_footer_, footer + 1)
+
+    text_slice = text[start.end():end]
 
     excused = [m.groupdict() for m in re.finditer(Regex.absentee_reg_, text_slice)]
 
@@ -170,100 +320,190 @@ def parse_excused(text):
     return excused, excused_reasons
 
 
-# TODO: refactor
-def parse_agenda_summaries(text):
-    start_delimiter = r'\n(Zusatztagesordnungspunkt|Tagesordnungspunkt)\s*(\d+)*:?\n'
-    end_delimiters = [
-        start_delimiter,
-        r'\nAnlage\s*\d*\s*\n',
-        r'\n\d+\.\sSitzung\s*\n',
-        r'\nAmtliche Mitteilungen\s*\n'
-    ]
+def parse_agenda_summaries(text, events=None, pos=0, endpos=None):
+    """Parse the agenda item summaries in the preamble text[pos:endpos].
 
-    agenda_summary_reg = re.compile(start_delimiter + '(.*?(?=(?:' 
-                        + '|'.join(end_delimiters) + ')|$))', re.DOTALL)
+    A summary runs from its header to the next header, annex, session
+    heading or official notices, whichever comes first.
+    """
+    if events is None:
+        events = scan_transcript(text)
+    endpos = len(text) if endpos is None else endpos
 
-    steno_reference_reg_ = re.compile(r'\n\s*\d{5}\s[ABCD]{1}\s*(?:\n|$)')
+    ends = sorted(m.start()
+                  for kind, regex in Regex.agenda_summary_end_regs_
+                  for nl in events.positions(kind, pos, endpos)
+                  for m in [regex.match(text, nl, endpos)] if m)
 
     summaries = []
-    for s in re.finditer(agenda_summary_reg, text):
-        agenda_summary = steno_reference_reg_.sub('\n', s.groups()[2])
+    last_end = pos
+    while True:
+        s = events.first(scanner.AGENDA, Regex.agenda_summary_start_reg_, last_end, endpos)
+        if s is None:
+            break
+        i = bisect.bisect_left(ends, s.end())
+        last_end = ends[i] if i < len(ends) else end_of(text, s.end(), endpos)
+
+        agenda_summary = Regex.steno_reference_reg_.sub('\n', text[s.end():last_end])
 
         summaries.append({
             'type': s.groups()[0],
             'id': s.groups()[1],
             'summary': agenda_summary
-        })        
+        })
     return summaries
 
-def parse_agenda_debate(text, summaries):
-    def is_tagesordnung(s):
-        return s.lower() in ['tagesordnungspunkt', 'tagesordnung']
+def parse_agenda_debate(text, summaries, pos=0, endpos=None):
+    """Find the start and end of the debate for each agenda item in text[pos:endpos].
 
-    def is_zusatz(s):
-        return s.lower() in ['zusatzpunkt', 'zusatztagesordnungspunkt', 'zp', 'zusatzpunkte']
+    The matches of `Regex.agenda_regs_` are merged in order; the debate of an
+    item ends where the next agenda item is called. Topics are looked up by
+    (canonical type, normalised id), ranges like "28 a bis 28 c" are expanded.
+    Offsets are relative to `pos`.
+    """
+    topics = [dict(s) for s in summaries]
 
-    def is_same_type(s, t):
-        return (is_tagesordnung(s) and is_tagesordnung(t)) or (is_zusatz(s) and is_zusatz(t))
-    
-    
-    topics = copy.deepcopy(summaries)
-    
-    for r in Regex.agenda_regs_:
-        agenda_discussions = r.finditer(text)
-        for t, t1 in pairwise(itertools.chain(agenda_discussions, [re.search('$', text)])):
-            # now we need to match the topic summaries with the debate
-            # Hopefully, the summaries will contain the type of topic
-            # in group 0 and the topic id in group 1.
-            log.debug("processing debate item {}".format((t.groups(), t, r)))
-            s = next((s for s in topics if is_same_type(s['type'], t.groups()[0]) and (s['id'] == t.groups()[1])), None)
+    index = {}
+    for s in topics:
+        key = (Regex.agenda_type(s['type']), Regex.agenda_id(s['id']))
+        index.setdefault(key, s)
+
+    endpos = len(text) if endpos is None else endpos
+    agenda_discussions = ((t, t.start(), t.end()) for t in Regex.agenda_matches(text, pos, endpos))
+    end = end_of(text, pos, endpos)
+    for (t, _, t_end), (_, t1_start, _) in pairwise(itertools.chain(agenda_discussions, [(None, end, end)])):
+        groups = t.groups()
+        log.debug("processing debate item %s %s", groups, t)
+        agenda_type = Regex.agenda_type(groups[0])
+        for agenda_id in Regex.agenda_ids(groups):
+            s = index.get((agenda_type, agenda_id))
             if not s:
-                log.warn('Could not match debate item to any agenda items {}'.format(t.groups()))
+                log.warning('Could not match debate item to any agenda items %s', groups)
             else:
-                s['start_idx'] = t.end()
-                s['end_idx'] = t1.start()
+                s['start_idx'] = t_end - pos
+                s['end_idx'] = t1_start - pos
     for s in topics:
         if not 'start_idx' in s:
             s['start_idx'] = -1
             s['end_idx'] = -1
-            log.warn("No debate found for agenda item: ({}, {}). Setting 'start_idx' and 'end_idx' to default values".format(s['type'], s['id']))
+            log.warning("No debate found for agenda item: (%s, %s). Setting 'start_idx' and 'end_idx' to default values", s['type'], s['id'])
 
     return topics
 
-def match_abgeordnetenwatch(person, aw_data):
-    for p in aw_data["profiles"]:
-        if p['personal']['first_name'] == person['first_name'] and p['personal']['last_name'] == person['last_name']:
-            person['aw'] = {
-                'image_url': p['personal']['picture']['url'],
-                'uuid': p['meta']['uuid'],
-            }
-            break
+def match_abgeordnetenwatch(person, registry):
+    aw = registry.resolve(person)
+    if aw is not None:
+        person['aw'] = aw
     return person
     
-def split_plenum(text):
-    preamble, rest = re.split(Regex.start_split_reg_, text)
-    debate, postamble = re.split(Regex.end_split_reg_, rest)
-        
-    return preamble, debate, postamble
+def plenum_bounds(text, events=None):
+    """Offsets of (preamble end, debate start, debate end, postamble start).
+
+    The debate is delimited by the single "Beginn" and "Schluss" lines.
+    """
+    if events is None:
+        events = scan_transcript(text)
+
+    begin = list(events.finditer(scanner.BEGIN, Regex.start_split_reg_))
+    if len(begin) != 1:
+        raise ValueError("expected one start of session, found {}".format(len(begin)))
+    end = list(events.finditer(scanner.END, Regex.end_split_reg_, begin[0].end()))
+    if len(end) != 1:
+        raise ValueError("expected one end of session, found {}".format(len(end)))
+    return begin[0].start(), begin[0].end(), end[0].start(), end[0].end()
+
+def split_plenum(text, events=None):
+    preamble_end, debate_start, debate_end, postamble_start = plenum_bounds(text, events)
+    return text[:preamble_end], text[debate_start:debate_end], text[postamble_start:]
 
 def sanitise_transcript(text):
-    return text.replace(u"\xa0", " ")
-
-def parse_plenar_transcript(file):
-    log.info("Parsing transcript {}".format(file))
-    text = ''
-    with open(file, 'r') as f: 
-        text = sanitise_transcript(f.read())
-    
-    metadata = parse_metadata(text)
-
-    preamble, debate, postamble = split_plenum(text)
-    
-    agenda_summary = parse_agenda_summaries(preamble)
-    agenda_items = parse_agenda_debate(debate, agenda_summary)
-    contributions = parse_contributions(debate)
-    contrib_agenda = inject_agenda_items(contributions, agenda_items)
-    
-    excused, excused_reasons = parse_excused(postamble)
+    # only copy the text if there is something to replace
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if u"\xa0" in text:
+        text = text.replace(u"\xa0", " ")
+    return text
+
+def read_transcript(file, encoding='utf-8'):
+    """Decode a transcript file, file object or bytes.
+
+    Files are decoded straight from a memory map; file objects may be
+    binary or text.
+    """
+    if isinstance(file, (bytes, bytearray, memoryview)):
+        return sanitise_transcript(str(file, encoding))
+    if hasattr(file, 'read'):
+        data = file.read()
+        return sanitise_transcript(data if isinstance(data, str) else str(data, encoding))
+    with open(file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ''
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return sanitise_transcript(str(m, encoding))
+
+def parse_plenar_transcript(file, registry=None, timings=None, speakers=None, text=None):
+    """Parse a transcript file, file object or bytes.
+
+    If `text` is given, as str or bytes, it is parsed instead and `file`
+    only names the transcript in the log. The speeches of the contributions
+    are `TextSpan`s into the sanitised text of the transcript, which is held
+    in memory once. If `timings` is given, the wall time, matches and
+    characters of every stage are recorded in it. Pass a `SpeakerTable` as
+    `speakers` to share the speakers between transcripts.
+    """
+    if text is None and not isinstance(file, (str, os.PathLike)):
+        log.info("Parsing transcript %s", getattr(file, 'name', '<{}>'.format(type(file).__name__)))
+    else:
+        log.info("Parsing transcript %s", file)
+    if timings is None:
+        timings = Timings()
+
+    with timings.stage('read_transcript') as record:
+        if text is None:
+            text = read_transcript(file)
+        elif isinstance(text, str):
+            text = sanitise_transcript(text)
+        else:
+            text = read_transcript(text)
+        record['chars'] = len(text)
+
+    with timings.stage('scan_transcript', len(text)) as record:
+        events = scan_transcript(text)
+        record['matches'] = len(events)
+
+    # these two stages match a fixed set of lines or fail, they record no matches
+    with timings.stage('parse_metadata', len(text)):
+        metadata = parse_metadata(text, events)
+
+    with timings.stage('split_plenum', len(text)):
+        preamble_end, debate_start, debate_end, postamble_start = plenum_bounds(text, events)
+
+    with timings.stage('parse_agenda_summaries', preamble_end) as record:
+        agenda_summary = parse_agenda_summaries(text, events, 0, preamble_end)
+        record['matches'] = len(agenda_summary)
+
+    with timings.stage('parse_agenda_debate', debate_end - debate_start) as record:
+        agenda_items = parse_agenda_debate(text, agenda_summary, debate_start, debate_end)
+        record['matches'] = sum(1 for t in agenda_items if t['start_idx'] != -1)
+
+    with timings.stage('parse_contributions', debate_end - debate_start) as record:
+        contributions = parse_contributions(text, registry, events, debate_start, debate_end, speakers)
+        record['matches'] = len(contributions)
+
+    with timings.stage('inject_agenda_items') as record:
+        contrib_agenda = inject_agenda_items(contributions, agenda_items)
+        record['matches'] = sum(1 for c in contrib_agenda if 'speaker' not in c)
+
+    with timings.stage('parse_interjections', debate_end - debate_start) as record:
+        reactions = Counter()
+        for c in contrib_agenda:
+            if 'speaker' in c:
+                reactions.update(c['reactions'])
+        metadata['reactions'] = dict(reactions)
+        record['matches'] = sum(reactions.values())
+
+    with timings.stage('parse_excused', len(text) - postamble_start) as record:
+        excused, excused_reasons = parse_excused(text, events, postamble_start)
+        record['matches'] = len(excused)
 
     return metadata, agenda_summary, contrib_agenda, excused
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from collections.abc import Mapping
+
+from text_span import TextSpan
+from interjections import extract_interjections, count_reactions
+
+
+class SpeakerTable(object):
+    """Interns speakers, so that every distinct speaker is one dict with an integer id.
+
+    A table is made per transcript by `parse_contributions`; pass one to
+    several parses to share it between sessions.
+    """
+
+    def __init__(self):
+        self.speakers = []
+        self._ids = {}
+
+    def intern(self, groupdict, resolve=None):
+        """(id, speaker) for a speaker `groupdict`; `resolve` is called once per new speaker."""
+        key = tuple(groupdict.items())
+        i = self._ids.get(key)
+        if i is None:
+            i = self._ids[key] = len(self.speakers)
+            self.speakers.append(resolve(groupdict) if resolve is not None else groupdict)
+        return i, self.speakers[i]
+
+    def __len__(self):
+        return len(self.speakers)
+
+
+class Contribution(Mapping):
+    """A contribution of `parse_contributions`, as a compact record.
+
+    Reads like the former dict with the keys `speaker`, `start_idx`,
+    `end_idx` and `speech`, plus the `interjections` of the speech and
+    their `reactions` counts. The speaker is the interned dict of a
+    `SpeakerTable` and the speech is kept as offsets into the transcript.
+    The interjections are extracted on first access, and again after the
+    speech is replaced.
+    """
+    __slots__ = ('speaker', 'speaker_id', 'start_idx', 'end_idx', '_text', '_speech_start', '_speech_end',
+                 '_interjections')
+    _keys = ('speaker', 'start_idx', 'end_idx', 'speech', 'interjections', 'reactions')
+
+    def __init__(self, speaker, speaker_id, start_idx, end_idx, speech):
+        self.speaker = speaker
+        self.speaker_id = speaker_id
+        self.start_idx = start_idx
+        self.end_idx = end_idx
+        self.speech = speech
+
+    @property
+    def speech(self):
+        if self._speech_start is None:
+            return self._text
+        return TextSpan(self._text, self._speech_start, self._speech_end)
+
+    @speech.setter
+    def speech(self, speech):
+        if isinstance(speech, TextSpan):
+            self._text, self._speech_start, self._speech_end = speech.text, speech.start, speech.end
+        else:
+            self._text, self._speech_start, self._speech_end = speech, None, None
+        self._interjections = None
+
+    @property
+    def interjections(self):
+        if self._interjections is None:
+            self._interjections = extract_interjections(self.speech)
+        return self._interjections
+
+    @property
+    def reactions(self):
+        return count_reactions(self.interjections)
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in ('start_idx', 'end_idx', 'speech'):
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return 'Contribution({!r})'.format(dict(self))
+
+    def copy(self):
+        return Contribution(self.speaker, self.speaker_id, self.start_idx, self.end_idx, self.speech)
+
+    def __getstate__(self):
+        return (self.speaker, self.speaker_id, self.start_idx, self.end_idx,
+                self._text, self._speech_start, self._speech_end, self._interjections)
+
+    def __setstate__(self, state):
+        (self.speaker, self.speaker_id, self.start_idx, self.end_idx,
+         self._text, self._speech_start, self._speech_end, self._interjections) = state
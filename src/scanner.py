@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import re
+import bisect
+
+# Kinds of lines recorded by `scan_transcript`. Lines of the "column 0" kinds
+# start right after a newline; the others may be preceded by whitespace.
+SESSION = 'session'     # line starting with a number, e.g. "221. Sitzung"
+NUMBERED = 'numbered'   # same, in column 0
+DATE = 'date'           # "Berlin, Donnerstag, den ..."
+BEGIN = 'begin'         # "Beginn: 9.00 Uhr"
+END = 'end'             # "(Schluss: 12.00 Uhr)"
+AGENDA = 'agenda'       # "Tagesordnungspunkt 1:" headers of the agenda summary
+ANNEX = 'annex'         # "Anlage 1"
+NOTICES = 'notices'     # "Amtliche Mitteilungen"
+SPEAKER = 'speaker'     # lines ending with a colon, e.g. "Anna Muster (SPD):"
+
+COLUMN0_PREFIXES = (
+    (BEGIN, 'Beginn:'),
+    (END, '(Schluss:'),
+    (DATE, 'Berlin,'),
+    (ANNEX, 'Anlage'),
+    (AGENDA, 'Tagesordnungspunkt'),
+    (AGENDA, 'Zusatztagesordnungspunkt'),
+    (NOTICES, 'Amtliche Mitteilungen'),
+)
+
+
+class TranscriptEvents(object):
+    """Candidate positions of the structural lines of a transcript.
+
+    `scan_transcript` records, per kind, every line that could start a match
+    of the corresponding regex. The parser stages then only try their regexes
+    at those positions (`finditer`, `first`, `last`), which gives the same
+    matches as running the regex over the whole text.
+
+    Column 0 kinds store the position of the newline before the line. The
+    other kinds store (first newline of the preceding whitespace, first
+    non-whitespace character), since their regexes start with `\\n\\s*`.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.events = {SESSION: [], NUMBERED: [], DATE: [], BEGIN: [], END: [],
+                       AGENDA: [], ANNEX: [], NOTICES: [], SPEAKER: []}
+        # content positions of the whitespace-prefixed kinds, for bisect
+        self._keys = {}
+
+    def __len__(self):
+        return sum(len(events) for events in self.events.values())
+
+    def positions(self, kind, pos=0, endpos=None):
+        """Newline positions of the column 0 `kind` lines within [pos, endpos)."""
+        events = self.events[kind]
+        lo = bisect.bisect_left(events, pos)
+        hi = len(events) if endpos is None else bisect.bisect_left(events, endpos)
+        return events[lo:hi]
+
+    def finditer(self, kind, regex, pos=0, endpos=None):
+        """Same as `regex.finditer(text, pos, endpos)`, trying only the `kind` lines.
+
+        `regex` must start with a newline (followed by `\\s*` for the
+        whitespace-prefixed kinds).
+        """
+        text = self.text
+        endpos = len(text) if endpos is None else endpos
+        last_end = pos
+
+        if kind in (SESSION, SPEAKER):
+            events = self.events[kind]
+            if kind not in self._keys:
+                self._keys[kind] = [content for _, content in events]
+            for run_start, content in events[bisect.bisect_left(self._keys[kind], pos):]:
+                if content >= endpos:
+                    break
+                # a match from a later newline in the same whitespace run
+                # implies one from an earlier newline, so only try the first
+                start = run_start if run_start >= last_end else text.find('\n', last_end, content)
+                if start == -1:
+                    continue
+                m = regex.match(text, start, endpos)
+                if m:
+                    last_end = m.end()
+                    yield m
+        else:
+            for nl in self.positions(kind, pos, endpos):
+                if nl < last_end:
+                    continue
+                m = regex.match(text, nl, endpos)
+                if m:
+                    last_end = m.end()
+                    yield m
+
+    def first(self, kind, regex, pos=0, endpos=None):
+        return next(self.finditer(kind, regex, pos, endpos), None)
+
+    def last(self, kind, regex, pos=0, endpos=None):
+        """Last match of a regex whose matches can't overlap (column 0 kinds only)."""
+        for nl in reversed(self.positions(kind, pos, endpos)):
+            m = regex.match(self.text, nl, len(self.text) if endpos is None else endpos)
+            if m:
+                return m
+        return None
+
+
+# The whitespace run before every line starting with a column 0 prefix or a
+# digit, and every colon that ends a line. Both start with a literal, which
+# lets the regex engine skip ahead with a fast substring search; a single
+# alternation of the two is scanned character by character and much slower.
+LINE_REG = re.compile(r'\n\s*(?={}|\d)'.format('|'.join(re.escape(prefix) for _, prefix in COLUMN0_PREFIXES)))
+COLON_REG = re.compile(r':[^\S\n]*(?=\n)')
+
+WHITESPACE_REG = re.compile(r'\s*')
+
+
+def scan_transcript(text):
+    """Scan the transcript and record its structural lines."""
+    events = TranscriptEvents(text)
+    column0 = [(prefix, events.events[kind]) for kind, prefix in COLUMN0_PREFIXES]
+    session, numbered, speaker = events.events[SESSION], events.events[NUMBERED], events.events[SPEAKER]
+
+    for m in LINE_REG.finditer(text):
+        run_start, content = m.span()
+        decimal = text[content].isdecimal()
+        if text[content-1] == '\n':
+            for prefix, kind_events in column0:
+                if text.startswith(prefix, content):
+                    kind_events.append(content - 1)
+                    break
+            if decimal:
+                numbered.append(content - 1)
+        if decimal:
+            session.append((run_start, content))
+
+    for m in COLON_REG.finditer(text):
+        # find where the content of the line and the whitespace run before it start
+        line_start = text.rfind('\n', 0, m.start()) + 1
+        if line_start == 0:
+            continue
+        content = WHITESPACE_REG.match(text, line_start).end()
+        i = line_start - 1
+        while i >= 0 and text[i].isspace():
+            i -= 1
+        speaker.append((text.find('\n', i + 1), content))
+
+    return events
@@ -1,81 +1,195 @@
-from urllib.request import urlopen
 import os
-from bs4 import BeautifulSoup
-from APIMocker import APIMocker
-from plenar_parser import parse_plenar_transcript
-from collections import Counter
-import glob
-
-BASE_URL = 'https://www.bundestag.de'
-PLENAR_URL_SCHEME = BASE_URL + '/ajax/filterlist/de/dokumente/protokolle/plenarprotokolle/plenarprotokolle/-/455046/h_121016ea2f478ddcf3be50587d9fa1f8?limit={limit}&noFilterSet=true&offset={offset}'
-
-
-def fetch_resource(url, filename):
-    dir_name = os.path.dirname(filename)
-    if not os.path.isdir(dir_name):
-        os.makedirs(dir_name)
-    
-    f = urlopen(url)
-    data = f.read()
-    with open(filename, "wb") as local_file:
-        local_file.write(data)
-        
-
-def scrape_protocols(params):
-    plenar_url = PLENAR_URL_SCHEME.format(**params)
-    data_dir = '/tmp/scraper'
-
-    data = urlopen(plenar_url).read()
-    soup = BeautifulSoup(data, "html5lib")
-    links = soup.find_all("a")
-
-    files = []
-    for link in links:
-        href = link['href']
-        filename = os.path.basename(href)
-        abs_path = os.path.join(data_dir, filename)
-        if not os.path.exists(abs_path):
-            print("Downloading {} to {}".format(BASE_URL + href, filename))
-            fetch_resource(BASE_URL + href, abs_path)
-        else:
-            print("File", filename, "exists, skipping")
-        files.append(abs_path)
-
-    return files
-
-
-def excused_stats(excused):
-    stats = Counter()
-    for e in excused:
-        stats[e['party']] += 1
-    return stats
+import json
+import logging
+from APIMocker import APIMocker, EXPORT_VERSION, excused_stats, session_name
+from batch import parse_batch, cache_version
+from archive import parse_archive
+from parse_cache import ParseCache
+from deputy_registry import DEPUTIES_PATH
+from fetch import BASE_URL, PLENAR_URL_SCHEME, DATA_DIR, extract_links, scrape_protocols
+from timings import Timings
+from search_index import IndexBuilder
+from session_stats import SessionStats
+from store import Store, export_store
+from watcher import Watcher
+import argparse
+import itertools
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scrape and parse plenary protocols')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of parser processes (default: number of cores, 1 parses in-process)')
+    parser.add_argument('--limit', type=int, default=10,
+                        help='number of protocols per listing page')
+    parser.add_argument('--downloads', type=int, default=8,
+                        help='number of concurrent downloads')
+    parser.add_argument('--chunksize', type=int, default=1,
+                        help='number of protocols handed to a parser process at once')
+    parser.add_argument('--cache-dir', default=os.path.join(DATA_DIR, '.parse_cache'),
+                        help='directory of the parse cache')
+    parser.add_argument('--cache-size', type=int, default=256,
+                        help='maximum size of the parse cache in MiB')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='parse every protocol, bypassing the parse cache')
+    parser.add_argument('--pretty', action='store_true',
+                        help='indent the exported JSON instead of writing it compactly')
+    parser.add_argument('--precompress', default='gz,br',
+                        help='comma separated list of precompressed siblings to write (gz, br)')
+    parser.add_argument('--no-index', action='store_true',
+                        help="don't build the full-text search index over the speeches")
+    parser.add_argument('--stats-state', default=os.path.join(DATA_DIR, 'stats_state.json'),
+                        help='file keeping the cross-session statistics between runs')
+    parser.add_argument('--paged', action='store_true',
+                        help='also write every session as a head file and pages of speeches to <out>/<session>/')
+    parser.add_argument('--db',
+                        help='SQLite database to store the parsed sessions in')
+    parser.add_argument('--export-from-db', action='store_true',
+                        help="export the sessions of --db without scraping or parsing")
+    parser.add_argument('--archive', action='append', default=[],
+                        help='parse the protocols in this zip/tar(.gz) archive instead of scraping (repeatable)')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running, polling the listing and publishing new protocols as they appear')
+    parser.add_argument('--interval', type=float, default=600,
+                        help='seconds between polls in --watch mode')
+    parser.add_argument('--max-interval', type=float, default=3600,
+                        help='longest interval between polls when backing off after failures')
+    parser.add_argument('--log-level', default='WARNING',
+                        help='level of the log output (DEBUG, INFO, WARNING, ...)')
+    parser.add_argument('--timings',
+                        help='write the time, matches and characters per parser stage to this JSON file')
+    args = parser.parse_args()
+    logging.basicConfig(format=LOG_FORMAT, level=args.log_level.upper())
+    precompress = [c for c in args.precompress.split(',') if c]
+
     OUT_PATH = '../../plenarnavi_frontend/public/data'
     if not os.path.isdir(OUT_PATH): os.makedirs(OUT_PATH)
 
-    plenar_params = {'limit': 5, 'offset': 0}
-
-    files = scrape_protocols(plenar_params)  # TODO: aparently, the limit parameter doesn't work
-
-    #files = glob.glob('/tmp/scraper/*.txt')
-
+    store = Store(args.db) if args.db else None
+    if args.export_from_db:
+        if store is None:
+            parser.error('--export-from-db requires --db')
+        for name, size in export_store(store, OUT_PATH, not args.pretty, precompress).items():
+            print("wrote {} ({} bytes)".format(name, size))
+        store.close()
+        parser.exit()
+
+    if args.watch:
+        watcher = Watcher(OUT_PATH, PLENAR_URL_SCHEME, extract_links, BASE_URL, DATA_DIR, args.limit, args.interval,
+                          args.max_interval, compact=not args.pretty, precompress=precompress, downloads=args.downloads)
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            pass
+        parser.exit()
+
+    version = cache_version(DEPUTIES_PATH)
+    cache = None
+    if not args.no_cache:
+        cache = ParseCache(args.cache_dir, version, args.cache_size * 2**20)
+
+    if args.archive:
+        # archive members are streamed into the parser, without extracting or caching them
+        results = itertools.chain.from_iterable(parse_archive(a, args.workers) for a in args.archive)
+    else:
+        files = scrape_protocols(args.limit, workers=args.downloads)
+        results = parse_batch(files, args.workers, args.chunksize, cache=cache)
+
+    failed = []
     mock_plenums = []
-    for f in files:
-        metadata, topic_summaries, contributions, excused = parse_plenar_transcript(f)
+    batch_timings = Timings()
+    index = None if args.no_index else IndexBuilder()
+    stats = SessionStats.load(args.stats_state, version)
+    stored_sessions = set(store.sessions()) if store is not None else set()
+    file_timings = {}
+    # session -> protocol; the exported files are keyed on the session of one legislative period
+    protocols = {}
+    skipped = []
+    # cached sessions are only exported again if their files are of an older format
+    export_versions = APIMocker.read_export_versions(OUT_PATH)
+    for f, result, error, unresolved, cached, timings in results:
+        if timings is not None:
+            file_timings[os.path.basename(f)] = timings
+            batch_timings.merge(timings)
+
+        if error is not None:
+            print("Failed to parse", os.path.basename(f))
+            print(error)
+            failed.append(f)
+            continue
+
+        metadata, topic_summaries, contributions, excused = result
+        if protocols.setdefault(metadata['session'], f) != f:
+            print("Skipping {}: session {} is already taken by {}".format(
+                os.path.basename(f), metadata['session'], os.path.basename(protocols[metadata['session']])))
+            skipped.append(f)
+            continue
         print("Plenarprotokoll", os.path.basename(f))
         print("meta: ", metadata)
         print("number contributions:", len(contributions))
         print("number excused deputies:", len(excused))
+        print("unresolved speakers:", ["{first_name} {last_name}".format(**p) for p in unresolved])
 
         e_stats = excused_stats(excused)
 
         mock_plenums.append(APIMocker.plenum_short(metadata, topic_summaries, e_stats))
-        mock_plenum = APIMocker.plenum(metadata, topic_summaries, contributions, excused)
-
-        filebase = os.path.join(OUT_PATH, os.path.basename(f)[2:5])
-
-        APIMocker.persist_json(mock_plenum, filebase + '.json')
-    APIMocker.persist_json(mock_plenums, os.path.join(OUT_PATH, 'plenums.json'))
+        if index is not None:
+            index.add(metadata['session'], contributions)
+        stats.add_session(metadata, contributions, excused)
+        if store is not None and not (cached and metadata['session'] in stored_sessions):
+            store.add_session(result)
+
+        name = session_name(metadata['session'])
+        filebase = os.path.join(OUT_PATH, name)
+        exported = os.path.exists(filebase + '.json') and export_versions.get(name) == EXPORT_VERSION
+        if args.paged:
+            exported = exported and os.path.exists(os.path.join(filebase, 'head.json'))
+        if cached and exported:
+            continue
+
+        written = APIMocker.stream_plenum(metadata, topic_summaries, contributions, excused,
+                                          filebase + '.json', not args.pretty, precompress)
+        if args.paged:
+            written.update(APIMocker.stream_paged_plenum(metadata, topic_summaries, contributions, excused,
+                                                         filebase, not args.pretty, precompress))
+        export_versions[name] = EXPORT_VERSION
+        for filename, size in written.items():
+            print("wrote {} ({} bytes)".format(filename, size))
+    APIMocker.write_export_versions(OUT_PATH, export_versions)
+    written = APIMocker.stream_json(mock_plenums, os.path.join(OUT_PATH, 'plenums.json'), not args.pretty, precompress)
+    for name, size in written.items():
+        print("wrote {} ({} bytes)".format(name, size))
+
+    stats.save(args.stats_state)
+    written = APIMocker.stream_json(stats.export(), os.path.join(OUT_PATH, 'stats.json'), not args.pretty, precompress)
+    for name, size in written.items():
+        print("wrote {} ({} bytes)".format(name, size))
+
+    if index is not None:
+        shards = index.write(os.path.join(OUT_PATH, 'search'))
+        print("search index: {} terms in {} shards".format(len(index), shards))
+
+    for stage, t in batch_timings.summary().items():
+        print("{:<24} {:9.3f} s  {:>8} matches  {:>11} chars".format(stage, t['seconds'], t['matches'], t['chars']))
+    if args.timings:
+        with open(args.timings, 'w') as timings_file:
+            json.dump({'files': file_timings, 'total': batch_timings.summary()}, timings_file, indent=4)
+
+    if store is not None:
+        store.close()
+
+    if cache is not None:
+        print("parse cache: {} hits, {} misses".format(cache.hits, cache.misses))
+
+    if skipped:
+        print("{} protocol(s) skipped for a repeated session number:".format(len(skipped)))
+        for f in skipped:
+            print("  ", f)
+
+    if failed:
+        print("{} protocol(s) could not be parsed:".format(len(failed)))
+        for f in failed:
+            print("  ", f)
 
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import gzip
+import json
+import bisect
+import logging
+import unicodedata
+from array import array
+
+from utils import atomic_write
+
+log = logging.getLogger(__name__)
+
+TERMS_FILE = 'terms.json'
+SPEAKERS_FILE = 'speakers.json.gz'
+
+# words hyphenated at a line break, e.g. "Bundes-\nregierung"
+HYPHENATION_REG = re.compile(r'(?<=[^\W\d_])-\n\s*(?=[a-zäöüß])')
+TOKEN_REG = re.compile(r'[^\W_]+')
+TRANSLITERATIONS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue'})
+
+
+def tokenize(text):
+    """The normalised words of `text`.
+
+    Words split by a line break hyphenation are joined, everything is case
+    folded (which maps ß to ss) and umlauts are transliterated, so "Grüße",
+    "GRÜSSE" and "Gruesse" are the same term.
+    """
+    text = HYPHENATION_REG.sub('', text)
+    text = unicodedata.normalize('NFKC', text).casefold().translate(TRANSLITERATIONS)
+    return TOKEN_REG.findall(text)
+
+
+def _gzip_json(obj):
+    data = json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf8')
+    return gzip.compress(data, 9, mtime=0)
+
+
+class IndexBuilder(object):
+    """Collects the postings (session, contribution index, position) of all speeches.
+
+    The contribution index is the position in the exported contributions
+    list of the session, agenda items included, and the position counts the
+    terms of the speech. `write` stores the index as gzipped shards of
+    consecutive terms, plus a term dictionary with the first term of each
+    shard, so a lookup fetches a single shard.
+    """
+
+    def __init__(self):
+        self.sessions = []
+        self.speakers = {}
+        # term -> flat array of (session number, contribution index, position)
+        self._postings = {}
+
+    def __len__(self):
+        return len(self._postings)
+
+    def add(self, session, contributions):
+        """Index the speeches of a session; returns False if the session was indexed before."""
+        if session in self.speakers:
+            # e.g. the same session number of another legislative period
+            log.warning("Session %s is already indexed, skipping it", session)
+            return False
+        n = len(self.sessions)
+        self.sessions.append(session)
+        speakers = self.speakers[session] = []
+
+        for i, c in enumerate(contributions):
+            speaker = c.get('speaker')
+            if speaker is None:
+                speakers.append(None)
+                continue
+            speakers.append([speaker['first_name'], speaker['last_name'], speaker.get('party')])
+            for position, term in enumerate(tokenize(str(c['speech']))):
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = array('I')
+                postings.extend((n, i, position))
+        return True
+
+    def write(self, directory, shard_postings=50000):
+        """Write shards of about `shard_postings` postings and the term dictionary to `directory`."""
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        shards = []
+        shard, size = {}, 0
+        for term in sorted(self._postings):
+            postings = self._postings[term]
+            entries = []
+            for k in range(0, len(postings), 3):
+                n, i, position = postings[k:k+3]
+                if entries and entries[-1][0] == self.sessions[n] and entries[-1][1] == i:
+                    entries[-1][2].append(position)
+                else:
+                    entries.append([self.sessions[n], i, [position]])
+            shard[term] = entries
+            size += len(postings) // 3
+            if size >= shard_postings:
+                shards.append(shard)
+                shard, size = {}, 0
+        if shard:
+            shards.append(shard)
+
+        dictionary = []
+        for k, shard in enumerate(shards):
+            filename = '{:04d}.json.gz'.format(k)
+            atomic_write(os.path.join(directory, filename), _gzip_json(shard))
+            dictionary.append({'first': next(iter(shard)), 'file': filename, 'terms': len(shard)})
+
+        atomic_write(os.path.join(directory, SPEAKERS_FILE), _gzip_json(self.speakers))
+        terms = {'sessions': self.sessions, 'shards': dictionary}
+        atomic_write(os.path.join(directory, TERMS_FILE), json.dumps(terms, ensure_ascii=False).encode('utf8'))
+        log.info("Wrote %d terms in %d shards to %s", len(self._postings), len(shards), directory)
+        return len(shards)
+
+
+class SearchIndex(object):
+    """Answers term and phrase queries from an index written by `IndexBuilder`."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, TERMS_FILE), encoding='utf8') as f:
+            terms = json.load(f)
+        self.sessions = terms['sessions']
+        self._shards = terms['shards']
+        self._first_terms = [s['first'] for s in self._shards]
+        self._loaded = {}
+        self._speakers = None
+
+    def _shard(self, term):
+        k = bisect.bisect_right(self._first_terms, term) - 1
+        if k < 0:
+            return {}
+        if k not in self._loaded:
+            with gzip.open(os.path.join(self.directory, self._shards[k]['file']), 'rt', encoding='utf8') as f:
+                self._loaded[k] = json.load(f)
+        return self._loaded[k]
+
+    def speaker(self, session, contribution):
+        """[first name, last name, party] of a contribution."""
+        if self._speakers is None:
+            with gzip.open(os.path.join(self.directory, SPEAKERS_FILE), 'rt', encoding='utf8') as f:
+                self._speakers = json.load(f)
+        return self._speakers[session][contribution]
+
+    def postings(self, term):
+        """[session, contribution index, [positions]] of a (normalised) term."""
+        return self._shard(term).get(term, [])
+
+    def search(self, query, speaker=None, party=None):
+        """(session, contribution index, position) of every occurrence of the phrase `query`.
+
+        `speaker` and `party` restrict the hits to contributions whose
+        speaker's name or party contains them (case insensitive).
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        # positions of the phrase start per contribution, narrowed term by term
+        hits = {(s, i): set(positions) for s, i, positions in self.postings(terms[0])}
+        for offset, term in enumerate(terms[1:], 1):
+            if not hits:
+                break
+            following = {}
+            for s, i, positions in self.postings(term):
+                starts = hits.get((s, i))
+                if starts:
+                    matched = starts.intersection(p - offset for p in positions)
+                    if matched:
+                        following[(s, i)] = matched
+            hits = following
+
+        speaker = speaker and speaker.casefold()
+        party = party and party.casefold()
+        result = []
+        for (s, i), starts in hits.items():
+            if speaker or party:
+                first_name, last_name, speaker_party = self.speaker(s, i)
+                if speaker and speaker not in '{} {}'.format(first_name, last_name).casefold():
+                    continue
+                if party and party not in (speaker_party or '').casefold():
+                    continue
+            result.extend((s, i, p) for p in starts)
+        order = {s: n for n, s in enumerate(self.sessions)}
+        result.sort(key=lambda hit: (order[hit[0]], hit[1], hit[2]))
+        return result
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import logging
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from deputy_registry import DeputyRegistry
+from utils import atomic_write
+
+log = logging.getLogger(__name__)
+
+COLUMNS = ('absences', 'contributions', 'chars')
+
+
+def _column(values=(), capacity=16):
+    """An int64 column with room for `capacity` rows, numpy backed if available."""
+    capacity = max(capacity, len(values))
+    if numpy is not None:
+        col = numpy.zeros(capacity, dtype=numpy.int64)
+        col[:len(values)] = values
+        return col
+    col = array('q', values)
+    col.frombytes(bytes(8 * (capacity - len(values))))
+    return col
+
+
+class _Table(object):
+    """Totals of `COLUMNS` in array columns, one row per key."""
+
+    def __init__(self, keys=(), columns=None):
+        self.keys = list(keys)
+        self.index = {k: i for i, k in enumerate(self.keys)}
+        columns = columns or {}
+        self.columns = {c: _column(columns.get(c, [0] * len(self.keys))) for c in COLUMNS}
+
+    def row(self, key):
+        i = self.index.get(key)
+        if i is None:
+            i = self.index[key] = len(self.keys)
+            self.keys.append(key)
+            capacity = len(self.columns[COLUMNS[0]])
+            if i == capacity:
+                self.columns = {c: _column(col.tolist(), 2 * capacity) for c, col in self.columns.items()}
+        return i
+
+    def add(self, key, totals):
+        i = self.row(key)
+        for c, value in totals.items():
+            self.columns[c][i] += value
+
+    def totals(self, key):
+        i = self.index[key]
+        return {c: int(col[i]) for c, col in self.columns.items()}
+
+    def to_json(self):
+        n = len(self.keys)
+        return {'keys': self.keys, 'columns': {c: col[:n].tolist() for c, col in self.columns.items()}}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['keys'], data['columns'])
+
+
+class SessionStats(object):
+    """Absences, contributions and characters spoken per deputy and party, over all sessions.
+
+    `add_session` updates the totals with one parsed session, in time
+    proportional to its size; a session that was added before replaces its
+    earlier counts, e.g. after it was parsed again.
+    Deputies are keyed on their normalised name, as the list of excused
+    deputies has no abgeordnetenwatch ids. The state is saved as JSON, so
+    the next run only adds the new sessions.
+    """
+
+    def __init__(self, version=None):
+        self.version = version
+        self.deputies = _Table()
+        self.parties = _Table()
+        # deputy key -> {'first_name', 'last_name', 'party', 'uuid'}
+        self.info = {}
+        # per session: session, date and its totals per party and deputy
+        self.series = []
+        # session -> its entry of `series`
+        self._sessions = {}
+
+    @staticmethod
+    def deputy_key(person):
+        return '{} {}'.format(DeputyRegistry.normalise(person['first_name']),
+                              DeputyRegistry.normalise(person['last_name']))
+
+    def _deputy(self, person):
+        key = self.deputy_key(person)
+        info = self.info.get(key)
+        if info is None:
+            info = self.info[key] = {'first_name': person['first_name'], 'last_name': person['last_name'],
+                                     'party': None, 'uuid': None}
+        if person.get('party'):
+            info['party'] = person['party'].strip()
+        if 'aw' in person:
+            info['uuid'] = person['aw']['uuid']
+        return key, info
+
+    def _remove(self, entry):
+        for key, totals in entry['deputies'].items():
+            self.deputies.add(key, {c: -v for c, v in totals.items()})
+        for party, totals in entry['parties'].items():
+            self.parties.add(party, {c: -v for c, v in totals.items()})
+        self.series.remove(entry)
+
+    def add_session(self, metadata, contributions, excused):
+        """Add a parsed session; returns False if it replaced an earlier version of it."""
+        session = metadata['session']
+        earlier = self._sessions.pop(session, None)
+        if earlier is not None:
+            self._remove(earlier)
+
+        per_deputy = {}
+        per_party = {}
+
+        def count(person, column, value):
+            key, info = self._deputy(person)
+            per_deputy.setdefault(key, dict.fromkeys(COLUMNS, 0))[column] += value
+            if info['party']:
+                per_party.setdefault(info['party'], dict.fromkeys(COLUMNS, 0))[column] += value
+
+        for e in excused:
+            count(e, 'absences', 1)
+
+        previous = None
+        for c in contributions:
+            if 'speaker' in c:
+                # the parts of a contribution split by an agenda item count once
+                continuation = (previous is not None and 'speaker' not in previous and
+                                previous['start_idx'] == c['start_idx'])
+                if not continuation:
+                    count(c['speaker'], 'contributions', 1)
+                count(c['speaker'], 'chars', c['end_idx'] - c['start_idx'])
+            previous = c
+
+        for key, totals in per_deputy.items():
+            self.deputies.add(key, totals)
+        for party, totals in per_party.items():
+            self.parties.add(party, totals)
+        entry = {'session': session, 'date': metadata.get('date'), 'parties': per_party, 'deputies': per_deputy}
+        self.series.append(entry)
+        self._sessions[session] = entry
+        return earlier is None
+
+    def deputy_totals(self):
+        return [dict(self.info[key], id=key, **self.deputies.totals(key)) for key in self.deputies.keys]
+
+    def party_totals(self):
+        return {party: self.parties.totals(party) for party in self.parties.keys}
+
+    def time_series(self):
+        """Per party and column, the values of each session in session order."""
+        series = sorted(self.series, key=lambda s: int(s['session']))
+        zero = dict.fromkeys(COLUMNS, 0)
+        return {
+            'sessions': [{'session': s['session'], 'date': s['date']} for s in series],
+            'parties': {party: {c: [s['parties'].get(party, zero)[c] for s in series] for c in COLUMNS}
+                        for party in self.parties.keys},
+        }
+
+    def export(self):
+        """The statistics for the frontend."""
+        return {
+            'timeSeries': self.time_series(),
+            'parties': self.party_totals(),
+            'deputies': self.deputy_totals(),
+        }
+
+    def save(self, filename):
+        state = {
+            'version': self.version,
+            'deputies': self.deputies.to_json(),
+            'parties': self.parties.to_json(),
+            'info': self.info,
+            'series': self.series,
+        }
+        atomic_write(filename, json.dumps(state, ensure_ascii=False).encode('utf8'))
+
+    @classmethod
+    def load(cls, filename, version=None):
+        """Load the state saved at `filename`; empty if there is none or it has another version."""
+        stats = cls(version)
+        if not os.path.exists(filename):
+            return stats
+        with open(filename, encoding='utf8') as f:
+            state = json.load(f)
+        if state['version'] != version:
+            log.info("Discarding statistics of version %s", state['version'])
+            return stats
+        stats.deputies = _Table.from_json(state['deputies'])
+        stats.parties = _Table.from_json(state['parties'])
+        stats.info = state['info']
+        stats.series = state['series']
+        stats._sessions = {s['session']: s for s in state['series']}
+        return stats
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import zlib
+import pickle
+import socket
+import shutil
+import logging
+import threading
+import traceback
+import multiprocessing
+
+from deputy_registry import DeputyRegistry, DEPUTIES_PATH
+from plenar_parser import parse_plenar_transcript
+from timings import Timings
+from utils import atomic_write
+
+log = logging.getLogger(__name__)
+
+# directories of the spool; it must be on one file system, so that renames
+# between them are atomic (on NFS too)
+QUEUE = 'queue'
+CLAIMED = 'claimed'
+DONE = 'done'
+FAILED = 'failed'
+# created by the coordinator when workers should exit
+STOP_FILE = 'STOP'
+# touched by `Spool.server_time` to read the clock of the file server
+CLOCK_FILE = '.clock'
+
+RESULT_SUFFIX = '.result'
+ERROR_SUFFIX = '.error'
+LEASE_SUFFIX = '.lease'
+
+
+def _entries(directory):
+    """Names in `directory`, without the temporary files of atomic writes."""
+    try:
+        return sorted(n for n in os.listdir(directory) if not n.startswith('.'))
+    except FileNotFoundError:
+        return []
+
+
+class WorkersExited(Exception):
+    pass
+
+
+def read_result(filename):
+    """(result, unresolved, timings) of a result file written by a worker."""
+    with open(filename, 'rb') as f:
+        return pickle.loads(zlib.decompress(f.read()))
+
+
+class Spool(object):
+    """A work queue of protocols in a shared directory.
+
+    Protocols wait in `queue/`. A worker claims one by renaming it to
+    `claimed/<name>@<worker>`, which only one worker can do, and keeps a
+    lease file next to it fresh while it parses. The result goes to
+    `done/<name>.result` (or the traceback to `failed/<name>.error`) and the
+    protocol is moved next to it. Claims whose lease is older than
+    `lease_seconds` are put back into the queue by `reap`. Lease ages are
+    measured with the mtimes set by the file server, so the clocks of the
+    machines don't have to agree.
+    """
+
+    def __init__(self, directory, lease_seconds=60):
+        self.directory = directory
+        self.lease_seconds = lease_seconds
+        for d in (QUEUE, CLAIMED, DONE, FAILED):
+            if not os.path.isdir(self.path(d)):
+                os.makedirs(self.path(d), exist_ok=True)
+
+    def path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def enqueue(self, filename):
+        """Copy a protocol into the queue, dropping earlier results of it."""
+        name = os.path.basename(filename)
+        for stale in (self.path(DONE, name), self.path(DONE, name + RESULT_SUFFIX),
+                      self.path(FAILED, name), self.path(FAILED, name + ERROR_SUFFIX)):
+            if os.path.exists(stale):
+                os.unlink(stale)
+        tmp = self.path(QUEUE, '.' + name + '.tmp')
+        shutil.copyfile(filename, tmp)
+        os.rename(tmp, self.path(QUEUE, name))
+
+    def queued(self):
+        return _entries(self.path(QUEUE))
+
+    def claimed(self):
+        """The claims, as (name, worker)."""
+        return [tuple(n.rsplit('@', 1)) for n in _entries(self.path(CLAIMED)) if not n.endswith(LEASE_SUFFIX)]
+
+    def claim(self, worker):
+        """Claim the next queued protocol for `worker`. Returns its name, or None if the queue is empty."""
+        for name in self.queued():
+            claimed = self.path(CLAIMED, '{}@{}'.format(name, worker))
+            try:
+                os.rename(self.path(QUEUE, name), claimed)
+            except FileNotFoundError:
+                # another worker was faster
+                continue
+            self.renew(name, worker)
+            return name
+        return None
+
+    def renew(self, name, worker):
+        """Write or refresh the lease of a claim. Returns False if the claim was lost."""
+        lease = self.path(CLAIMED, '{}@{}{}'.format(name, worker, LEASE_SUFFIX))
+        if not os.path.exists(self.path(CLAIMED, '{}@{}'.format(name, worker))):
+            return False
+        atomic_write(lease, '{} {}\n'.format(socket.gethostname(), os.getpid()).encode('utf8'))
+        return True
+
+    def complete(self, name, worker, result=None, error=None):
+        """Store the result (or error) of a claim and move the protocol next to it."""
+        if error is None:
+            directory, filename, data = DONE, name + RESULT_SUFFIX, zlib.compress(pickle.dumps(result, protocol=4))
+        else:
+            directory, filename, data = FAILED, name + ERROR_SUFFIX, error.encode('utf8')
+        atomic_write(self.path(directory, filename), data)
+
+        claimed = self.path(CLAIMED, '{}@{}'.format(name, worker))
+        try:
+            os.rename(claimed, self.path(directory, name))
+        except FileNotFoundError:
+            # the lease expired and the protocol was queued again, its result is the same
+            log.warning("Claim of %s by %s was lost", name, worker)
+        try:
+            os.unlink(claimed + LEASE_SUFFIX)
+        except FileNotFoundError:
+            pass
+
+    def server_time(self):
+        """The current time of the spool's file system, i.e. of the file server on NFS."""
+        clock = self.path(CLOCK_FILE)
+        try:
+            # without times, the mtime is set to the current time by the file system
+            os.utime(clock)
+        except FileNotFoundError:
+            open(clock, 'wb').close()
+        return os.stat(clock).st_mtime
+
+    def reap(self, now=None):
+        """Put claims with an expired lease back into the queue. Returns their names.
+
+        `now` defaults to `server_time()`, the clock the lease mtimes come from.
+        """
+        now = self.server_time() if now is None else now
+        requeued = []
+        for name, worker in self.claimed():
+            claimed = self.path(CLAIMED, '{}@{}'.format(name, worker))
+            try:
+                if os.path.exists(claimed + LEASE_SUFFIX):
+                    renewed = os.stat(claimed + LEASE_SUFFIX).st_mtime
+                else:
+                    # claimed but no lease yet: the rename set the ctime
+                    renewed = os.stat(claimed).st_ctime
+                if now - renewed <= self.lease_seconds:
+                    continue
+                os.rename(claimed, self.path(QUEUE, name))
+            except FileNotFoundError:
+                # completed in the meantime
+                continue
+            try:
+                os.unlink(claimed + LEASE_SUFFIX)
+            except FileNotFoundError:
+                pass
+            log.warning("Lease of %s by %s expired, queued it again", name, worker)
+            requeued.append(name)
+        return requeued
+
+    def results(self, names=None):
+        """(name, result file) of the completed protocols, of `names` only if given."""
+        return [(n[:-len(RESULT_SUFFIX)], self.path(DONE, n)) for n in _entries(self.path(DONE))
+                if n.endswith(RESULT_SUFFIX) and (names is None or n[:-len(RESULT_SUFFIX)] in names)]
+
+    def errors(self, names=None):
+        """(name, traceback) of the protocols that failed to parse, of `names` only if given."""
+        errors = []
+        for n in _entries(self.path(FAILED)):
+            if n.endswith(ERROR_SUFFIX) and (names is None or n[:-len(ERROR_SUFFIX)] in names):
+                with open(self.path(FAILED, n), encoding='utf8') as f:
+                    errors.append((n[:-len(ERROR_SUFFIX)], f.read()))
+        return errors
+
+
+class Worker(object):
+    """Parses the protocols of a spool until the coordinator's STOP file appears.
+
+    The lease of the current claim is renewed every third of the lease
+    time on a background thread, so parsing may take longer than a lease.
+    """
+
+    def __init__(self, spool, worker_id=None, deputies_path=DEPUTIES_PATH, poll_interval=1.0):
+        self.spool = spool
+        self.id = worker_id or '{}-{}'.format(socket.gethostname(), os.getpid())
+        self.deputies_path = deputies_path
+        self.poll_interval = poll_interval
+        self.processed = 0
+        self._registry = None
+
+    def _heartbeat(self, name, done):
+        while not done.wait(self.spool.lease_seconds / 3):
+            if not self.spool.renew(name, self.id):
+                return
+
+    def process(self, name):
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(name, done), daemon=True)
+        heartbeat.start()
+        timings = Timings()
+        try:
+            # a broken deputies file fails the protocol instead of the worker
+            if self._registry is None:
+                self._registry = DeputyRegistry.load(self.deputies_path)
+            result = parse_plenar_transcript(self.spool.path(CLAIMED, '{}@{}'.format(name, self.id)),
+                                             self._registry, timings)
+            value, error = (result, self._registry.pop_unresolved(), timings.summary()), None
+        except Exception:
+            log.error("Failed to parse %s", name)
+            value, error = None, traceback.format_exc()
+            # like `batch._parse_file`, so they aren't reported with the next protocol
+            if self._registry is not None:
+                self._registry.pop_unresolved()
+        finally:
+            done.set()
+            heartbeat.join()
+        self.spool.complete(name, self.id, value, error)
+        self.processed += 1
+
+    def run_once(self):
+        """Process the next queued protocol. Returns False if the queue was empty."""
+        name = self.spool.claim(self.id)
+        if name is None:
+            return False
+        log.info("Worker %s parsing %s", self.id, name)
+        self.process(name)
+        return True
+
+    def run(self):
+        while not os.path.exists(self.spool.path(STOP_FILE)):
+            if not self.run_once():
+                time.sleep(self.poll_interval)
+        return self.processed
+
+
+def run_worker(directory, lease_seconds=60, deputies_path=DEPUTIES_PATH, poll_interval=1.0, worker_id=None):
+    """Entry point of a worker process: the CLI on other machines, local processes in `Coordinator.run`."""
+    return Worker(Spool(directory, lease_seconds), worker_id, deputies_path, poll_interval).run()
+
+
+class Coordinator(object):
+    """Fills the spool, watches over the leases and assembles the results.
+
+    Only the protocols queued by `start` are assembled and reported, so
+    results of earlier runs in a reused spool are left out.
+    """
+
+    def __init__(self, spool, poll_interval=1.0):
+        self.spool = spool
+        self.poll_interval = poll_interval
+        self.names = set()
+
+    def start(self, files):
+        if os.path.exists(self.spool.path(STOP_FILE)):
+            os.unlink(self.spool.path(STOP_FILE))
+        for f in files:
+            self.spool.enqueue(f)
+            self.names.add(os.path.basename(f))
+        log.info("Queued %d protocols in %s", len(files), self.spool.directory)
+
+    def wait(self, timeout=None, processes=()):
+        """Reap expired leases until the queue is worked off. Returns False on timeout.
+
+        Raises WorkersExited if all of the local worker `processes` exited
+        while protocols are left.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.spool.reap()
+            if not self.spool.queued() and not self.spool.claimed():
+                return True
+            if processes and not any(p.is_alive() for p in processes):
+                raise WorkersExited("All local workers exited (exit codes {}) with {} protocols left in {}".format(
+                    [p.exitcode for p in processes], len(self.spool.queued()) + len(self.spool.claimed()),
+                    self.spool.directory))
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(self.poll_interval)
+
+    def stop(self):
+        """Tell the workers to exit once they are done with their current protocol."""
+        atomic_write(self.spool.path(STOP_FILE), b'')
+
+    def errors(self):
+        """(name, traceback) of the queued protocols that failed to parse."""
+        return self.spool.errors(self.names)
+
+    def assemble(self, out_path, compact=True, precompress=('gz', 'br')):
+        """Write `plenums.json` and the per-session files of the completed protocols.
+
+        Returns the number of bytes written per file.
+        """
+        from APIMocker import APIMocker, excused_stats, session_name
+
+        if not os.path.isdir(out_path):
+            os.makedirs(out_path)
+        written = {}
+        plenums = []
+        # one result at a time, like `export_store`
+        for name, filename in self.spool.results(self.names):
+            (metadata, topic_summaries, contributions, excused), _, _ = read_result(filename)
+            plenums.append(APIMocker.plenum_short(metadata, topic_summaries, excused_stats(excused)))
+            written.update(APIMocker.stream_plenum(
+                metadata, topic_summaries, contributions, excused,
+                os.path.join(out_path, session_name(metadata['session']) + '.json'), compact, precompress))
+        written.update(APIMocker.stream_json(plenums, os.path.join(out_path, 'plenums.json'), compact, precompress))
+        return written
+
+    def run(self, files, out_path, local_workers=0, compact=True, precompress=('gz', 'br'),
+            deputies_path=DEPUTIES_PATH, timeout=None):
+        """Queue `files`, wait for them to be parsed and assemble the output.
+
+        `local_workers` worker processes are started on this machine, in
+        addition to the ones running elsewhere. Raises TimeoutError if the
+        queue isn't worked off within `timeout` seconds, and WorkersExited
+        if the local workers die before, without writing anything. Returns the number of bytes written per file.
+        """
+        self.start(files)
+        processes = [multiprocessing.Process(target=run_worker,
+                                             args=(self.spool.directory, self.spool.lease_seconds, deputies_path,
+                                                   self.poll_interval, 'local{}-{}'.format(i, os.getpid())))
+                     for i in range(local_workers)]
+        for p in processes:
+            p.start()
+        try:
+            done = self.wait(timeout, processes)
+        finally:
+            self.stop()
+            for p in processes:
+                p.join()
+        if not done:
+            raise TimeoutError("{} protocols left in {} after {} s".format(
+                len(self.spool.queued()) + len(self.spool.claimed()), self.spool.directory, timeout))
+        for name, error in self.errors():
+            log.error("Failed to parse %s:\n%s", name, error)
+        return self.assemble(out_path, compact, precompress)
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import sqlite3
+import logging
+from datetime import datetime
+
+from interjections import count_reactions
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL UNIQUE,
+    date TEXT,               -- ISO date, for range queries
+    date_text TEXT,          -- as parsed, e.g. "30.3.2017"
+    start_time TEXT,
+    end_time TEXT,
+    reactions TEXT           -- JSON, reactions per type
+);
+CREATE TABLE IF NOT EXISTS agenda_items (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    type TEXT,
+    item_id TEXT,
+    summary TEXT,
+    start_idx INTEGER,
+    end_idx INTEGER,
+    UNIQUE (session_id, position)
+);
+CREATE TABLE IF NOT EXISTS speakers (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    role TEXT,
+    titles TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    party TEXT,
+    position TEXT,
+    uuid TEXT,
+    image_url TEXT
+);
+-- the contributions as exported: speeches, and the agenda items between them
+CREATE TABLE IF NOT EXISTS contributions (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    speaker_id INTEGER REFERENCES speakers(id),
+    agenda_item_id INTEGER REFERENCES agenda_items(id) ON DELETE CASCADE,
+    start_idx INTEGER,
+    end_idx INTEGER,
+    speech TEXT,
+    interjections TEXT,      -- JSON, the reactions in the speech
+    UNIQUE (session_id, position)
+);
+CREATE TABLE IF NOT EXISTS absences (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    last_name TEXT,
+    electorate TEXT,
+    titles TEXT,
+    first_name TEXT,
+    reason TEXT,
+    party TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_date ON sessions(date);
+CREATE INDEX IF NOT EXISTS speakers_name ON speakers(last_name, first_name);
+CREATE INDEX IF NOT EXISTS speakers_party ON speakers(party);
+CREATE INDEX IF NOT EXISTS contributions_speaker ON contributions(speaker_id);
+CREATE INDEX IF NOT EXISTS absences_name ON absences(last_name, first_name);
+CREATE INDEX IF NOT EXISTS absences_party ON absences(party, session_id);
+"""
+
+# keys of the parsed dicts, in the order the parser creates them
+SPEAKER_FIELDS = ('role', 'titles', 'first_name', 'last_name', 'party', 'position')
+ABSENTEE_FIELDS = ('last_name', 'electorate', 'titles', 'first_name', 'reason', 'party')
+# columns added since the first schema, added to older databases on open
+MIGRATIONS = (
+    ('sessions', 'reactions', 'TEXT'),
+    ('contributions', 'interjections', 'TEXT'),
+)
+
+
+def _json(value):
+    return None if value is None else json.dumps(value, ensure_ascii=False)
+
+
+def iso_date(date_text):
+    try:
+        return datetime.strptime(date_text, '%d.%m.%Y').date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+class Store(object):
+    """SQLite storage for the results of `parse_plenar_transcript`.
+
+    Each session is ingested in one transaction with batched inserts;
+    ingesting a session again replaces it. `result` rebuilds the tuple the
+    parser returned, so the JSON export doesn't need the transcripts.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self._speaker_ids = {}
+
+    def _migrate(self):
+        for table, column, type_ in MIGRATIONS:
+            columns = [row[1] for row in self.conn.execute('PRAGMA table_info({})'.format(table))]
+            if column not in columns:
+                log.info("Adding column %s.%s", table, column)
+                self.conn.execute('ALTER TABLE {} ADD COLUMN {} {}'.format(table, column, type_))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _speakers(self, speakers):
+        """Ids of the speaker groupdicts, inserting or updating them as needed."""
+        rows = {}
+        for s in speakers:
+            key = json.dumps([s.get(f) for f in SPEAKER_FIELDS], ensure_ascii=False)
+            aw = s.get('aw') or {}
+            rows[key] = [key] + [s.get(f) for f in SPEAKER_FIELDS] + [aw.get('uuid'), aw.get('image_url')]
+        self.conn.executemany("""
+            INSERT INTO speakers (key, role, titles, first_name, last_name, party, position, uuid, image_url)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET uuid = excluded.uuid, image_url = excluded.image_url""",
+            rows.values())
+        for key in rows:
+            if key not in self._speaker_ids:
+                self._speaker_ids[key] = self.conn.execute('SELECT id FROM speakers WHERE key = ?', (key,)).fetchone()[0]
+        return self._speaker_ids
+
+    def add_session(self, result):
+        """Ingest a `parse_plenar_transcript` result, replacing an earlier one of the same session."""
+        metadata, agenda_summary, contributions, excused = result
+        session = metadata['session']
+        with self.conn:
+            self.conn.execute('DELETE FROM sessions WHERE session = ?', (session,))
+            session_id = self.conn.execute(
+                """INSERT INTO sessions (session, date, date_text, start_time, end_time, reactions)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (session, iso_date(metadata.get('date')), metadata.get('date'),
+                 metadata.get('start_time'), metadata.get('end_time'), _json(metadata.get('reactions')))).lastrowid
+
+            # the agenda items in the contributions carry the offsets of their debate
+            topics = {}
+            for c in contributions:
+                if 'speaker' not in c:
+                    topics.setdefault((c['type'], c['id'], c['summary']), c)
+            agenda_rows = []
+            for i, s in enumerate(agenda_summary):
+                t = topics.get((s['type'], s['id'], s['summary']), {})
+                agenda_rows.append((session_id, i, s['type'], s['id'], s['summary'],
+                                    t.get('start_idx'), t.get('end_idx')))
+            self.conn.executemany("""
+                INSERT INTO agenda_items (session_id, position, type, item_id, summary, start_idx, end_idx)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""", agenda_rows)
+            agenda_ids = {}
+            for item_id, type_, agenda_id, summary in self.conn.execute(
+                    'SELECT id, type, item_id, summary FROM agenda_items WHERE session_id = ? ORDER BY position',
+                    (session_id,)):
+                agenda_ids.setdefault((type_, agenda_id, summary), item_id)
+
+            speaker_ids = self._speakers(c['speaker'] for c in contributions if 'speaker' in c)
+            rows = []
+            for i, c in enumerate(contributions):
+                if 'speaker' in c:
+                    key = json.dumps([c['speaker'].get(f) for f in SPEAKER_FIELDS], ensure_ascii=False)
+                    rows.append((session_id, i, speaker_ids[key], None, c['start_idx'], c['end_idx'], str(c['speech']),
+                                 _json(c.get('interjections'))))
+                else:
+                    rows.append((session_id, i, None, agenda_ids[(c['type'], c['id'], c['summary'])],
+                                 c['start_idx'], c['end_idx'], None, None))
+            self.conn.executemany("""
+                INSERT INTO contributions (session_id, position, speaker_id, agenda_item_id, start_idx, end_idx, speech,
+                                           interjections)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+
+            self.conn.executemany("""
+                INSERT INTO absences (session_id, position, last_name, electorate, titles, first_name, reason, party)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(session_id, i) + tuple(e.get(f) for f in ABSENTEE_FIELDS) for i, e in enumerate(excused)])
+        log.info("Stored session %s: %d contributions, %d absences", session, len(contributions), len(excused))
+
+    def sessions(self):
+        """The stored sessions, in session order."""
+        return [r[0] for r in self.conn.execute('SELECT session FROM sessions ORDER BY CAST(session AS INTEGER)')]
+
+    def result(self, session):
+        """The (metadata, agenda_summary, contributions, excused) tuple of a stored session."""
+        row = self.conn.execute(
+            'SELECT id, session, date_text, start_time, end_time, reactions FROM sessions WHERE session = ?',
+            (session,)).fetchone()
+        if row is None:
+            raise KeyError(session)
+        session_id = row[0]
+        metadata = {'session': row[1], 'date': row[2], 'start_time': row[3], 'end_time': row[4]}
+        if row[5] is not None:
+            metadata['reactions'] = json.loads(row[5])
+
+        agenda_summary = []
+        topics = {}
+        for item_id, type_, agenda_id, summary, start_idx, end_idx in self.conn.execute(
+                """SELECT id, type, item_id, summary, start_idx, end_idx FROM agenda_items
+                   WHERE session_id = ? ORDER BY position""", (session_id,)):
+            agenda_summary.append({'type': type_, 'id': agenda_id, 'summary': summary})
+            topics[item_id] = {'type': type_, 'id': agenda_id, 'summary': summary,
+                               'start_idx': start_idx, 'end_idx': end_idx}
+
+        contributions = []
+        for row in self.conn.execute("""
+                SELECT c.agenda_item_id, c.start_idx, c.end_idx, c.speech,
+                       s.role, s.titles, s.first_name, s.last_name, s.party, s.position, s.uuid, s.image_url,
+                       c.interjections
+                FROM contributions c LEFT JOIN speakers s ON s.id = c.speaker_id
+                WHERE c.session_id = ? ORDER BY c.position""", (session_id,)):
+            if row[0] is not None:
+                contributions.append(topics[row[0]])
+                continue
+            speaker = dict(zip(SPEAKER_FIELDS, row[4:10]))
+            if row[10] is not None:
+                speaker['aw'] = {'image_url': row[11], 'uuid': row[10]}
+            contribution = {'speaker': speaker, 'start_idx': row[1], 'end_idx': row[2], 'speech': row[3]}
+            if row[12] is not None:
+                contribution['interjections'] = json.loads(row[12])
+                contribution['reactions'] = count_reactions(contribution['interjections'])
+            contributions.append(contribution)
+
+        excused = [dict(zip(ABSENTEE_FIELDS, row)) for row in self.conn.execute("""
+            SELECT last_name, electorate, titles, first_name, reason, party FROM absences
+            WHERE session_id = ? ORDER BY position""", (session_id,))]
+
+        return metadata, agenda_summary, contributions, excused
+
+    def contributions_of(self, last_name, first_name=None):
+        """(session, position, speech) of every contribution of a deputy."""
+        query = """SELECT se.session, c.position, c.speech FROM contributions c
+                   JOIN speakers s ON s.id = c.speaker_id JOIN sessions se ON se.id = c.session_id
+                   WHERE s.last_name = ?"""
+        params = [last_name]
+        if first_name is not None:
+            query += ' AND s.first_name = ?'
+            params.append(first_name)
+        return self.conn.execute(query + ' ORDER BY se.date, c.position', params).fetchall()
+
+    def absences_of_party(self, party, since=None, until=None):
+        """(session, date, first name, last name) of the absences of a party, optionally by ISO date range."""
+        query = """SELECT se.session, se.date, a.first_name, a.last_name FROM absences a
+                   JOIN sessions se ON se.id = a.session_id WHERE a.party = ?"""
+        params = [party]
+        if since is not None:
+            query += ' AND se.date >= ?'
+            params.append(since)
+        if until is not None:
+            query += ' AND se.date <= ?'
+            params.append(until)
+        return self.conn.execute(query + ' ORDER BY se.date, a.position', params).fetchall()
+
+
+def export_store(store, out_path, compact=True, precompress=('gz', 'br'), paged=False, index=None, stats=None):
+    """Write `plenums.json` and the per-session files of APIMocker from the store.
+
+    With `paged`, every session is also written as head and pages to
+    `<out_path>/<session>/`. The sessions are added to `index` (an
+    `IndexBuilder`) and `stats` (a `SessionStats`) if given. Returns the
+    number of bytes written per file.
+    """
+    # only exporting needs the exporter, not storing parse results
+    from APIMocker import APIMocker, excused_stats, session_name
+
+    written = {}
+    plenums = []
+    for session in store.sessions():
+        metadata, topic_summaries, contributions, excused = store.result(session)
+        plenums.append(APIMocker.plenum_short(metadata, topic_summaries, excused_stats(excused)))
+        filebase = os.path.join(out_path, session_name(session))
+        written.update(APIMocker.stream_plenum(metadata, topic_summaries, contributions, excused,
+                                               filebase + '.json', compact, precompress))
+        if paged:
+            written.update(APIMocker.stream_paged_plenum(metadata, topic_summaries, contributions, excused,
+                                                         filebase, compact, precompress))
+        if index is not None:
+            index.add(session, contributions)
+        if stats is not None:
+            stats.add_session(metadata, contributions, excused)
+    written.update(APIMocker.stream_json(plenums, os.path.join(out_path, 'plenums.json'), compact, precompress))
+    return written
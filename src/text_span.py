@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+
+class TextSpan(object):
+    """The slice text[start:end] of a shared text, without copying it.
+
+    Behaves like the str it stands for where the parser and the exporter need
+    it: slicing yields another span of the same text, `str()` materialises
+    it. Spans of one text pickle the text only once.
+    """
+    __slots__ = ('text', 'start', 'end')
+
+    def __init__(self, text, start=0, end=None):
+        self.text = text
+        self.start = start
+        self.end = len(text) if end is None else end
+
+    def __str__(self):
+        return self.text[self.start:self.end]
+
+    def __repr__(self):
+        return 'TextSpan({!r})'.format(str(self))
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return str(self)[key]
+        start, end, step = key.indices(len(self))
+        if step != 1:
+            return str(self)[key]
+        return TextSpan(self.text, self.start + start, self.start + max(start, end))
+
+    def __eq__(self, other):
+        if isinstance(other, (str, TextSpan)):
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __getstate__(self):
+        return self.text, self.start, self.end
+
+    def __setstate__(self, state):
+        self.text, self.start, self.end = state
+
+
+def materialise(obj):
+    """`default` hook for json encoders: encode spans as strings."""
+    if isinstance(obj, TextSpan):
+        return str(obj)
+    raise TypeError("Object of type {} is not JSON serializable".format(type(obj).__name__))
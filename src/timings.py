@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import time
+from contextlib import contextmanager
+
+
+class Timings(object):
+    """Wall time, match counts and characters processed per parser stage.
+
+    Wrap each stage in `with timings.stage(name, chars) as record:` and set
+    `record['matches']` inside. Every `hook(name, record)` is called when a
+    stage ends. `summary()` returns the totals per stage as a plain,
+    JSON-serialisable dict; `merge()` adds up summaries, e.g. of a batch.
+    """
+
+    def __init__(self, hooks=()):
+        self.stages = {}
+        self.hooks = list(hooks)
+
+    @contextmanager
+    def stage(self, name, chars=0):
+        record = {'seconds': 0.0, 'matches': 0, 'chars': chars}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self._add(name, record, 1)
+            for hook in self.hooks:
+                hook(name, record)
+
+    def _add(self, name, record, calls):
+        total = self.stages.get(name)
+        if total is None:
+            total = self.stages[name] = {'calls': 0, 'seconds': 0.0, 'matches': 0, 'chars': 0}
+        total['calls'] += calls
+        total['seconds'] += record['seconds']
+        total['matches'] += record['matches']
+        total['chars'] += record['chars']
+
+    def merge(self, summary):
+        """Add the stage totals of another `summary()`."""
+        for name, record in summary.items():
+            self._add(name, record, record['calls'])
+        return self
+
+    def summary(self):
+        return {name: dict(record) for name, record in self.stages.items()}
+
+    @property
+    def seconds(self):
+        return sum(record['seconds'] for record in self.stages.values())
@@ -1,7 +1,21 @@
+import os
+import tempfile
 import itertools
 
 def pairwise(iterable):
     "s -> (s0,s1), (s1,s2), (s2, s3), ..."
     a, b = itertools.tee(iterable)
     next(b, None)
-    return zip(a, b)
\ No newline at end of file
+    return zip(a, b)
+
+def atomic_write(filename, data):
+    "Write `data` (bytes) to a temporary file next to `filename` and rename it into place."
+    dir_name = os.path.dirname(filename) or '.'
+    fd, tmp = tempfile.mkstemp(dir=dir_name, prefix='.' + os.path.basename(filename) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, filename)
+    except BaseException:
+        os.unlink(tmp)
+        raise
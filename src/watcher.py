@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin
+
+from APIMocker import APIMocker, excused_stats, session_name
+from batch import parse_batch
+from deputy_registry import DEPUTIES_PATH
+from downloader import Downloader, DownloadError
+from utils import atomic_write
+
+log = logging.getLogger(__name__)
+
+# published protocols, kept in the data directory between runs
+STATE_FILE = '.watch_state.json'
+# polls and the lag from publication to availability, in the data directory
+METRICS_FILE = 'watch_metrics.json'
+
+
+def merge_plenums(plenums, entries):
+    """`plenums` with `entries` replacing those of the same session.
+
+    Entries of new sessions go first, in their order, as the listing is
+    newest first.
+    """
+    new = {e['session']: e for e in entries}
+    merged = [new.pop(p['session'], p) for p in plenums]
+    return [e for e in entries if e['session'] in new] + merged
+
+
+class Watcher(object):
+    """Polls the protocol listing and publishes new protocols as they show up.
+
+    Only protocols that weren't published before are downloaded and parsed.
+    Each is written to `<out_path>/<session>.json` and merged into
+    `<out_path>/plenums.json`, both atomically. The listing is walked until
+    a page has nothing new. After a failed poll the interval doubles, up to
+    `max_interval`. The lag from publication (the Last-Modified of the
+    protocol, or when its link first showed up) to availability is recorded
+    per session in `metrics` and written to `METRICS_FILE`.
+    """
+
+    def __init__(self, out_path, url_scheme, extract_links, base_url, data_dir, limit=10, interval=600,
+                 max_interval=3600, deputies_path=DEPUTIES_PATH, compact=True, precompress=('gz', 'br'),
+                 downloads=8, clock=time.time):
+        self.out_path = out_path
+        self.url_scheme = url_scheme
+        self.extract_links = extract_links
+        self.base_url = base_url
+        self.data_dir = data_dir
+        self.limit = limit
+        self.interval = interval
+        self.max_interval = max_interval
+        self.deputies_path = deputies_path
+        self.compact = compact
+        self.precompress = precompress
+        self.downloads = downloads
+        self.clock = clock
+        self._stop = threading.Event()
+
+        for d in (out_path, data_dir):
+            if not os.path.isdir(d):
+                os.makedirs(d)
+        state = self._load(STATE_FILE, {})
+        # link -> session of the published protocols, link -> time it was first listed
+        self.published = state.get('published', {})
+        self.first_seen = state.get('first_seen', {})
+        self.metrics = self._load(METRICS_FILE, {
+            'polls': 0,
+            'failed_polls': 0,
+            'last_poll': None,
+            'published': 0,
+            'last_lag_seconds': None,
+            'max_lag_seconds': None,
+            'lag_seconds': {},
+        })
+
+    def _load(self, name, default):
+        filename = os.path.join(self.data_dir, name)
+        if not os.path.exists(filename):
+            return default
+        with open(filename, encoding='utf8') as f:
+            return json.load(f)
+
+    def _save(self):
+        state = {'published': self.published, 'first_seen': self.first_seen}
+        atomic_write(os.path.join(self.data_dir, STATE_FILE), json.dumps(state, indent=4, sort_keys=True).encode('utf8'))
+        atomic_write(os.path.join(self.data_dir, METRICS_FILE),
+                     json.dumps(self.metrics, indent=4, sort_keys=True).encode('utf8'))
+
+    def new_links(self, downloader):
+        """Links in the listing that weren't published yet."""
+        new = []
+        for links in downloader.iter_listing(self.url_scheme, self.extract_links, self.limit):
+            unpublished = [l for l in links if l not in self.published]
+            if not unpublished:
+                break
+            new.extend(unpublished)
+        return new
+
+    def _published_at(self, link, validators):
+        last_modified = validators.get(os.path.basename(link), {}).get('last_modified')
+        if last_modified:
+            try:
+                return parsedate_to_datetime(last_modified).timestamp()
+            except (TypeError, ValueError):
+                log.warning("Invalid Last-Modified %r of %s", last_modified, link)
+        return self.first_seen[link]
+
+    def _plenums(self):
+        filename = os.path.join(self.out_path, 'plenums.json')
+        if not os.path.exists(filename):
+            return []
+        with open(filename, encoding='utf8') as f:
+            return json.load(f)
+
+    def poll(self):
+        """Check the listing once and publish the new protocols. Returns their sessions."""
+        now = self.clock()
+        self.metrics['polls'] += 1
+        self.metrics['last_poll'] = now
+
+        with Downloader(self.data_dir, workers=self.downloads) as downloader:
+            links = self.new_links(downloader)
+            for l in links:
+                self.first_seen.setdefault(l, now)
+            jobs = [(urljoin(self.base_url, l), os.path.join(self.data_dir, os.path.basename(l))) for l in links]
+            files = {}
+            for (filename, status), link in zip(downloader.fetch_all(jobs), links):
+                if not isinstance(status, Exception):
+                    files[filename] = link
+            validators = downloader.validators
+
+        entries = []
+        published = []
+        if files:
+            for f, result, error, _, _, _ in parse_batch(list(files), workers=1, deputies_path=self.deputies_path):
+                if error is not None:
+                    log.error("Failed to parse %s:\n%s", f, error)
+                    continue
+                metadata, topic_summaries, contributions, excused = result
+                session = metadata['session']
+                APIMocker.stream_plenum(metadata, topic_summaries, contributions, excused,
+                                        os.path.join(self.out_path, session_name(session) + '.json'), self.compact,
+                                        self.precompress)
+                entries.append(APIMocker.plenum_short(metadata, topic_summaries, excused_stats(excused)))
+                published.append((files[f], session))
+
+        if entries:
+            APIMocker.stream_json(merge_plenums(self._plenums(), entries), os.path.join(self.out_path, 'plenums.json'),
+                                  self.compact, self.precompress)
+            available = self.clock()
+            for link, session in published:
+                self.published[link] = session
+                lag = max(0.0, available - self._published_at(link, validators))
+                self.metrics['lag_seconds'][session] = lag
+                self.metrics['last_lag_seconds'] = lag
+                self.metrics['max_lag_seconds'] = max(lag, self.metrics['max_lag_seconds'] or 0.0)
+                log.info("Published session %s, %.0f s after its publication", session, lag)
+            self.metrics['published'] += len(published)
+        self._save()
+        return [session for _, session in published]
+
+    def run(self, polls=None):
+        """Poll every `interval` seconds until `stop` is called, or `polls` polls are done."""
+        delay = self.interval
+        n = 0
+        while not self._stop.is_set():
+            try:
+                self.poll()
+                delay = self.interval
+            except (DownloadError, OSError) as e:
+                self.metrics['failed_polls'] += 1
+                self._save()
+                delay = min(delay * 2, self.max_interval)
+                log.warning("Polling %s failed (%s), next poll in %.0f s", self.url_scheme, e, delay)
+            n += 1
+            if polls is not None and n >= polls:
+                break
+            self._stop.wait(delay)
+
+    def stop(self):
+        self._stop.set()
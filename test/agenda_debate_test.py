@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import logging
+
+sys.path.insert(0, '../src')
+from plenar_parser import Regex, parse_agenda_debate
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+
+
+AGENDA_IDS_TEST_SET = [
+    (('Tagesordnungspunkt', '29'), ['29']),
+    (('Tagesordnungspunkte', '28 a', 'bis', '28 c'), ['28a', '28b', '28c']),
+    (('Tagesordnungspunkte', '31 a', 'und', '31 b'), ['31a', '31b']),
+    (('Zusatzpunkte', '6', 'bis', '8'), ['6', '7', '8']),
+    (('Tagesordnungspunkt', '7', None, None), ['7']),
+]
+
+AGENDA_TYPE_TEST_SET = [
+    ('Tagesordnungspunkt', 'tagesordnungspunkt'),
+    ('Tagesordnungspunkten', 'tagesordnungspunkt'),
+    ('Zusatztagesordnungspunkt', 'zusatzpunkt'),
+    ('Zusatzpunkte', 'zusatzpunkt'),
+    ('Tagesordnung', 'tagesordnungspunkt'),
+]
+
+DEBATE = ('\n  Präsident Dr. Norbert Lammert: \n'
+          '  Ich rufe die Tagesordnungspunkte 28 a bis 28 c auf: Erste Beratung.\n'
+          '  Ich rufe jetzt den Tagesordnungspunkt 11 auf: Zweite Beratung.\n')
+
+
+class AgendaDebate(unittest.TestCase):
+    def test_ids(self):
+        for groups, e in AGENDA_IDS_TEST_SET:
+            self.assertListEqual(Regex.agenda_ids(groups), e)
+
+    def test_types(self):
+        for t, e in AGENDA_TYPE_TEST_SET:
+            self.assertEqual(Regex.agenda_type(t), e)
+
+    def test_debate(self):
+        summaries = [{'type': 'Tagesordnungspunkt', 'id': i, 'summary': ''} for i in ['28 a', '28 c', '11', '12']]
+        topics = parse_agenda_debate(DEBATE, summaries)
+
+        first = DEBATE.index(': Erste')
+        second = DEBATE.index(': Zweite')
+        end = DEBATE.index('jetzt den')
+        self.assertEqual([(t['start_idx'], t['end_idx']) for t in topics],
+                         [(first, end), (first, end), (second, len(DEBATE) - 1), (-1, -1)])
+        self.assertNotIn('start_idx', summaries[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import gzip
+import json
+import time
+import shutil
+import logging
+import asyncio
+import tempfile
+import threading
+import http.client
+
+sys.path.insert(0, '../src')
+from api_server import APIServer
+from APIMocker import APIMocker
+
+HEADER = {'session': '221', 'date': '30.3.2017', 'start_time': '9:00', 'end_time': '12:00'}
+TOPICS = [{'type': 'Tagesordnungspunkt', 'id': '1', 'summary': 'Mehr Sport', 'start_idx': 10, 'end_idx': 50}]
+EXCUSED = [{'first_name': 'Susann', 'last_name': 'Rüthrich', 'party': 'SPD'}]
+CONTRIBUTIONS = [{'speaker': {'first_name': 'Anna', 'last_name': 'Muster'}, 'start_idx': i, 'end_idx': i + 1,
+                  'speech': 'Sport ist gut. ' * i} for i in range(120)]
+STATS = {'timeSeries': {}, 'parties': {}, 'deputies': [
+    {'id': 'anna muster', 'first_name': 'Anna', 'last_name': 'Muster', 'party': 'SPD', 'uuid': 'muster',
+     'absences': 1, 'contributions': 120, 'chars': 1000},
+    {'id': 'susann ruethrich', 'first_name': 'Susann', 'last_name': 'Rüthrich', 'party': 'SPD', 'uuid': None,
+     'absences': 1, 'contributions': 0, 'chars': 0},
+]}
+
+
+class APIServerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        APIMocker.persist_json([APIMocker.plenum_short(HEADER, TOPICS, {'SPD': 1})], os.path.join(self.dir, 'plenums.json'))
+        APIMocker.persist_json(APIMocker.plenum(HEADER, TOPICS, CONTRIBUTIONS, EXCUSED), os.path.join(self.dir, '221.json'))
+        APIMocker.persist_json(STATS, os.path.join(self.dir, 'stats.json'))
+
+        self.api = APIServer(self.dir, cache_size=8)
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(self.api.start(port=0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+        self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+
+    def tearDown(self):
+        self.conn.close()
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        # let the handlers of open connections close their transports
+        tasks = asyncio.all_tasks(self.loop)
+        for t in tasks:
+            t.cancel()
+        if tasks:
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+        shutil.rmtree(self.dir)
+
+    def get(self, path, headers=None):
+        self.conn.request('GET', path, headers=headers or {})
+        resp = self.conn.getresponse()
+        body = resp.read()
+        if resp.getheader('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return resp, json.loads(body) if body else None
+
+    def test_endpoints(self):
+        resp, data = self.get('/plenums')
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(data[0]['session'], '221')
+
+        _, data = self.get('/sessions/221')
+        self.assertEqual(data['contributions'], 120)
+        self.assertEqual(data['agendaItems'], TOPICS)
+        self.assertEqual(data['absentRepresentatives'], EXCUSED)
+
+        _, data = self.get('/sessions/221/contributions?offset=100&limit=50')
+        self.assertEqual((data['total'], data['offset'], data['limit']), (120, 100, 50))
+        self.assertEqual(data['contributions'], CONTRIBUTIONS[100:])
+        _, data = self.get('/sessions/221/contributions')
+        self.assertEqual(data['contributions'], CONTRIBUTIONS[:50])
+
+        _, data = self.get('/sessions/221/contributions/7')
+        self.assertEqual(data, CONTRIBUTIONS[7])
+
+        _, data = self.get('/deputies?name=r%C3%BCth')
+        self.assertEqual([d['id'] for d in data['deputies']], ['susann ruethrich'])
+        _, data = self.get('/deputies/anna%20muster')
+        self.assertEqual(data['contributions'], 120)
+        _, data = self.get('/deputies/muster')
+        self.assertEqual(data['id'], 'anna muster')
+
+    def test_session_file_name(self):
+        header = dict(HEADER, session='5')
+        APIMocker.persist_json(APIMocker.plenum(header, TOPICS, CONTRIBUTIONS[:3], EXCUSED),
+                               os.path.join(self.dir, '005.json'))
+        _, data = self.get('/sessions/5')
+        self.assertEqual((data['session'], data['contributions']), ('5', 3))
+
+    def test_errors(self):
+        for path in ['/sessions/222', '/sessions/221/contributions/120', '/deputies/nobody', '/nothing']:
+            resp, data = self.get(path)
+            self.assertEqual(resp.status, 404, path)
+            self.assertEqual(data['error'], 'not found')
+        resp, _ = self.get('/sessions/221/contributions?limit=x')
+        self.assertEqual(resp.status, 400)
+        self.conn.request('POST', '/plenums', body=b'{}')
+        resp = self.conn.getresponse()
+        resp.read()
+        self.assertEqual(resp.status, 405)
+
+    def test_bad_content_length(self):
+        self.conn.putrequest('GET', '/plenums')
+        self.conn.putheader('Content-Length', 'abc')
+        self.conn.endheaders()
+        resp = self.conn.getresponse()
+        self.assertEqual(resp.status, 400)
+        self.assertEqual(json.loads(resp.read())['error'], 'bad request')
+        self.assertEqual(resp.getheader('Connection'), 'close')
+
+    def test_server_errors(self):
+        APIMocker.persist_json({'parties': {}}, os.path.join(self.dir, 'stats.json'))
+        with open(os.path.join(self.dir, '221.json'), 'w') as f:
+            f.write('{"session": ')
+        logging.getLogger('api_server').setLevel(logging.CRITICAL)
+        try:
+            for path in ['/deputies', '/sessions/221']:
+                resp, data = self.get(path)
+                self.assertEqual(resp.status, 500, path)
+                self.assertEqual(data['error'], 'internal server error')
+        finally:
+            logging.getLogger('api_server').setLevel(logging.NOTSET)
+        # the connection is still usable
+        resp, _ = self.get('/plenums')
+        self.assertEqual(resp.status, 200)
+
+    def test_etag_and_gzip(self):
+        resp, data = self.get('/sessions/221/contributions', {'Accept-Encoding': 'gzip'})
+        self.assertEqual(resp.getheader('Content-Encoding'), 'gzip')
+        etag = resp.getheader('ETag')
+
+        resp, data = self.get('/sessions/221/contributions', {'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        self.assertEqual(resp.status, 304)
+        self.assertIsNone(data)
+
+        # the identity encoding has its own ETag
+        resp, data = self.get('/sessions/221/contributions', {'If-None-Match': etag})
+        self.assertEqual(resp.status, 200)
+        self.assertIsNone(resp.getheader('Content-Encoding'))
+        self.assertNotEqual(resp.getheader('ETag'), etag)
+
+        # small responses aren't compressed
+        resp, _ = self.get('/sessions/221/contributions/1', {'Accept-Encoding': 'gzip'})
+        self.assertIsNone(resp.getheader('Content-Encoding'))
+
+    def test_cache(self):
+        for i in range(3):
+            self.get('/sessions/221/contributions/3')
+        self.assertEqual((self.api.cache.hits, self.api.cache.misses), (2, 1))
+
+        # an updated file is picked up
+        contributions = [dict(c, speech='Neu') for c in CONTRIBUTIONS]
+        filename = os.path.join(self.dir, '221.json')
+        APIMocker.persist_json(APIMocker.plenum(HEADER, TOPICS, contributions, EXCUSED), filename)
+        os.utime(filename, ns=(time.time_ns(), time.time_ns() + 10**9))
+        _, data = self.get('/sessions/221/contributions/3')
+        self.assertEqual(data['speech'], 'Neu')
+
+        for i in range(20):
+            self.get('/sessions/221/contributions/{}'.format(i))
+        self.assertEqual(len(self.api.cache), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import gzip
+import json
+import shutil
+import tempfile
+
+sys.path.insert(0, '../src')
+from APIMocker import APIMocker, EXPORT_VERSION
+
+HEADER = {'session': '221', 'date': '30.3.2017', 'start_time': '9:00', 'end_time': '12:00'}
+TOPICS = [{'type': 'Tagesordnungspunkt', 'id': '1', 'summary': 'Mehr Sport', 'start_idx': 10, 'end_idx': 50}]
+EXCUSED = [{'first_name': 'Susann', 'last_name': 'Rüthrich', 'party': 'SPD'}]
+
+
+def contributions(n):
+    for i in range(n):
+        yield {'speaker': {'first_name': 'Anna', 'last_name': 'Muster'}, 'start_idx': i, 'end_idx': i + 1,
+               'speech': 'Sport ist gut. ' * i}
+
+
+class Plenum(unittest.TestCase):
+    def test_speakers(self):
+        anna = {'first_name': 'Anna', 'last_name': 'Muster'}
+        susann = {'first_name': 'Susann', 'last_name': 'Rüthrich', 'aw': {'uuid': 'x'}}
+        speeches = [{'speaker': s, 'start_idx': i, 'end_idx': i + 1, 'speech': str(i)}
+                    for i, s in enumerate([anna, susann, dict(anna), anna, dict(susann, aw={'uuid': 'x'})])]
+        p = APIMocker.plenum(HEADER, TOPICS, speeches[:2] + TOPICS + speeches[2:], EXCUSED)
+        self.assertEqual(p['speakers'], [anna, susann])
+        self.assertEqual([c.get('speaker') for c in p['contributions']], [0, 1, None, 0, 0, 1])
+        self.assertEqual(p['contributions'][2], TOPICS[0])
+        self.assertEqual(speeches[0]['speaker'], anna)
+
+    def test_speakers_before_contributions(self):
+        # the speaker table doesn't depend on the contributions being encoded first
+        p = APIMocker.plenum(HEADER, TOPICS, contributions(3), EXCUSED, stream=True)
+        self.assertEqual(json.loads(json.dumps(p['speakers'])), [{'first_name': 'Anna', 'last_name': 'Muster'}])
+        self.assertEqual([c['speaker'] for c in p['contributions']], [0, 0, 0])
+
+
+class StreamPlenum(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, '221.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def expected(self, n, **kwargs):
+        p = APIMocker.plenum(HEADER, TOPICS, list(contributions(n)), EXCUSED)
+        return json.dumps(p, ensure_ascii=False, **kwargs)
+
+    def test_compact(self):
+        written = APIMocker.stream_plenum(HEADER, TOPICS, contributions(20), EXCUSED, self.filename)
+        with open(self.filename, encoding='utf8') as f:
+            self.assertEqual(f.read(), self.expected(20, separators=(',', ':')))
+        with gzip.open(self.filename + '.gz', 'rt', encoding='utf8') as f:
+            self.assertEqual(f.read(), self.expected(20, separators=(',', ':')))
+        self.assertEqual(written[self.filename], os.path.getsize(self.filename))
+        self.assertLess(written[self.filename + '.gz'], written[self.filename])
+        self.assertEqual(sorted(os.listdir(self.dir)), sorted(os.path.basename(f) for f in written))
+
+    def test_indent(self):
+        APIMocker.stream_plenum(HEADER, TOPICS, contributions(3), EXCUSED, self.filename, compact=False, precompress=())
+        with open(self.filename, encoding='utf8') as f:
+            self.assertEqual(f.read(), self.expected(3, indent=4))
+        self.assertEqual(os.listdir(self.dir), ['221.json'])
+
+    def test_empty(self):
+        APIMocker.stream_plenum(HEADER, TOPICS, contributions(0), EXCUSED, self.filename, precompress=())
+        with open(self.filename, encoding='utf8') as f:
+            self.assertEqual(json.load(f)['contributions'], [])
+
+    def test_export_versions(self):
+        self.assertEqual(APIMocker.read_export_versions(self.dir), {})
+        APIMocker.write_export_versions(self.dir, {'221': EXPORT_VERSION})
+        self.assertEqual(APIMocker.read_export_versions(self.dir), {'221': EXPORT_VERSION})
+
+    def test_failure_leaves_no_file(self):
+        def failing():
+            yield from contributions(2)
+            raise ValueError()
+        with self.assertRaises(ValueError):
+            APIMocker.stream_plenum(HEADER, TOPICS, failing(), EXCUSED, self.filename)
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+class PagedPlenum(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.contributions = list(contributions(40))
+        self.contributions[3]['interjections'] = [{'type': 'applause', 'parties': ['SPD'], 'offset': 0}]
+        self.contributions[3]['reactions'] = {'applause': 1}
+        # an agenda item between the speeches
+        self.contributions.insert(20, dict(TOPICS[0]))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self, name):
+        with open(os.path.join(self.dir, '221', name), encoding='utf8') as f:
+            return json.load(f)
+
+    def test_pages(self):
+        head, pages = APIMocker.paged_plenum(HEADER, TOPICS, self.contributions, EXCUSED, page_chars=1000)
+        self.assertGreater(len(pages), 5)
+        for first, page in pages:
+            chars = sum(len(c.get('speech', '')) for c in page)
+            self.assertTrue(chars <= 1000 or len(page) == 1)
+        self.assertEqual([c for _, page in pages for c in page], self.contributions)
+        self.assertEqual([p['first'] for p in head['pages']], [first for first, _ in pages])
+
+        for i, (h, c) in enumerate(zip(head['contributions'], self.contributions)):
+            first, page = pages[h['page']]
+            self.assertIs(page[i - first], c)
+            self.assertNotIn('speech', h)
+        self.assertEqual(head['contributions'][5]['length'], len(self.contributions[5]['speech']))
+        self.assertNotIn('length', head['contributions'][20])
+        # the head keeps the counts, the events are on the pages
+        self.assertEqual(head['contributions'][3]['reactions'], {'applause': 1})
+        self.assertNotIn('interjections', head['contributions'][3])
+
+    def test_files(self):
+        directory = os.path.join(self.dir, '221')
+        APIMocker.stream_paged_plenum(HEADER, TOPICS, self.contributions, EXCUSED, directory,
+                                      precompress=('gz',), page_chars=1000)
+        head = self.read('head.json')
+        self.assertEqual(head['agendaItems'], TOPICS)
+        self.assertEqual(head['absentRepresentatives'], EXCUSED)
+
+        # rebuild the contributions from the head and the pages
+        rebuilt = []
+        for h in head['contributions']:
+            page = self.read(head['pages'][h['page']]['file'])
+            c = {k: v for k, v in h.items() if k not in ('page', 'length')}
+            if 'speaker' in c:
+                c['speaker'] = head['speakers'][c['speaker']]
+            speech = page['speeches'][len(rebuilt) - page['first']]
+            if speech is not None:
+                c['speech'] = speech
+            interjections = page['interjections'][len(rebuilt) - page['first']]
+            if interjections is not None:
+                c['interjections'] = interjections
+            rebuilt.append(c)
+        self.assertEqual(rebuilt, self.contributions)
+
+        # a shorter export removes the pages it doesn't need anymore
+        n = len(head['pages'])
+        APIMocker.stream_paged_plenum(HEADER, TOPICS, self.contributions[:3], EXCUSED, directory,
+                                      precompress=('gz',), page_chars=1000)
+        self.assertEqual(len(self.read('head.json')['pages']), 1)
+        self.assertEqual(sorted(os.listdir(directory)), ['head.json', 'head.json.gz', 'page-0000.json', 'page-0000.json.gz'])
+        self.assertGreater(n, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
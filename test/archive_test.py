@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import io
+import os
+import shutil
+import tarfile
+import zipfile
+import logging
+import tempfile
+
+sys.path.insert(0, '../src')
+from archive import iter_archive, parse_archive
+from deputy_registry import DeputyRegistry
+from plenar_parser import parse_plenar_transcript
+import fixtures
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+
+SESSIONS = [219, 220, 221]
+
+
+def transcript(session):
+    return fixtures.SAMPLE_TRANSCRIPT.format(session=session)
+
+
+class ParseInputTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.registry = DeputyRegistry.load(fixtures.write_deputies(self.dir))
+        self.filename = fixtures.write_transcript(self.dir, 221)
+        self.expected = parse_plenar_transcript(self.filename, self.registry)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_inputs(self):
+        data = transcript(221)
+        with open(self.filename, 'rb') as f:
+            self.assertEqual(parse_plenar_transcript(f, self.registry), self.expected)
+        self.assertEqual(parse_plenar_transcript(io.StringIO(data), self.registry), self.expected)
+        self.assertEqual(parse_plenar_transcript(data.encode('utf8'), self.registry), self.expected)
+        self.assertEqual(parse_plenar_transcript('18221.txt', self.registry, text=data), self.expected)
+        self.assertEqual(parse_plenar_transcript('18221.txt', self.registry, text=data.replace('\n', '\r\n')),
+                         self.expected)
+
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.deputies = fixtures.write_deputies(self.dir)
+        registry = DeputyRegistry.load(self.deputies)
+        self.expected = [parse_plenar_transcript('18{}.txt'.format(s), registry, text=transcript(s)) for s in SESSIONS]
+
+        self.zip = os.path.join(self.dir, 'protokolle.zip')
+        with zipfile.ZipFile(self.zip, 'w', zipfile.ZIP_DEFLATED) as z:
+            z.writestr('protokolle/', '')
+            z.writestr('protokolle/README.md', 'nothing to parse')
+            for s in SESSIONS:
+                z.writestr('protokolle/18{}.txt'.format(s), transcript(s))
+
+        self.tar = os.path.join(self.dir, 'protokolle.tar.gz')
+        with tarfile.open(self.tar, 'w:gz') as t:
+            for s in SESSIONS:
+                data = transcript(s).encode('utf8')
+                info = tarfile.TarInfo('18{}.txt'.format(s))
+                info.size = len(data)
+                t.addfile(info, io.BytesIO(data))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_members(self):
+        self.assertEqual([name for name, _ in iter_archive(self.zip)],
+                         ['protokolle/18{}.txt'.format(s) for s in SESSIONS])
+        self.assertEqual([(name, data.decode('utf8')) for name, data in iter_archive(self.tar)],
+                         [('18{}.txt'.format(s), transcript(s)) for s in SESSIONS])
+
+    def test_parse(self):
+        before = sorted(os.listdir(self.dir))
+        for archive in (self.zip, self.tar):
+            for workers in (1, 2):
+                results = list(parse_archive(archive, workers, self.deputies))
+                self.assertEqual([r.error for r in results], [None] * len(SESSIONS))
+                self.assertEqual([r.result for r in results], self.expected)
+                self.assertEqual([os.path.basename(r.file) for r in results], ['18{}.txt'.format(s) for s in SESSIONS])
+        self.assertEqual(sorted(os.listdir(self.dir)), before)
+
+    def test_failure(self):
+        broken = os.path.join(self.dir, 'broken.zip')
+        with zipfile.ZipFile(broken, 'w') as z:
+            z.writestr('18222.txt', 'kein Protokoll')
+            z.writestr('18221.txt', transcript(221))
+        logging.getLogger('batch').setLevel(logging.CRITICAL)
+        results = list(parse_archive(broken, 1, self.deputies))
+        self.assertIsNotNone(results[0].error)
+        self.assertEqual(results[1].result, self.expected[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
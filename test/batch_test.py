@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import shutil
+import logging
+import tempfile
+
+sys.path.insert(0, '../src')
+from batch import parse_batch
+import fixtures
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+
+
+class ParseBatch(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.deputies = fixtures.write_deputies(self.dir)
+        self.files = [fixtures.write_transcript(self.dir, s) for s in range(200, 206)]
+        self.files.insert(3, fixtures.write_transcript(self.dir, 99, text='not a transcript'))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_parallel_matches_serial(self):
+        serial = list(parse_batch(self.files, workers=1, deputies_path=self.deputies))
+        parallel = list(parse_batch(self.files, workers=2, chunksize=2, deputies_path=self.deputies))
+
+        self.assertEqual([r.file for r in parallel], self.files)
+        self.assertEqual([r.result for r in parallel], [r.result for r in serial])
+        self.assertEqual([r.unresolved for r in parallel], [r.unresolved for r in serial])
+
+    def test_failures(self):
+        results = list(parse_batch(self.files, workers=2, deputies_path=self.deputies))
+        failed = [r.file for r in results if r.error is not None]
+        self.assertEqual(failed, [self.files[3]])
+        self.assertIsNone(results[3].result)
+        self.assertEqual(results[0].result[0]['session'], '200')
+        self.assertEqual([p['last_name'] for p in results[0].unresolved], ['Muster'])
+
+
+if __name__ == '__main__':
+    unittest.main()
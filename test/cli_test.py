@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import json
+import shutil
+import logging
+import tempfile
+import subprocess
+import contextlib
+import io
+
+sys.path.insert(0, '../src')
+import cli
+import fixtures
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+
+
+def imported_modules(command):
+    """Modules imported by loading `command` in a fresh interpreter."""
+    code = 'import sys; sys.path.insert(0, "../src"); import cli; cli.load({!r}); print(" ".join(sys.modules))'
+    return set(subprocess.check_output([sys.executable, '-c', code.format(command)]).decode().split())
+
+
+class LazyImportsTest(unittest.TestCase):
+    def test_parse(self):
+        modules = imported_modules('parse')
+        self.assertIn('plenar_parser', modules)
+        self.assertFalse({'bs4', 'html5lib', 'fetch', 'downloader', 'APIMocker', 'search_index'} & modules)
+
+    def test_export(self):
+        modules = imported_modules('export')
+        self.assertIn('store', modules)
+        self.assertFalse({'bs4', 'html5lib', 'plenar_parser', 'scanner', 'downloader'} & modules)
+
+    def test_fetch(self):
+        modules = imported_modules('fetch')
+        self.assertIn('downloader', modules)
+        self.assertFalse({'bs4', 'html5lib', 'plenar_parser', 'store'} & modules)
+
+    def test_worker(self):
+        modules = imported_modules('worker')
+        self.assertIn('plenar_parser', modules)
+        self.assertFalse({'bs4', 'html5lib', 'fetch', 'downloader', 'APIMocker', 'store'} & modules)
+
+
+class StagesTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.data = os.path.join(self.dir, 'data')
+        self.out = os.path.join(self.dir, 'out')
+        self.db = os.path.join(self.dir, 'plenar.db')
+        os.makedirs(self.data)
+        self.deputies = fixtures.write_deputies(self.dir)
+        for session in (220, 221):
+            fixtures.write_transcript(self.data, session)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_cli(self, *argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            status = cli.main(list(argv))
+        return status, out.getvalue()
+
+    def test_parse_and_export(self):
+        timings = os.path.join(self.dir, 'timings.json')
+        status, out = self.run_cli('parse', '--data-dir', self.data, '--db', self.db, '--deputies', self.deputies,
+                                   '--workers', '1', '--timings', timings)
+        self.assertEqual(status, 0)
+        self.assertIn('18221.txt: session 221', out)
+        with open(timings) as f:
+            self.assertGreater(json.load(f)['startup'], 0)
+
+        # a second run takes the results from the parse cache
+        status, out = self.run_cli('parse', '--data-dir', self.data, '--db', self.db, '--deputies', self.deputies,
+                                   '--workers', '1')
+        self.assertEqual(out.count('(cached)'), 2)
+
+        status, out = self.run_cli('export', '--db', self.db, '--out', self.out, '--precompress', '', '--paged')
+        self.assertEqual(status, 0)
+        for name in ['plenums.json', '220.json', '221.json', 'stats.json', os.path.join('221', 'head.json'),
+                     os.path.join('search', 'terms.json')]:
+            self.assertTrue(os.path.exists(os.path.join(self.out, name)), name)
+        with open(os.path.join(self.out, 'plenums.json'), encoding='utf8') as f:
+            self.assertEqual([p['session'] for p in json.load(f)], ['220', '221'])
+
+    def test_distribute(self):
+        status, out = self.run_cli('distribute', '--spool', os.path.join(self.dir, 'spool'), '--data-dir', self.data,
+                                   '--out', self.out, '--deputies', self.deputies, '--local-workers', '2',
+                                   '--poll-interval', '0.1', '--precompress', '')
+        self.assertEqual(status, 0)
+        with open(os.path.join(self.out, 'plenums.json'), encoding='utf8') as f:
+            self.assertEqual([p['session'] for p in json.load(f)], ['220', '221'])
+        self.assertIn('221.json', out)
+
+    def test_distribute_needs_workers_or_timeout(self):
+        spool = os.path.join(self.dir, 'spool')
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                self.run_cli('distribute', '--spool', spool, '--data-dir', self.data, '--out', self.out)
+            status, _ = self.run_cli('distribute', '--spool', spool, '--data-dir', self.data, '--out', self.out,
+                                     '--timeout', '0.2', '--poll-interval', '0.05')
+        self.assertEqual(status, 1)
+        self.assertFalse(os.path.exists(self.out))
+
+    def test_repeated_session(self):
+        # session 221 of the 18th and the 19th legislative period
+        shutil.copy(os.path.join(self.data, '18221.txt'), os.path.join(self.data, '19221.txt'))
+        status, out = self.run_cli('parse', '--data-dir', self.data, '--db', self.db, '--deputies', self.deputies,
+                                   '--workers', '1', '--no-cache')
+        self.assertEqual(status, 1)
+        self.assertIn('Skipping 19221.txt: session 221 is already taken by 18221.txt', out)
+        self.assertIn('18220.txt: session 220', out)
+
+    def test_export_without_db(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            status, _ = self.run_cli('export', '--db', self.db, '--out', self.out)
+        self.assertEqual(status, 2)
+        self.assertFalse(os.path.exists(self.db))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+
+sys.path.insert(0, '../src')
+from deputy_registry import DeputyRegistry
+from plenar_parser import match_abgeordnetenwatch
+
+
+def profile(first_name, last_name, uuid):
+    return {
+        'personal': {
+            'first_name': first_name,
+            'last_name': last_name,
+            'picture': {'url': 'https://example.org/{}.jpg'.format(uuid)}
+        },
+        'meta': {'uuid': uuid}
+    }
+
+AW_DATA = {
+    'profiles': [
+        profile('Norbert', 'Lammert', 'lammert'),
+        profile('Hans-Christian', 'Ströbele', 'stroebele'),
+        profile('Rita', 'Schwarzelühr-Sutter', 'schwarzeluehr'),
+        profile('Harald', 'Petzold', 'petzold'),
+        profile('Thomas', 'Strobl', 'strobl'),
+        profile('Andreas', 'Müller', 'mueller-a'),
+        profile('Andrea', 'Müller', 'mueller-b'),
+        profile('Gabriele', 'Groß', 'gross'),
+    ]
+}
+
+# (first_name, last_name) as found in transcripts -> expected uuid
+DEPUTY_TEST_SET = (
+    (('Norbert', 'Lammert'), 'lammert'),
+    (('Dr. Norbert', 'Lammert'), 'lammert'),
+    (('Hans-Christian', 'Ströbele'), 'stroebele'),
+    (('Hans Christian', 'Stroebele'), 'stroebele'),
+    (('Rita', 'Schwarzelühr-Sutter'), 'schwarzeluehr'),
+    (('Rita', 'Schwarzelühr'), 'schwarzeluehr'),
+    (('Harald', 'Petzold (Havelland)'), 'petzold'),
+    (('Gabriele', 'Gross'), 'gross'),
+    (('Andreas', 'Mueller'), 'mueller-a'),
+    (('Unknown', 'Person'), None),
+)
+
+
+class DeputyRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = DeputyRegistry(AW_DATA)
+
+    def test_lookup(self):
+        for (first_name, last_name), uuid in DEPUTY_TEST_SET:
+            entry = self.registry.lookup(first_name, last_name)
+            if uuid is None:
+                self.assertIsNone(entry, (first_name, last_name))
+            else:
+                self.assertIsNotNone(entry, (first_name, last_name))
+                self.assertEqual(entry['uuid'], uuid)
+
+    def test_unresolved(self):
+        for name in [('Unknown', 'Person'), ('Norbert', 'Lammert'), ('Unknown', 'Person')]:
+            person = {'first_name': name[0], 'last_name': name[1]}
+            match_abgeordnetenwatch(person, self.registry)
+        unresolved = self.registry.pop_unresolved()
+        self.assertEqual(unresolved, [{'first_name': 'Unknown', 'last_name': 'Person'}])
+        self.assertEqual(self.registry.unresolved, [])
+
+    def test_match(self):
+        person = match_abgeordnetenwatch({'first_name': 'Harald', 'last_name': 'Petzold'}, self.registry)
+        self.assertDictEqual(person['aw'], {'image_url': 'https://example.org/petzold.jpg', 'uuid': 'petzold'})
+
+
+if __name__ == '__main__':
+    unittest.main()
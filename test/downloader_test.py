@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import re
+import shutil
+import logging
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, '../src')
+from downloader import Downloader, VALIDATORS_FILE
+
+logging.getLogger('downloader').setLevel(logging.CRITICAL)
+
+PROTOCOLS = {'/files/18{:03d}.txt'.format(i): 'Plenarprotokoll 18/{}\n'.format(i).encode('utf8') * 100
+             for i in range(1, 8)}
+
+
+class ProtocolHandler(BaseHTTPRequestHandler):
+    """Serves a paged listing of `PROTOCOLS` and the protocols with ETags."""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status, body, headers=()):
+        self.send_response(status)
+        for h in headers:
+            self.send_header(*h)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get('If-None-Match')))
+            server.clients.add(self.client_address)
+        url = urlsplit(self.path)
+
+        if url.path == '/list':
+            q = parse_qs(url.query)
+            offset, limit = int(q['offset'][0]), int(q['limit'][0])
+            links = sorted(PROTOCOLS)[offset:offset + limit]
+            body = ''.join('<a href="{}">x</a>'.format(l) for l in links).encode('utf8')
+            return self.send_body(200, body)
+
+        if url.path in server.failing:
+            return self.send_body(500, b'')
+
+        etag = '"{}"'.format(hash(PROTOCOLS[url.path]))
+        if self.headers.get('If-None-Match') == etag:
+            return self.send_body(304, b'', [('ETag', etag)])
+        self.send_body(200, PROTOCOLS[url.path], [('ETag', etag)])
+
+
+def extract_links(data):
+    return re.findall(r'href="([^"]+)"', data.decode('utf8'))
+
+
+class DownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ProtocolHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.clients = set()
+        self.server.failing = set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = 'http://127.0.0.1:{}'.format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.dir)
+
+    def download(self, **kwargs):
+        with Downloader(self.dir, workers=3, backoff=0, **kwargs) as d:
+            links = [l for page in d.iter_listing(self.base + '/list?limit={limit}&offset={offset}', extract_links, 3)
+                     for l in page]
+            return d.fetch_all([(self.base + l, os.path.join(self.dir, os.path.basename(l))) for l in links])
+
+    def test_download(self):
+        results = self.download()
+        self.assertEqual([s for _, s in results], ['downloaded'] * len(PROTOCOLS))
+        for path, body in PROTOCOLS.items():
+            with open(os.path.join(self.dir, os.path.basename(path)), 'rb') as f:
+                self.assertEqual(f.read(), body)
+        # 4 listing pages (the last one empty) and 7 protocols over at most 4 connections
+        self.assertEqual(len(self.server.requests), 4 + len(PROTOCOLS))
+        self.assertLessEqual(len(self.server.clients), 4)
+        self.assertTrue(os.path.exists(os.path.join(self.dir, VALIDATORS_FILE)))
+
+    def test_conditional(self):
+        self.download()
+        del self.server.requests[:]
+        results = self.download()
+        self.assertEqual([s for _, s in results], ['unchanged'] * len(PROTOCOLS))
+        self.assertTrue(all(etag for path, etag in self.server.requests if path.startswith('/files')))
+
+    def test_failure_leaves_no_file(self):
+        self.server.failing.add('/files/18003.txt')
+        results = dict(self.download(retries=2))
+        self.assertIsInstance(results[os.path.join(self.dir, '18003.txt')], Exception)
+        self.assertEqual(sorted(os.listdir(self.dir)),
+                         sorted([VALIDATORS_FILE] + [os.path.basename(p) for p in PROTOCOLS if p != '/files/18003.txt']))
+        self.assertEqual(len([p for p, _ in self.server.requests if p == '/files/18003.txt']), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
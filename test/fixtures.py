@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Small transcript and deputy data shared by the tests."""
+import os
+import json
+
+SAMPLE_TRANSCRIPT = """Plenarprotokoll 18/{session}
+
+Deutscher Bundestag
+Stenografischer Bericht
+{session}. Sitzung
+Berlin, Donnerstag, den 30. März 2017
+Inhalt:
+Tagesordnungspunkt 1:
+Beratung des Antrags der Fraktion der SPD: Mehr Sport
+11111 A
+Tagesordnungspunkt 2:
+Beratung des Antrags der Fraktion DIE LINKE: Weniger Sport
+11112 B
+Beginn: 9.00 Uhr
+Redetext
+  Präsident Dr. Norbert Lammert: 
+  Guten Morgen! Ich rufe den Tagesordnungspunkt 1 auf: Mehr Sport. Das Wort hat Anna Muster.
+(Beifall bei der SPD)
+  Anna Muster (SPD): 
+  Herr Präsident! Sport ist gut.
+(Beifall bei der SPD – Zuruf von der LINKEN: Nein!)
+  Präsident Dr. Norbert Lammert: 
+  Ich rufe den Tagesordnungspunkt 2 auf: Weniger Sport.
+  Hans-Christian Ströbele (BÜNDNIS 90/DIE GRÜNEN): 
+  Sport ist anstrengend.
+(Schluss: 12.00 Uhr)
+
+Anlagen zum Stenografischen Bericht
+Anlage 1
+Liste der entschuldigten Abgeordneten
+Abgeordnete(r)
+Schmidt (Ühlingen), Gabriele
+CDU/CSU
+30.03.2017
+Rüthrich, Susann *
+SPD
+30.03.2017
+Anlage 2
+Erklärung nach § 31 GO
+"""
+
+AW_DATA = {
+    'profiles': [
+        {
+            'personal': {
+                'first_name': first_name,
+                'last_name': last_name,
+                'picture': {'url': 'https://example.org/{}.jpg'.format(uuid)}
+            },
+            'meta': {'uuid': uuid}
+        } for first_name, last_name, uuid in [
+            ('Norbert', 'Lammert', 'lammert'),
+            ('Hans-Christian', 'Ströbele', 'stroebele'),
+        ]
+    ]
+}
+
+
+def write_transcript(directory, session, text=SAMPLE_TRANSCRIPT):
+    filename = os.path.join(directory, '18{:03d}.txt'.format(session))
+    with open(filename, 'w', encoding='utf8') as f:
+        f.write(text.format(session=session))
+    return filename
+
+
+def write_deputies(directory):
+    filename = os.path.join(directory, 'deputies.json')
+    with open(filename, 'w', encoding='utf8') as f:
+        json.dump(AW_DATA, f)
+    return filename
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import copy
+import random
+import logging
+
+sys.path.insert(0, '../src')
+from plenar_parser import inject_agenda_items
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+
+
+def reference_inject_agenda_items(contributions, agenda_items):
+    """The former list-splicing implementation, kept to check the output order."""
+    def is_speaker_in_range(t, c):
+        return 'speaker' in c and (c['start_idx'] <= t['start_idx'] and c['end_idx'] >= t['start_idx'])
+
+    contrib_agenda = copy.deepcopy(contributions)
+    for t in agenda_items:
+        i, c = next(((i, c) for i, c in enumerate(contrib_agenda) if is_speaker_in_range(t, c)), (None, None))
+        if i is not None:
+            c0 = copy.deepcopy(c)
+            c0['speech'] = c0['speech'][:t['start_idx']-c0['start_idx']]
+            c0['end_idx'] = t['start_idx']
+            c1 = copy.deepcopy(c)
+            c1['speech'] = c1['speech'][t['start_idx']-c0['start_idx']:]
+            c1['start_idx'] += t['start_idx']-c0['start_idx']
+            del contrib_agenda[i]
+            contrib_agenda[i:i] = [c0, t, c1]
+    return contrib_agenda
+
+
+def random_sitting(rnd, n_contributions, n_topics):
+    text = ''.join(rnd.choice('abcdefghij \n') for _ in range(n_contributions * 40))
+    bounds = sorted(rnd.sample(range(1, len(text)), n_contributions))
+    contributions = []
+    for s, e in zip(bounds, bounds[1:] + [len(text)]):
+        header = rnd.randint(0, min(5, e - s))
+        contributions.append({
+            'speaker': {'first_name': 'Anna', 'last_name': 'Muster'},
+            'start_idx': s,
+            'end_idx': e,
+            'speech': text[s+header:e]
+        })
+    topics = []
+    for i in range(n_topics):
+        start = rnd.choice([-1, 0, rnd.choice(bounds), rnd.randint(0, len(text))])
+        topics.append({'type': 'Tagesordnungspunkt', 'id': str(i), 'summary': '', 'start_idx': start, 'end_idx': start})
+    return contributions, topics
+
+
+class InjectAgendaItems(unittest.TestCase):
+    def test_matches_reference(self):
+        rnd = random.Random(42)
+        for _ in range(200):
+            contributions, topics = random_sitting(rnd, rnd.randint(1, 15), rnd.randint(0, 10))
+            expected = reference_inject_agenda_items(contributions, topics)
+            self.assertEqual(inject_agenda_items(contributions, topics), expected)
+
+    def test_does_not_modify_input(self):
+        contributions, topics = random_sitting(random.Random(1), 10, 5)
+        before = copy.deepcopy(contributions)
+        inject_agenda_items(contributions, topics)
+        self.assertEqual(contributions, before)
+
+
+if __name__ == '__main__':
+    unittest.main()
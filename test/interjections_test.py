@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import shutil
+import logging
+import tempfile
+
+sys.path.insert(0, '../src')
+from interjections import extract_interjections, count_reactions
+from text_span import TextSpan
+from deputy_registry import DeputyRegistry
+from plenar_parser import parse_plenar_transcript
+import fixtures
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+
+SPEECH = """
+  Herr Präsident! Sport ist gut.
+(Beifall bei der SPD – Zuruf von der LINKEN: Nein!)
+  Der Antrag
+(Drucksache 18/1234) liegt vor, siehe (Beifall) oben.
+(Lebhafter Beifall bei der CDU/CSU und dem BÜNDNIS 90/DIE GRÜNEN – Volker Kauder [CDU/CSU]: Das stimmt
+nicht! – Heiterkeit)
+(Zuruf des Abg. Jan Korte [DIE LINKE])
+(Beifall bei Abgeordneten der AfD)"""
+
+
+class ExtractTest(unittest.TestCase):
+    def test_events(self):
+        events = extract_interjections(SPEECH)
+        self.assertEqual([(e['type'], e['parties'], e.get('speaker'), e.get('text')) for e in events], [
+            ('applause', ['SPD'], None, None),
+            ('heckle', ['DIE LINKE'], None, 'Nein!'),
+            ('applause', ['CDU/CSU', 'BÜNDNIS 90/DIE GRÜNEN'], None, None),
+            ('heckle', ['CDU/CSU'], 'Volker Kauder', 'Das stimmt nicht!'),
+            ('laughter', [], None, None),
+            ('heckle', ['DIE LINKE'], 'Jan Korte', None),
+            ('applause', ['AfD'], None, None),
+        ])
+        for e in events:
+            self.assertEqual(SPEECH[e['offset']], '(')
+        self.assertEqual(count_reactions(events), {'applause': 3, 'heckle': 3, 'laughter': 1})
+
+    def test_several_reactions(self):
+        events = extract_interjections('Gut.\n(Heiterkeit und Beifall bei der SPD sowie Zuruf von der FDP: Und '
+                                       'Beifall bei wem?)\n(Beifall bei der CDU/CSU und der SPD)')
+        self.assertEqual([(e['type'], e['parties'], e.get('text')) for e in events], [
+            ('laughter', [], None),
+            ('applause', ['SPD'], None),
+            ('heckle', ['FDP'], 'Und Beifall bei wem?'),
+            ('applause', ['CDU/CSU', 'SPD'], None),
+        ])
+        self.assertEqual(len({e['offset'] for e in events[:3]}), 1)
+
+    def test_span(self):
+        text = 'Anna Muster (SPD):' + SPEECH + '\n(Beifall bei der FDP)'
+        span = TextSpan(text, len('Anna Muster (SPD):'), len(text) - len('\n(Beifall bei der FDP)'))
+        self.assertEqual(extract_interjections(span), extract_interjections(SPEECH))
+
+
+class ParsedInterjectionsTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        registry = DeputyRegistry.load(fixtures.write_deputies(self.dir))
+        self.result = parse_plenar_transcript(fixtures.write_transcript(self.dir, 221), registry)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_counts(self):
+        metadata, _, contributions, _ = self.result
+        self.assertEqual(metadata['reactions'], {'applause': 2, 'heckle': 1})
+        anna = [c for c in contributions if c.get('speaker', {}).get('last_name') == 'Muster']
+        self.assertEqual(anna[0]['reactions'], {'applause': 1, 'heckle': 1})
+        for c in contributions:
+            for e in c.get('interjections', []):
+                self.assertEqual(str(c['speech'])[e['offset']], '(')
+
+
+if __name__ == '__main__':
+    unittest.main()
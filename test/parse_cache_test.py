@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import shutil
+import logging
+import tempfile
+
+sys.path.insert(0, '../src')
+from parse_cache import ParseCache
+from batch import parse_batch, cache_version
+import fixtures
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+
+
+class ParseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.dir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_roundtrip(self):
+        f = fixtures.write_transcript(self.dir, 1)
+        cache = ParseCache(self.cache_dir, 1)
+        key = cache.key(f)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, ({'session': '1'}, [], [], []))
+        self.assertEqual(cache.get(key), ({'session': '1'}, [], [], []))
+        self.assertNotEqual(ParseCache(self.cache_dir, 2).key(f), key)
+
+    def test_eviction(self):
+        cache = ParseCache(self.cache_dir, 1, max_bytes=3000)
+        for i in range(10):
+            cache.put(str(i), os.urandom(1000))
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(self.cache_dir, n)) for n in os.listdir(self.cache_dir)), 3000)
+        self.assertIsNotNone(cache.get('9'))
+        self.assertIsNone(cache.get('0'))
+
+    def test_batch(self):
+        deputies = fixtures.write_deputies(self.dir)
+        files = [fixtures.write_transcript(self.dir, s) for s in range(10, 14)]
+        cache = ParseCache(self.cache_dir, cache_version(deputies))
+
+        first = list(parse_batch(files, workers=1, deputies_path=deputies, cache=cache))
+        self.assertFalse(any(r.cached for r in first))
+
+        fixtures.write_transcript(self.dir, 12, fixtures.SAMPLE_TRANSCRIPT.replace('Sport ist gut', 'Sport ist toll'))
+        second = list(parse_batch(files, workers=2, deputies_path=deputies, cache=cache))
+        self.assertEqual([r.cached for r in second], [True, True, False, True])
+        self.assertEqual([r.result for r in second[:2]], [r.result for r in first[:2]])
+        self.assertEqual([r.unresolved for r in second], [r.unresolved for r in first])
+        self.assertNotEqual(second[2].result, first[2].result)
+
+
+if __name__ == '__main__':
+    unittest.main()
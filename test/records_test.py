@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import json
+import pickle
+import shutil
+import logging
+import tempfile
+
+sys.path.insert(0, '../src')
+from records import SpeakerTable, Contribution
+from text_span import TextSpan
+from APIMocker import APIMocker
+from deputy_registry import DeputyRegistry
+from plenar_parser import parse_plenar_transcript
+import fixtures
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+
+
+class SpeakerTableTest(unittest.TestCase):
+    def test_intern(self):
+        table = SpeakerTable()
+        resolved = []
+
+        def resolve(s):
+            resolved.append(s)
+            return dict(s, aw={'uuid': 'x'})
+
+        i, anna = table.intern({'first_name': 'Anna', 'last_name': 'Muster'}, resolve)
+        j, hans = table.intern({'first_name': 'Hans', 'last_name': 'Muster'}, resolve)
+        k, again = table.intern({'first_name': 'Anna', 'last_name': 'Muster'}, resolve)
+        self.assertEqual((i, j, k), (0, 1, 0))
+        self.assertIs(again, anna)
+        self.assertEqual(anna['aw'], {'uuid': 'x'})
+        self.assertEqual(len(resolved), 2)
+        self.assertEqual(len(table), 2)
+
+
+class ContributionTest(unittest.TestCase):
+    text = 'Anna Muster (SPD): Sport ist gut.'
+
+    def setUp(self):
+        self.speaker = {'first_name': 'Anna', 'last_name': 'Muster'}
+        self.c = Contribution(self.speaker, 0, 10, 43, TextSpan(self.text, 19, 33))
+
+    def test_reads_like_dict(self):
+        expected = {'speaker': self.speaker, 'start_idx': 10, 'end_idx': 43, 'speech': 'Sport ist gut.',
+                    'interjections': [], 'reactions': {}}
+        self.assertEqual(dict(self.c), expected)
+        self.assertEqual(self.c, expected)
+        self.assertIn('speaker', self.c)
+        self.assertNotIn('type', self.c)
+        self.assertIsNone(self.c.get('type'))
+        self.assertIs(self.c['speaker'], self.speaker)
+        self.assertIs(self.c['speech'].text, self.text)
+        self.assertFalse(hasattr(self.c, '__dict__'))
+
+    def test_copy_and_set(self):
+        c = self.c.copy()
+        c['speech'] = c['speech'][:5]
+        c['start_idx'] = 12
+        self.assertEqual((c['speech'], c['start_idx']), ('Sport', 12))
+        self.assertEqual((self.c['speech'], self.c['start_idx']), ('Sport ist gut.', 10))
+        c['speech'] = 'Neu'
+        self.assertEqual(c['speech'], 'Neu')
+        with self.assertRaises(KeyError):
+            c['speaker'] = {}
+
+    def test_pickle_shares_speaker(self):
+        other = Contribution(self.speaker, 0, 43, 50, TextSpan(self.text, 0, 4))
+        a, b = pickle.loads(pickle.dumps([self.c, other]))
+        self.assertEqual(a, self.c)
+        self.assertIs(a['speaker'], b['speaker'])
+        self.assertIs(a['speech'].text, b['speech'].text)
+
+
+class ParsedSpeakersTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.registry = DeputyRegistry.load(fixtures.write_deputies(self.dir))
+        self.filename = fixtures.write_transcript(self.dir, 221)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_speakers_are_interned(self):
+        _, _, contributions, _ = parse_plenar_transcript(self.filename, self.registry)
+        speeches = [c for c in contributions if 'speaker' in c]
+        by_name = {}
+        for c in speeches:
+            self.assertIsInstance(c, Contribution)
+            self.assertIs(by_name.setdefault(c['speaker']['last_name'], c['speaker']), c['speaker'])
+        self.assertLess(len(by_name), len(speeches))
+
+    def test_global_table(self):
+        table = SpeakerTable()
+        first = parse_plenar_transcript(self.filename, self.registry, speakers=table)[2]
+        n = len(table)
+        second = parse_plenar_transcript(self.filename, self.registry, speakers=table)[2]
+        self.assertEqual(len(table), n)
+        self.assertIs(first[-1]['speaker'], second[-1]['speaker'])
+
+    def test_export_lists_speakers_once(self):
+        metadata, summaries, contributions, excused = parse_plenar_transcript(self.filename, self.registry)
+        filename = os.path.join(self.dir, '221.json')
+        APIMocker.stream_plenum(metadata, summaries, contributions, excused, filename, precompress=())
+        with open(filename, encoding='utf8') as f:
+            data = json.load(f)
+        self.assertEqual(len(data['speakers']), len({c['speaker']['last_name'] for c in contributions if 'speaker' in c}))
+        for exported, c in zip(data['contributions'], contributions):
+            if 'speaker' in c:
+                self.assertEqual(data['speakers'][exported['speaker']], c['speaker'])
+                self.assertEqual(exported['speech'], c['speech'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import re
+import random
+
+sys.path.insert(0, '../src')
+import scanner
+from scanner import scan_transcript
+from plenar_parser import Regex, parse_agenda_summaries
+import fixtures
+
+# (kind, regex) pairs the parser stages run through the scanner
+SCANNED_REGEXES = [
+    (scanner.SESSION, Regex.session_reg_),
+    (scanner.DATE, Regex.date_reg_),
+    (scanner.BEGIN, Regex.start_time_reg_),
+    (scanner.END, Regex.end_time_reg_),
+    (scanner.SPEAKER, Regex.speaker_reg_),
+    (scanner.ANNEX, Regex.excused_start_reg_),
+    (scanner.ANNEX, Regex.excused_end_reg_),
+    (scanner.AGENDA, Regex.agenda_summary_start_reg_),
+] + Regex.agenda_summary_end_regs_
+
+LINES = ['', ' ', '\t', 'Präsident Dr. Norbert Lammert:', '  Anna Muster (SPD): ', 'Abc De:', 'ab cd:',
+         'Uwe Beckmeyer, Parl. Staatssekretär bei der Bundesministerin:', 'Tagesordnungspunkt 3:',
+         'Zusatztagesordnungspunkt 2:', ' Tagesordnungspunkt 5:', 'Tagesordnungspunkt', 'Anlage 1', 'Anlage',
+         ' Anlage 3', 'Liste der entschuldigten Abgeordneten', '12345 A', '221. Sitzung', ' 222. Sitzung ',
+         '12.', 'Sitzung', 'Amtliche Mitteilungen', 'Berlin, Donnerstag, den 30. März 2017', 'Beginn: 9.00 Uhr',
+         '(Schluss: 12.00 Uhr).', '17542 Deutscher Bundestag – 18. Wahlperiode', 'bla bla', '\r']
+
+# the former agenda summary regex, run over the whole preamble
+AGENDA_SUMMARY_REG = re.compile(r'\n(Zusatztagesordnungspunkt|Tagesordnungspunkt)\s*(\d+)*:?\n(.*?(?=(?:' +
+                                '|'.join([r'\n(Zusatztagesordnungspunkt|Tagesordnungspunkt)\s*(\d+)*:?\n',
+                                          r'\nAnlage\s*\d*\s*\n', r'\n\d+\.\sSitzung\s*\n',
+                                          r'\nAmtliche Mitteilungen\s*\n']) + ')|$))', re.DOTALL)
+
+
+def random_transcripts(n, seed=0):
+    rnd = random.Random(seed)
+    for _ in range(n):
+        yield rnd.choice(['', '\n', '  \n']) + '\n'.join(rnd.choice(LINES) for _ in range(rnd.randint(1, 60)))
+
+
+class Scanner(unittest.TestCase):
+    def assertSameMatches(self, text, pos=0, endpos=None):
+        events = scan_transcript(text)
+        end = len(text) if endpos is None else endpos
+        for kind, regex in SCANNED_REGEXES:
+            expected = [m.span() for m in regex.finditer(text, pos, end)]
+            self.assertEqual([m.span() for m in events.finditer(kind, regex, pos, endpos)], expected,
+                             (kind, regex.pattern, text))
+
+    def test_sample(self):
+        self.assertSameMatches(fixtures.SAMPLE_TRANSCRIPT.format(session=221))
+
+    def test_random(self):
+        for text in random_transcripts(500):
+            self.assertSameMatches(text)
+            self.assertSameMatches(text, len(text) // 3, 2 * len(text) // 3)
+
+    def test_agenda_summaries(self):
+        for text in random_transcripts(500, seed=1):
+            expected = [(m.group(1), m.group(2), Regex.steno_reference_reg_.sub('\n', m.group(3)))
+                        for m in AGENDA_SUMMARY_REG.finditer(text)]
+            summaries = [(s['type'], s['id'], s['summary']) for s in parse_agenda_summaries(text)]
+            self.assertEqual(summaries, expected, text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+sys.path.insert(0, '../src')
+from search_index import tokenize, IndexBuilder, SearchIndex
+from text_span import TextSpan
+
+
+def contribution(first_name, last_name, party, speech):
+    return {'speaker': {'first_name': first_name, 'last_name': last_name, 'party': party},
+            'start_idx': 0, 'end_idx': len(speech), 'speech': speech}
+
+
+TOPIC = {'type': 'Tagesordnungspunkt', 'id': '1', 'summary': 'Sport', 'start_idx': 0, 'end_idx': 10}
+
+SESSIONS = {
+    '221': [
+        contribution('Norbert', 'Lammert', None, 'Ich rufe den Tagesordnungspunkt 1 auf.'),
+        TOPIC,
+        contribution('Anna', 'Muster', 'SPD', 'Herr Präsident! Sport ist gut. Die Bundes-\nregierung fördert den Sport.'),
+        contribution('Hans-Christian', 'Ströbele', 'BÜNDNIS 90/DIE GRÜNEN', TextSpan('xx Sport ist anstrengend. Grüße!', 3)),
+    ],
+    '222': [
+        contribution('Anna', 'Muster', 'SPD', 'Sport ist gut, sagt die SPD. Sport ist gut!'),
+        contribution('Peter', 'Beispiel', 'CDU/CSU', 'Mehr Straßen statt Sport.'),
+    ],
+}
+
+
+class Tokenize(unittest.TestCase):
+    def test_german(self):
+        self.assertEqual(tokenize('Grüße, GRÜSSE und Gruesse!'), ['gruesse', 'gruesse', 'und', 'gruesse'])
+        self.assertEqual(tokenize('Die Bundes-\n  regierung, Hans-Christian'), ['die', 'bundesregierung', 'hans', 'christian'])
+        self.assertEqual(tokenize('§ 31 GO (Beifall bei der SPD)'), ['31', 'go', 'beifall', 'bei', 'der', 'spd'])
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        builder = IndexBuilder()
+        for session, contributions in SESSIONS.items():
+            builder.add(session, contributions)
+        # tiny shards, so lookups have to pick the right one
+        self.shards = builder.write(self.dir, shard_postings=3)
+        self.index = SearchIndex(self.dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_shards(self):
+        with open(os.path.join(self.dir, 'terms.json')) as f:
+            terms = json.load(f)
+        self.assertEqual(len(terms['shards']), self.shards)
+        self.assertGreater(self.shards, 5)
+        firsts = [s['first'] for s in terms['shards']]
+        self.assertEqual(firsts, sorted(firsts))
+
+        self.index.search('Sport')
+        self.assertEqual(len(self.index._loaded), 1)
+
+    def test_term(self):
+        self.assertEqual(self.index.search('sport'),
+                         [('221', 2, 2), ('221', 2, 9), ('221', 3, 0), ('222', 0, 0), ('222', 0, 6), ('222', 1, 3)])
+        self.assertEqual(self.index.search('Bundesregierung'), [('221', 2, 6)])
+        self.assertEqual(self.index.search('grüsse'), [('221', 3, 3)])
+        self.assertEqual(self.index.search('Strassen'), [('222', 1, 1)])
+        self.assertEqual(self.index.search('Tagesordnungspunkt'), [('221', 0, 3)])
+        self.assertEqual(self.index.search('aaa'), [])
+        self.assertEqual(self.index.search('zzz'), [])
+        self.assertEqual(self.index.search('...'), [])
+
+    def test_phrase(self):
+        self.assertEqual(self.index.search('Sport ist gut'), [('221', 2, 2), ('222', 0, 0), ('222', 0, 6)])
+        self.assertEqual(self.index.search('ist gut sagt'), [('222', 0, 1)])
+        self.assertEqual(self.index.search('gut Sport'), [])
+
+    def test_filters(self):
+        self.assertEqual(self.index.search('Sport ist', speaker='ströbele'), [('221', 3, 0)])
+        self.assertEqual(self.index.search('Sport', party='cdu'), [('222', 1, 3)])
+        self.assertEqual(self.index.search('Sport ist gut', speaker='Anna Muster', party='SPD'),
+                         [('221', 2, 2), ('222', 0, 0), ('222', 0, 6)])
+        self.assertEqual(self.index.search('Tagesordnungspunkt', party='SPD'), [])
+        self.assertEqual(self.index.speaker('221', 1), None)
+
+    def test_duplicate_session(self):
+        builder = IndexBuilder()
+        self.assertTrue(builder.add('221', []))
+        with self.assertLogs('search_index', 'WARNING'):
+            self.assertFalse(builder.add('221', [{'speaker': {'first_name': 'Anna', 'last_name': 'Muster'},
+                                                   'speech': 'Sport'}]))
+        self.assertEqual((builder.sessions, len(builder)), (['221'], 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+
+sys.path.insert(0, '../src')
+import session_stats
+from session_stats import SessionStats
+
+
+def contribution(first_name, last_name, party, start_idx, end_idx):
+    return {'speaker': {'first_name': first_name, 'last_name': last_name, 'party': party},
+            'start_idx': start_idx, 'end_idx': end_idx}
+
+
+def topic(start_idx):
+    return {'type': 'Tagesordnungspunkt', 'id': '1', 'start_idx': start_idx, 'end_idx': start_idx + 10}
+
+
+SESSION_221 = (
+    {'session': '221', 'date': '30.3.2017'},
+    [
+        contribution('Norbert', 'Lammert', None, 0, 50),
+        # Anna Muster's contribution, split by an agenda item
+        contribution('Anna', 'Muster', 'SPD', 50, 80),
+        topic(80),
+        contribution('Anna', 'Muster', 'SPD', 80, 150),
+        contribution('Hans-Christian', 'Ströbele', 'BÜNDNIS 90/DIE GRÜNEN', 150, 200),
+    ],
+    [{'first_name': 'Susann', 'last_name': 'Rüthrich', 'party': 'SPD'},
+     {'first_name': 'Gabriele', 'last_name': 'Schmidt', 'party': 'CDU/CSU'}],
+)
+
+SESSION_220 = (
+    {'session': '220', 'date': '29.3.2017'},
+    [contribution('Susann', 'Rüthrich', 'SPD', 0, 40)],
+    [{'first_name': 'Anna', 'last_name': 'Muster', 'party': 'SPD'}],
+)
+
+
+class SessionStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def stats(self):
+        stats = SessionStats('1')
+        self.assertTrue(stats.add_session(*SESSION_221))
+        self.assertTrue(stats.add_session(*SESSION_220))
+        self.assertFalse(stats.add_session(*SESSION_221))
+        return stats
+
+    def check(self, stats):
+        deputies = {d['id']: d for d in stats.deputy_totals()}
+        self.assertEqual(deputies['anna muster']['contributions'], 1)
+        self.assertEqual(deputies['anna muster']['chars'], 100)
+        self.assertEqual(deputies['anna muster']['absences'], 1)
+        self.assertEqual(deputies['susann ruethrich']['absences'], 1)
+        self.assertEqual(deputies['susann ruethrich']['contributions'], 1)
+        self.assertEqual(deputies['norbert lammert']['party'], None)
+        self.assertEqual(deputies['norbert lammert']['chars'], 50)
+
+        self.assertEqual(stats.party_totals(), {
+            'SPD': {'absences': 2, 'contributions': 2, 'chars': 140},
+            'BÜNDNIS 90/DIE GRÜNEN': {'absences': 0, 'contributions': 1, 'chars': 50},
+            'CDU/CSU': {'absences': 1, 'contributions': 0, 'chars': 0},
+        })
+
+        series = stats.time_series()
+        self.assertEqual([s['session'] for s in series['sessions']], ['220', '221'])
+        self.assertEqual(series['parties']['SPD'], {'absences': [1, 1], 'contributions': [1, 1], 'chars': [40, 100]})
+        self.assertEqual(series['parties']['CDU/CSU']['absences'], [0, 1])
+
+    def test_totals(self):
+        self.check(self.stats())
+
+    def test_save_load(self):
+        filename = os.path.join(self.dir, 'stats.json')
+        stats = SessionStats('1')
+        stats.add_session(*SESSION_221)
+        stats.save(filename)
+
+        stats = SessionStats.load(filename, '1')
+        self.assertFalse(stats.add_session(*SESSION_221))
+        self.assertTrue(stats.add_session(*SESSION_220))
+        self.check(stats)
+
+        self.assertEqual(SessionStats.load(filename, '2').deputy_totals(), [])
+        self.assertEqual(SessionStats.load(os.path.join(self.dir, 'missing.json'), '1').deputy_totals(), [])
+
+    def test_replace_session(self):
+        stats = self.stats()
+        metadata, contributions, excused = SESSION_221
+        # parsed again: Ströbele's contribution is gone, Schmidt no longer excused
+        self.assertFalse(stats.add_session(metadata, contributions[:-1], excused[:1]))
+        deputies = {d['id']: d for d in stats.deputy_totals()}
+        self.assertEqual(deputies['hans christian stroebele']['contributions'], 0)
+        self.assertEqual(deputies['gabriele schmidt']['absences'], 0)
+        self.assertEqual(deputies['anna muster']['chars'], 100)
+        self.assertEqual(stats.party_totals()['BÜNDNIS 90/DIE GRÜNEN'], {'absences': 0, 'contributions': 0, 'chars': 0})
+        self.assertEqual(stats.party_totals()['CDU/CSU']['absences'], 0)
+        series = stats.time_series()
+        self.assertEqual([s['session'] for s in series['sessions']], ['220', '221'])
+        self.assertEqual(series['parties']['CDU/CSU']['absences'], [0, 0])
+
+        filename = os.path.join(self.dir, 'stats.json')
+        stats.save(filename)
+        stats = SessionStats.load(filename, '1')
+        self.assertFalse(stats.add_session(*SESSION_221))
+        self.check(stats)
+
+    def test_growing_columns(self):
+        stats = SessionStats()
+        for i in range(100):
+            stats.add_session({'session': str(i)}, [contribution('Anna', 'Muster{}'.format(i), 'SPD', 0, i)], [])
+        self.assertEqual(sum(d['chars'] for d in stats.deputy_totals()), sum(range(100)))
+        self.assertEqual(stats.party_totals()['SPD']['contributions'], 100)
+
+    def test_without_numpy(self):
+        numpy = session_stats.numpy
+        session_stats.numpy = None
+        try:
+            self.check(self.stats())
+        finally:
+            session_stats.numpy = numpy
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, '../src')
+from spool import Spool, Worker, Coordinator, WorkersExited, run_worker, read_result, QUEUE, CLAIMED
+from deputy_registry import DeputyRegistry
+from plenar_parser import parse_plenar_transcript
+from APIMocker import APIMocker
+import fixtures
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+logging.getLogger('spool').setLevel(logging.ERROR)
+
+SESSIONS = [221, 222, 223, 224, 225]
+
+
+class SpoolTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.deputies = fixtures.write_deputies(self.dir)
+        self.files = [fixtures.write_transcript(self.dir, s) for s in SESSIONS]
+        self.spool = Spool(os.path.join(self.dir, 'spool'), lease_seconds=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_claim_once(self):
+        self.spool.enqueue(self.files[0])
+        self.assertEqual(self.spool.claim('a'), '18221.txt')
+        self.assertIsNone(self.spool.claim('b'))
+        self.assertEqual(self.spool.claimed(), [('18221.txt', 'a')])
+
+    def test_reap(self):
+        self.spool.enqueue(self.files[0])
+        self.spool.claim('dead')
+        self.assertEqual(self.spool.reap(), [])
+        self.assertEqual(self.spool.reap(time.time() + 2), ['18221.txt'])
+        self.assertEqual(self.spool.queued(), ['18221.txt'])
+        self.assertEqual(os.listdir(self.spool.path(CLAIMED)), [])
+
+    def test_reap_server_time(self):
+        # lease ages are measured against the mtimes of the spool's file system
+        self.assertAlmostEqual(self.spool.server_time(), time.time(), delta=5)
+        self.spool.enqueue(self.files[0])
+        self.spool.claim('dead')
+        lease = self.spool.path(CLAIMED, '18221.txt@dead.lease')
+        renewed = self.spool.server_time() - 10
+        os.utime(lease, (renewed, renewed))
+        self.assertEqual(self.spool.reap(), ['18221.txt'])
+
+    def test_worker(self):
+        for f in self.files[:2]:
+            self.spool.enqueue(f)
+        self.spool.enqueue(os.path.join(self.dir, 'deputies.json'))
+        worker = Worker(self.spool, 'w', self.deputies)
+        while worker.run_once():
+            pass
+        self.assertEqual([n for n, _ in self.spool.results()], ['18221.txt', '18222.txt'])
+        self.assertEqual([n for n, _ in self.spool.errors()], ['deputies.json'])
+
+        (metadata, _, contributions, _), unresolved, timings = read_result(self.spool.results()[0][1])
+        expected = parse_plenar_transcript(self.files[0], DeputyRegistry.load(self.deputies))
+        self.assertEqual(metadata, expected[0])
+        self.assertEqual([dict(c) for c in contributions], [dict(c) for c in expected[2]])
+
+    def test_missing_deputies(self):
+        self.spool.enqueue(self.files[0])
+        worker = Worker(self.spool, 'w', os.path.join(self.dir, 'missing.json'))
+        self.assertTrue(worker.run_once())
+        self.assertEqual([n for n, _ in self.spool.errors()], ['18221.txt'])
+        self.assertIn('FileNotFoundError', self.spool.errors()[0][1])
+
+    def test_workers_exited(self):
+        coordinator = Coordinator(self.spool, poll_interval=0.05)
+        coordinator.start(self.files[:1])
+        dead = multiprocessing.Process(target=time.sleep, args=(0,))
+        dead.start()
+        dead.join()
+        with self.assertRaises(WorkersExited):
+            coordinator.wait(timeout=30, processes=[dead])
+
+    def test_failure_pops_unresolved(self):
+        # fails to parse, after a speaker of it couldn't be resolved
+        broken = os.path.join(self.dir, '18220.txt')
+        shutil.copyfile(os.path.join(self.dir, 'deputies.json'), broken)
+        for f in (broken, self.files[0]):
+            self.spool.enqueue(f)
+        worker = Worker(self.spool, 'w', self.deputies)
+        worker._registry = DeputyRegistry.load(self.deputies)
+        worker._registry.resolve({'first_name': 'Erika', 'last_name': 'Unbekannt'})
+        while worker.run_once():
+            pass
+        self.assertEqual([n for n, _ in self.spool.errors()], ['18220.txt'])
+        _, unresolved, _ = read_result(self.spool.results()[0][1])
+        self.assertNotIn('Unbekannt', [p['last_name'] for p in unresolved])
+
+    def test_reused_spool(self):
+        worker = Worker(self.spool, 'w', self.deputies)
+        first = Coordinator(self.spool, poll_interval=0.1)
+        first.start(self.files[:2] + [os.path.join(self.dir, 'deputies.json')])
+        while worker.run_once():
+            pass
+        self.assertEqual([n for n, _ in first.errors()], ['deputies.json'])
+
+        second = Coordinator(self.spool, poll_interval=0.1)
+        second.start(self.files[2:3])
+        while worker.run_once():
+            pass
+        self.assertEqual(second.errors(), [])
+        out = os.path.join(self.dir, 'out')
+        written = second.assemble(out, precompress=())
+        self.assertEqual(sorted(os.path.basename(f) for f in written), ['223.json', 'plenums.json'])
+        with open(os.path.join(out, 'plenums.json'), encoding='utf8') as f:
+            self.assertEqual([p['session'] for p in json.load(f)], ['223'])
+
+    def test_timeout(self):
+        coordinator = Coordinator(self.spool, poll_interval=0.05)
+        with self.assertRaises(TimeoutError):
+            coordinator.run(self.files[:1], os.path.join(self.dir, 'out'), timeout=0.2)
+        self.assertFalse(os.path.exists(os.path.join(self.dir, 'out')))
+
+    def test_distributed(self):
+        out = os.path.join(self.dir, 'out')
+        coordinator = Coordinator(self.spool, poll_interval=0.1)
+        coordinator.start(self.files)
+        # a worker that died after claiming a protocol
+        self.spool.claim('dead')
+
+        workers = [multiprocessing.Process(target=run_worker, args=(self.spool.directory, 1, self.deputies, 0.1,
+                                                                    'local{}'.format(i)))
+                   for i in range(3)]
+        for p in workers:
+            p.start()
+        try:
+            self.assertTrue(coordinator.wait(timeout=30))
+        finally:
+            coordinator.stop()
+            for p in workers:
+                p.join()
+        self.assertEqual([p.exitcode for p in workers], [0, 0, 0])
+        self.assertEqual(os.listdir(self.spool.path(QUEUE)), [])
+        self.assertEqual(os.listdir(self.spool.path(CLAIMED)), [])
+
+        coordinator.assemble(out, compact=True, precompress=())
+        with open(os.path.join(out, 'plenums.json'), encoding='utf8') as f:
+            plenums = json.load(f)
+        self.assertEqual(len(plenums), len(SESSIONS))
+
+        # the same as exporting a local parse
+        metadata, topics, contributions, excused = parse_plenar_transcript(self.files[0],
+                                                                           DeputyRegistry.load(self.deputies))
+        local = os.path.join(self.dir, 'local.json')
+        APIMocker.stream_plenum(metadata, topics, contributions, excused, local, True, ())
+        with open(local, 'rb') as expected, open(os.path.join(out, '221.json'), 'rb') as written:
+            self.assertEqual(written.read(), expected.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
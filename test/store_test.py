@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import shutil
+import logging
+import sqlite3
+import tempfile
+
+sys.path.insert(0, '../src')
+from store import Store, export_store
+from APIMocker import APIMocker
+from deputy_registry import DeputyRegistry
+from plenar_parser import parse_plenar_transcript
+import fixtures
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+
+
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        registry = DeputyRegistry.load(fixtures.write_deputies(self.dir))
+        self.results = {}
+        for session in (221, 220):
+            text = fixtures.SAMPLE_TRANSCRIPT
+            if session == 220:
+                text = text.replace('30. März 2017', '29. März 2017').replace('Rüthrich, Susann *\nSPD', 'Rüthrich, Susann *\nCDU/CSU')
+            f = fixtures.write_transcript(self.dir, session, text=text)
+            self.results[str(session)] = parse_plenar_transcript(f, registry)
+        self.store = Store(os.path.join(self.dir, 'plenar.db'))
+        for result in self.results.values():
+            self.store.add_session(result)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.dir)
+
+    def test_roundtrip(self):
+        self.assertEqual(self.store.sessions(), ['220', '221'])
+        for session, (metadata, summaries, contributions, excused) in self.results.items():
+            self.assertEqual(self.store.result(session),
+                             (metadata, summaries, [dict(c, speech=str(c['speech'])) if 'speech' in c else c
+                                                    for c in contributions], excused))
+
+    def test_replace(self):
+        self.store.add_session(self.results['221'])
+        self.assertEqual(self.store.sessions(), ['220', '221'])
+        count = self.store.conn.execute('SELECT COUNT(*) FROM contributions').fetchone()[0]
+        self.assertEqual(count, sum(len(r[2]) for r in self.results.values()))
+        speakers = self.store.conn.execute('SELECT COUNT(*) FROM speakers').fetchone()[0]
+        self.assertEqual(speakers, 3)
+
+    def test_queries(self):
+        rows = self.store.contributions_of('Muster')
+        self.assertEqual([(r[0], r[1]) for r in rows], [('220', 3), ('221', 3)])
+        self.assertTrue(rows[0][2].startswith('  Herr Präsident! Sport ist gut.'))
+        self.assertEqual(len(self.store.contributions_of('Ströbele', 'Hans-Christian')), 2)
+        self.assertEqual(self.store.contributions_of('Muster', 'Hans'), [])
+
+        self.assertEqual(self.store.absences_of_party('SPD'), [('221', '2017-03-30', 'Susann', 'Rüthrich')])
+        self.assertEqual(len(self.store.absences_of_party('CDU/CSU')), 3)
+        self.assertEqual(len(self.store.absences_of_party('CDU/CSU', since='2017-03-30')), 1)
+        self.assertEqual(len(self.store.absences_of_party('CDU/CSU', until='2017-03-29')), 2)
+
+    def test_migrate(self):
+        filename = os.path.join(self.dir, 'old.db')
+        conn = sqlite3.connect(filename)
+        conn.execute('CREATE TABLE sessions (id INTEGER PRIMARY KEY, session TEXT NOT NULL UNIQUE, date TEXT, '
+                     'date_text TEXT, start_time TEXT, end_time TEXT)')
+        conn.close()
+        with Store(filename) as store:
+            store.add_session(self.results['221'])
+            self.assertEqual(store.result('221')[0], self.results['221'][0])
+
+    def test_export(self):
+        direct, from_store = os.path.join(self.dir, 'direct'), os.path.join(self.dir, 'store')
+        os.makedirs(direct)
+        os.makedirs(from_store)
+        for session, (metadata, summaries, contributions, excused) in self.results.items():
+            APIMocker.stream_plenum(metadata, summaries, contributions, excused,
+                                    os.path.join(direct, session + '.json'), precompress=('gz',))
+        export_store(self.store, from_store, precompress=('gz',))
+
+        for name in ['220.json', '221.json', '220.json.gz', '221.json.gz']:
+            with open(os.path.join(direct, name), 'rb') as a, open(os.path.join(from_store, name), 'rb') as b:
+                self.assertEqual(a.read(), b.read(), name)
+        self.assertTrue(os.path.exists(os.path.join(from_store, 'plenums.json')))
+
+    def test_export_session_name(self):
+        # the files of sessions below 100 are named like their protocols
+        f = fixtures.write_transcript(self.dir, 5)
+        self.store.add_session(parse_plenar_transcript(f, DeputyRegistry.load(os.path.join(self.dir, 'deputies.json'))))
+        out = os.path.join(self.dir, 'out')
+        os.makedirs(out)
+        written = export_store(self.store, out, precompress=(), paged=True)
+        self.assertIn(os.path.join(out, '005.json'), written)
+        self.assertTrue(os.path.exists(os.path.join(out, '005', 'head.json')))
+
+
+if __name__ == '__main__':
+    unittest.main()
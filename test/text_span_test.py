@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import json
+import pickle
+import shutil
+import logging
+import tempfile
+
+sys.path.insert(0, '../src')
+from text_span import TextSpan
+from APIMocker import APIMocker
+from deputy_registry import DeputyRegistry
+from plenar_parser import parse_plenar_transcript, read_transcript
+import fixtures
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+
+
+class TextSpanTest(unittest.TestCase):
+    text = 'Herr Präsident! Sport ist gut.'
+
+    def test_behaves_like_str(self):
+        s = TextSpan(self.text, 5, 15)
+        self.assertEqual(str(s), 'Präsident!')
+        self.assertEqual(len(s), 10)
+        self.assertEqual(s, 'Präsident!')
+        self.assertEqual(s[0:9], 'Präsident')
+        self.assertEqual(s[-1], '!')
+        self.assertEqual(s[3:], s[3:100])
+        self.assertEqual(s[8:2], '')
+        self.assertEqual(s[::2], 'Päiet')
+
+    def test_slices_share_text(self):
+        s = TextSpan(self.text)[5:][:10]
+        self.assertIs(s.text, self.text)
+        self.assertEqual((s.start, s.end), (5, 15))
+
+    def test_pickle_shares_text(self):
+        spans = [TextSpan(self.text, i, i + 5) for i in range(10)]
+        loaded = pickle.loads(pickle.dumps(spans))
+        self.assertEqual(loaded, spans)
+        self.assertTrue(all(s.text is loaded[0].text for s in loaded))
+
+    def test_json(self):
+        d = {'speech': TextSpan(self.text, 16)}
+        for compact in (True, False):
+            encoded = ''.join(APIMocker.encoder(compact).iterencode(d))
+            self.assertEqual(json.loads(encoded), {'speech': 'Sport ist gut.'})
+
+
+class ReadTranscript(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.deputies = fixtures.write_deputies(self.dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_sanitised(self):
+        filename = os.path.join(self.dir, 'crlf.txt')
+        with open(filename, 'wb') as f:
+            f.write('Beginn:\xa09.00 Uhr\r\nRedetext\rEnde\n'.encode('utf8'))
+        self.assertEqual(read_transcript(filename), 'Beginn: 9.00 Uhr\nRedetext\nEnde\n')
+
+        open(filename, 'w').close()
+        self.assertEqual(read_transcript(filename), '')
+
+    def test_speeches_share_text(self):
+        filename = fixtures.write_transcript(self.dir, 221)
+        registry = DeputyRegistry.load(self.deputies)
+        _, _, contributions, _ = parse_plenar_transcript(filename, registry)
+
+        speeches = [c['speech'] for c in contributions if 'speaker' in c]
+        self.assertTrue(all(isinstance(s, TextSpan) for s in speeches))
+        self.assertTrue(all(s.text is speeches[0].text for s in speeches))
+        muster = [c['speech'] for c in contributions if c.get('speaker', {}).get('last_name') == 'Muster']
+        self.assertEqual(muster, ['  Herr Präsident! Sport ist gut.\n(Beifall bei der SPD – Zuruf von der LINKEN: Nein!)'])
+
+
+if __name__ == '__main__':
+    unittest.main()
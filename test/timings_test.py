@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import json
+import shutil
+import subprocess
+import tempfile
+
+sys.path.insert(0, '../src')
+from timings import Timings
+from batch import parse_batch
+import fixtures
+
+
+class TimingsTest(unittest.TestCase):
+    def test_stages(self):
+        calls = []
+        timings = Timings(hooks=[lambda name, record: calls.append((name, dict(record)))])
+        for i in range(2):
+            with timings.stage('scan', 100) as record:
+                record['matches'] = 3
+        with self.assertRaises(ValueError):
+            with timings.stage('split'):
+                raise ValueError()
+
+        summary = timings.summary()
+        self.assertEqual(list(summary), ['scan', 'split'])
+        self.assertEqual(summary['scan']['calls'], 2)
+        self.assertEqual(summary['scan']['matches'], 6)
+        self.assertEqual(summary['scan']['chars'], 200)
+        self.assertEqual(summary['split']['calls'], 1)
+        self.assertGreaterEqual(summary['scan']['seconds'], 0)
+        self.assertEqual([name for name, _ in calls], ['scan', 'scan', 'split'])
+        self.assertEqual(calls[0][1]['matches'], 3)
+        self.assertAlmostEqual(timings.seconds, sum(s['seconds'] for s in summary.values()))
+
+    def test_merge(self):
+        a, b = Timings(), Timings()
+        with a.stage('scan', 10) as record:
+            record['matches'] = 1
+        with b.stage('scan', 20) as record:
+            record['matches'] = 2
+        with b.stage('split', 5):
+            pass
+
+        total = Timings().merge(a.summary()).merge(json.loads(json.dumps(b.summary())))
+        self.assertEqual(total.summary()['scan']['calls'], 2)
+        self.assertEqual(total.summary()['scan']['matches'], 3)
+        self.assertEqual(total.summary()['scan']['chars'], 30)
+        self.assertEqual(total.summary()['split']['calls'], 1)
+
+
+class ParserTimings(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.deputies = fixtures.write_deputies(self.dir)
+        self.file = fixtures.write_transcript(self.dir, 221)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_log_level_left_to_caller(self):
+        # in a fresh interpreter, as other tests set the level
+        out = subprocess.check_output([sys.executable, '-c', 'import sys, logging; sys.path.insert(0, "../src"); '
+                                       'import plenar_parser; '
+                                       'print(logging.getLogger("plenar_parser").level, len(logging.getLogger().handlers))'])
+        self.assertEqual(out.split(), [b'0', b'0'])
+
+    def test_batch_timings(self):
+        result, = parse_batch([self.file], workers=1, deputies_path=self.deputies)
+        t = result.timings
+        self.assertEqual(list(t), ['read_transcript', 'scan_transcript', 'parse_metadata', 'split_plenum',
+                                   'parse_agenda_summaries', 'parse_agenda_debate', 'parse_contributions',
+                                   'inject_agenda_items', 'parse_interjections', 'parse_excused'])
+        self.assertEqual(t['parse_interjections']['matches'], 3)
+        self.assertEqual(t['parse_metadata']['matches'], 0)
+        self.assertEqual(t['parse_agenda_summaries']['matches'], 2)
+        self.assertEqual(t['parse_agenda_debate']['matches'], 2)
+        self.assertEqual(t['parse_contributions']['matches'], 4)
+        self.assertEqual(t['parse_excused']['matches'], 2)
+        self.assertEqual(t['read_transcript']['chars'], t['scan_transcript']['chars'])
+        self.assertTrue(all(s['calls'] == 1 for s in t.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import re
+import json
+import shutil
+import logging
+import tempfile
+import threading
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, '../src')
+from watcher import Watcher, merge_plenums, METRICS_FILE
+import fixtures
+
+logging.getLogger('plenar_parser').setLevel(logging.ERROR)
+logging.getLogger('watcher').setLevel(logging.CRITICAL)
+logging.getLogger('downloader').setLevel(logging.CRITICAL)
+
+PUBLISHED = 1490000000.0
+
+
+class ListingHandler(BaseHTTPRequestHandler):
+    """Serves `server.listing` (newest first) page by page and the protocols in `server.files`."""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status, body, headers=()):
+        self.send_response(status)
+        for h in headers:
+            self.send_header(*h)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+        url = urlsplit(self.path)
+        if url.path == '/list':
+            if server.down:
+                return self.send_body(404, b'')
+            q = parse_qs(url.query)
+            offset, limit = int(q['offset'][0]), int(q['limit'][0])
+            links = server.listing[offset:offset + limit]
+            return self.send_body(200, ''.join('<a href="{}">x</a>'.format(l) for l in links).encode('utf8'))
+        body, last_modified = server.files[url.path]
+        self.send_body(200, body, [('Last-Modified', last_modified)])
+
+
+def extract_links(data):
+    return re.findall(r'href="([^"]+)"', data.decode('utf8'))
+
+
+class WatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.out = os.path.join(self.dir, 'out')
+        self.data = os.path.join(self.dir, 'data')
+        self.deputies = fixtures.write_deputies(self.dir)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ListingHandler)
+        self.server.requests = []
+        self.server.listing = []
+        self.server.files = {}
+        self.server.down = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = 'http://127.0.0.1:{}'.format(self.server.server_port)
+        self.now = PUBLISHED + 3600
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.dir)
+
+    def publish(self, session, path=None):
+        path = path or '/files/18{}.txt'.format(session)
+        self.server.files[path] = (fixtures.SAMPLE_TRANSCRIPT.format(session=session).encode('utf8'),
+                                   formatdate(PUBLISHED, usegmt=True))
+        self.server.listing.insert(0, path)
+
+    def watcher(self, **kwargs):
+        return Watcher(self.out, self.base + '/list?limit={limit}&offset={offset}', extract_links, self.base,
+                       self.data, limit=2, deputies_path=self.deputies, precompress=(), clock=lambda: self.now, **kwargs)
+
+    def read(self, name):
+        with open(os.path.join(self.out, name), encoding='utf8') as f:
+            return json.load(f)
+
+    def test_incremental(self):
+        self.publish(219)
+        self.publish(220)
+        w = self.watcher()
+        self.assertEqual(w.poll(), ['220', '219'])
+        self.assertEqual([p['session'] for p in self.read('plenums.json')], ['220', '219'])
+        self.assertEqual(self.read('220.json')['session'], '220')
+
+        # nothing new: only the first listing page is requested
+        del self.server.requests[:]
+        self.assertEqual(w.poll(), [])
+        self.assertEqual(self.server.requests, ['/list?limit=2&offset=0'])
+
+        self.publish(221)
+        mtime = os.stat(os.path.join(self.out, '220.json')).st_mtime_ns
+        del self.server.requests[:]
+        self.assertEqual(self.watcher().poll(), ['221'])
+        self.assertEqual([p['session'] for p in self.read('plenums.json')], ['221', '220', '219'])
+        self.assertEqual([r for r in self.server.requests if r.startswith('/files')], ['/files/18221.txt'])
+        self.assertEqual(os.stat(os.path.join(self.out, '220.json')).st_mtime_ns, mtime)
+        self.assertEqual(sorted(f for f in os.listdir(self.out) if f.startswith('.')), [])
+
+    def test_session_from_metadata(self):
+        # the files are named after the parsed session, not after the protocol's file name
+        self.publish(5, '/files/plenarprotokoll-5.txt')
+        self.assertEqual(self.watcher().poll(), ['5'])
+        self.assertEqual(self.read('005.json')['session'], '5')
+        self.assertEqual([p['session'] for p in self.read('plenums.json')], ['5'])
+
+    def test_lag(self):
+        self.publish(220)
+        w = self.watcher()
+        w.poll()
+        self.assertEqual(w.metrics['lag_seconds'], {'220': 3600.0})
+        self.assertEqual(w.metrics['max_lag_seconds'], 3600.0)
+        with open(os.path.join(self.data, METRICS_FILE)) as f:
+            self.assertEqual(json.load(f)['published'], 1)
+
+    def test_backoff(self):
+        self.server.down = True
+        w = self.watcher(interval=10, max_interval=30)
+        delays = []
+        w._stop.wait = delays.append
+        w.run(polls=4)
+        self.assertEqual(delays, [20, 30, 30])
+        self.assertEqual(w.metrics['failed_polls'], 4)
+
+        self.server.down = False
+        self.publish(220)
+        delays = []
+        w._stop.wait = delays.append
+        w.run(polls=2)
+        self.assertEqual(delays, [10])
+        self.assertEqual(w.metrics['published'], 1)
+
+    def test_merge_plenums(self):
+        old = [{'session': '220', 'v': 1}, {'session': '219', 'v': 1}]
+        merged = merge_plenums(old, [{'session': '222', 'v': 2}, {'session': '221', 'v': 2}, {'session': '219', 'v': 2}])
+        self.assertEqual([(p['session'], p['v']) for p in merged], [('222', 2), ('221', 2), ('220', 1), ('219', 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()